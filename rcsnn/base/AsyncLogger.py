@@ -0,0 +1,330 @@
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, List, Tuple, Union
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.CsvLogger import CsvLogger
+
+
+class BackpressureTypes():
+    BLOCK = "block"
+    DROP = "drop"
+    COALESCE = "coalesce"
+
+
+class AsyncLogger(CsvLogger):
+    '''
+    The AsyncLogger class is a CsvLogger that writes the file on a background thread, so the control loop doesn't
+    wait on the disk. log() takes a snapshot of the current values on the calling thread, which is the only part
+    that has to happen at the tick, and puts it on a bounded queue. The writer thread formats and writes the rows
+    with CsvLogger.write_values(). Exports that would otherwise block the loop, such as DataDictionary.to_excel() or
+    ColumnarWriter.write_parquet(), can be run on the same thread with submit().
+
+    When the queue is full, backpressure decides what log() does. BLOCK waits for room, so nothing is lost but the
+    loop can stall. DROP throws the new row away. COALESCE replaces the newest queued row with the new one, so the
+    file skips ticks but always catches up to the current state
+
+    Attributes
+    ----------
+    max_queue:int
+        The number of rows and jobs that can wait to be written
+    backpressure:str
+        One of the BackpressureTypes
+    late_secs:float
+        Rows that wait longer than this in the queue are counted as late
+    queue:Deque
+        (log_line, values, time queued) records. A job has a log_line of None and (function, args) as its values
+    cond:threading.Condition
+        Protects the queue and the counters
+    io_lock:threading.RLock
+        Held while rows are formatted and written, so flush() can be called from the control loop
+    thread:threading.Thread
+        The writer thread. Started by open()
+    closing:bool
+        Set by close() to stop the writer thread once the queue is empty
+    busy:bool
+        True while the writer thread is writing records it has taken off the queue
+    error:Exception
+        The first exception raised on the writer thread, raised again by close(). The records queued after the one
+        that raised it are still written
+    written:int
+        The number of rows written
+    dropped:int
+        The number of rows thrown away under DROP, or because writing them raised an exception
+    coalesced:int
+        The number of queued rows replaced under COALESCE
+    late:int
+        The number of rows that waited longer than late_secs
+    blocked:int
+        The number of calls to log() that had to wait for room under BLOCK
+    max_depth:int
+        The most records that were waiting at once
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    open(self):
+        Opens the file, writes the header, and starts the writer thread
+    log(self):
+        If log_line % skip == 0, queues a row with the current values
+    enqueue(self, record:Tuple, droppable:bool):
+        Puts a record on the queue, applying the backpressure policy if it's full
+    submit(self, fn:Callable, *args):
+        Runs fn(*args) on the writer thread, after the rows queued before it
+    drain(self):
+        Waits until everything queued so far has been written
+    flush(self):
+        Writes any formatted rows to the file
+    close(self):
+        Waits for the queue to empty, stops the writer thread, and closes the file
+    to_string(self) -> str:
+        Returns the counters
+    '''
+    max_queue:int
+    backpressure:str
+    late_secs:float
+    queue:Deque[Tuple[Any, Any, float]]
+    cond:threading.Condition
+    io_lock:threading.RLock
+    thread:Union[threading.Thread, None]
+    closing:bool
+    busy:bool
+    error:Union[Exception, None]
+    written:int
+    dropped:int
+    coalesced:int
+    late:int
+    blocked:int
+    max_depth:int
+
+    def __init__(self, ddict:DataDictionary, filename:str, skip:int = 1, batch_size:int = 100,
+                 max_queue:int = 1024, backpressure:str = BackpressureTypes.BLOCK, late_secs:float = 1.0):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to log
+        filename: str
+            The name of the logfile
+        skip: int = 1
+            The number of calls to log() per row written
+        batch_size: int = 100
+            The number of rows the writer thread holds before writing them to the file
+        max_queue: int = 1024
+            The number of rows and jobs that can wait to be written
+        backpressure: str = BackpressureTypes.BLOCK
+            What log() does when the queue is full
+        late_secs: float = 1.0
+            Rows that wait longer than this many seconds in the queue are counted as late
+        """
+        if max_queue < 1:
+            raise ValueError("-------- ERROR -------- AsyncLogger() max_queue must be at least 1, not {}".format(max_queue))
+        self.cond = threading.Condition()
+        self.io_lock = threading.RLock()
+        self.thread = None
+        super().__init__(ddict, filename, skip, batch_size)
+        self.max_queue = max_queue
+        self.backpressure = backpressure
+        self.late_secs = late_secs
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        super().reset()
+        self.queue = deque()
+        self.closing = False
+        self.busy = False
+        self.error = None
+        self.written = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.late = 0
+        self.blocked = 0
+        self.max_depth = 0
+
+    def open(self):
+        """ Opens the file, writes the header, and starts the writer thread
+
+        Parameters
+        ----------
+        :return:
+        """
+        super().open()
+        self.closing = False
+        self.thread = threading.Thread(target=self.run, name="AsyncLogger", daemon=True)
+        self.thread.start()
+
+    def log(self):
+        """ If log_line % skip == 0, queues a row with the current values. Opens the file on the first call. The
+        row is a snapshot: the values are copied out of the DataDictionary before log() returns
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.f is None:
+            self.open()
+        if (self.log_line % self.skip) == 0:
+            self.enqueue((self.log_line, self.snapshot(), time.perf_counter()))
+        self.log_line += 1
+
+    def enqueue(self, record:Tuple, droppable:bool = True):
+        """ Puts a record on the queue, applying the backpressure policy if it's full
+
+        Parameters
+        ----------
+        record: Tuple
+            A (log_line, values, time queued) tuple
+        droppable: bool = True
+            If False, the record always waits for room, whatever the policy. Used for jobs
+        :return:
+        """
+        with self.cond:
+            if len(self.queue) >= self.max_queue:
+                if droppable and self.backpressure == BackpressureTypes.DROP:
+                    self.dropped += 1
+                    return
+                if droppable and self.backpressure == BackpressureTypes.COALESCE and self.queue[-1][0] is not None:
+                    self.queue[-1] = record
+                    self.coalesced += 1
+                    return
+                self.blocked += 1
+                while len(self.queue) >= self.max_queue and self.thread.is_alive():
+                    self.cond.wait()
+            self.queue.append(record)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.cond.notify_all()
+
+    def submit(self, fn:Callable, *args):
+        """ Runs fn(*args) on the writer thread, after the rows queued before it. Jobs are never dropped or
+        coalesced. The job reads whatever it reads when it runs, so submit exports of the history at the end of a
+        run, and call close() to wait for them
+
+        Parameters
+        ----------
+        fn: Callable
+            The function to run, such as ddict.to_excel
+        args: Any
+            The arguments to call it with
+        :return:
+        """
+        if self.f is None:
+            self.open()
+        self.enqueue((None, (fn, args), time.perf_counter()), droppable=False)
+
+    def run(self):
+        # the writer thread: takes everything that is queued, then writes it without holding the queue lock
+        while True:
+            with self.cond:
+                while len(self.queue) == 0 and not self.closing:
+                    self.cond.wait()
+                if len(self.queue) == 0:
+                    return
+                batch = list(self.queue)
+                self.queue.clear()
+                self.busy = True
+                self.cond.notify_all()
+            now = time.perf_counter()
+            with self.io_lock:
+                for log_line, values, queued in batch:
+                    # each record is written on its own, so one that fails doesn't lose the rest of the batch
+                    try:
+                        if log_line is None:
+                            fn, args = values
+                            fn(*args)
+                            continue
+                        if now - queued > self.late_secs:
+                            self.late += 1
+                        self.write_values(log_line, values)
+                        self.written += 1
+                    except Exception as e:
+                        if log_line is not None:
+                            with self.cond:
+                                self.dropped += 1
+                        if self.error is None:
+                            self.error = e
+            with self.cond:
+                self.busy = False
+                self.cond.notify_all()
+
+    def drain(self):
+        """ Waits until everything queued so far has been written, then writes the formatted rows to the file
+
+        Parameters
+        ----------
+        :return:
+        """
+        with self.cond:
+            while (len(self.queue) > 0 or self.busy) and self.thread is not None and self.thread.is_alive():
+                self.cond.wait()
+        self.flush()
+
+    def flush(self):
+        """ Writes any rows the writer thread has formatted to the file. Rows still on the queue are not included.
+        Use drain() to write everything
+
+        Parameters
+        ----------
+        :return:
+        """
+        with self.io_lock:
+            super().flush()
+
+    def close(self):
+        """ Waits for the queue to empty, stops the writer thread, and closes the file. Raises the first exception
+        from the writer thread, if there was one
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.thread is not None:
+            with self.cond:
+                self.closing = True
+                self.cond.notify_all()
+            self.thread.join()
+            self.thread = None
+        super().close()
+        if self.error is not None:
+            e = self.error
+            self.error = None
+            raise e
+
+    def to_string(self) -> str:
+        """ Returns the counters
+
+        Parameters
+        ----------
+
+        :return: A string with the rows written, dropped, coalesced, late and blocked, and the deepest the queue got
+        """
+        return "AsyncLogger ({}, max_queue = {}): written = {}, dropped = {}, coalesced = {}, late = {}, " \
+               "blocked = {}, max_depth = {}".format(self.backpressure, self.max_queue, self.written, self.dropped,
+                                                     self.coalesced, self.late, self.blocked, self.max_depth)
+
+
+if __name__ == "__main__":
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [1, 2, 3]))
+
+    for policy in [BackpressureTypes.BLOCK, BackpressureTypes.DROP, BackpressureTypes.COALESCE]:
+        with AsyncLogger(ddict, "testlog.csv", batch_size=4, max_queue=8, backpressure=policy) as logger:
+            # a slow job holds up the writer thread, so the queue fills up behind it
+            logger.submit(time.sleep, 0.05)
+            for i in range(1, 101):
+                ddict.get_entry("elapsed-time").data += 0.1
+                ddict.get_entry("test_int").data = i
+                ddict.store(1)
+                logger.log()
+        print(logger.to_string())
+    with open("testlog.csv") as f:
+        print("".join(f.readlines()[-3:]))
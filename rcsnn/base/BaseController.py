@@ -1,11 +1,12 @@
 from rcsnn.base.Commands import Commands
 from rcsnn.base.CommandObject import CommandObject
-from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, EntryHandle
 from rcsnn.base.Responses import Responses
 from rcsnn.base.ResponseObject import ResponseObject
 from rcsnn.base.States import States
 
-from typing import Union, Dict
+import numpy as np
+from typing import Union, Dict, List
 
 class BaseController():
     '''
@@ -27,14 +28,31 @@ class BaseController():
         The name of this instance
     clock:float
         The current time. Taken from the DataDictionary "elapsed-time"
+    elapsed_time:EntryHandle
+        The handle for the DataDictionary "elapsed-time" entry, bound once in the constructor
     dclock:float
-        The time since this instance was called
+        The time since this instance was called. A controller that isn't stepped every tick gets the whole time
+        since its last step
     elapsed:float
         A resettable clock that increments by dclock
     child_cmd_dict:Dict
         A Dict containing names and pointers to all the commands to child controllers
     child_rsp_dict:Dict
         A Dict containing names and pointers to all the responses from child controllers
+    parent:BaseController
+        The controller that sends this instance its commands, or None if they come from outside the hierarchy.
+        Set by link_parent_child()
+    children:List
+        The controllers that this instance sends commands to, in the order they were linked. Set by
+        link_parent_child() and used by the Scheduler to work out the step order
+    period:int
+        The number of ticks between steps when run by a Scheduler. The default of 1 steps every tick. Upper levels
+        that plan slowly can use a larger period
+    wakeup:float
+        The elapsed-time at which an event-driven Scheduler should step this controller even if it is idle, or None
+    rng:np.random.Generator
+        The random number generator for this controller. Use it instead of the random module, so that runs can be
+        repeated and run side by side. Scheduler.seed() gives every controller in a hierarchy its own stream
 
     Methods
     -------
@@ -48,6 +66,14 @@ class BaseController():
         Sets the pointer to an externally created CommandObject
     set_rsp_obj(self, ro: ResponseObject):
         Sets the pointer to an externally created ResponseObject
+    set_period(self, period: int):
+        Sets the number of ticks between steps when run by a Scheduler
+    set_wakeup(self, wakeup: float):
+        Sets the elapsed-time at which an event-driven Scheduler should step this controller even if it is idle
+    is_idle(self) -> bool:
+        Returns True if stepping this controller would do nothing until its command or a child's response changes
+    set_rng(self, rng: np.random.Generator):
+        Sets the random number generator for this controller
     add_child_cmd(self, cmd: CommandObject):
         Adds a CommandObject to this instance's child_cmd_dict
     add_child_rsp(self, rsp: ResponseObject):
@@ -93,9 +119,9 @@ class BaseController():
         rippled through the child classes and they have all returned DONE, this this class returns DONE to its parent
     to_string(self):
         returns a string that shows the name, command, response, and current state
-    create_cmd_rsp(parent: "BaseController", child: "BaseController", ddict: DataDictionary): Static method
-        Convenience class that creates a CommandObject and ResponseObject between a child and parent and adds these
-        objects to the data dictionary
+    link_parent_child(parent: "BaseController", child: "BaseController", ddict: DataDictionary): Static method
+        Convenience class that creates a CommandObject and ResponseObject between a child and parent, adds these
+        objects to the data dictionary, and records the link for the Scheduler
 
 
     '''
@@ -105,10 +131,16 @@ class BaseController():
     ddict: Union[DataDictionary, None]
     name:str
     clock:float
+    elapsed_time:Union[EntryHandle, None]
     dclock:float
     elapsed:float
     child_cmd_dict:Dict
     child_rsp_dict:Dict
+    parent:Union["BaseController", None]
+    children:List["BaseController"]
+    period:int
+    wakeup:Union[float, None]
+    rng:np.random.Generator
 
     def __init__(self, name: str, ddict: DataDictionary):
         """Constructor: Sets up the basic components of the class
@@ -123,6 +155,7 @@ class BaseController():
         self.reset()
         self.name = name
         self.ddict = ddict
+        self.elapsed_time = ddict.bind("elapsed-time")
         self.add_init()
 
     def reset(self):
@@ -134,6 +167,7 @@ class BaseController():
         """
         self.name = "unset"
         self.clock = 0
+        self.elapsed_time = None
         self.dclock = 0
         self.elapsed = 0
         self.cmd = None
@@ -141,10 +175,16 @@ class BaseController():
         self.cur_state = States.NOP
         self.child_cmd_dict = {}
         self.child_rsp_dict = {}
+        self.parent = None
+        self.children = []
+        self.period = 1
+        self.wakeup = None
+        self.rng = np.random.default_rng()
         self.add_reset()
 
     def add_init(self):
-        """ An empty method for subclasses to initialize. Called from self.__init__()
+        """ An empty method for subclasses to initialize. Called from self.__init__(). This is the place to
+        bind() the DataDictionary entries that the controller uses on every step
 
         Parameters
         ----------
@@ -183,6 +223,56 @@ class BaseController():
         """
         self.rsp = ro
 
+    def set_period(self, period: int):
+        """ Sets the number of ticks between steps when run by a Scheduler. Call before the Scheduler's first tick,
+        or call its build() afterwards
+
+        Parameters
+        ----------
+        period: int
+            The number of ticks between steps. 1 steps every tick
+        :return:
+        """
+        if period < 1:
+            raise ValueError("-------- ERROR -------- BaseController.set_period() {} period must be at least 1, not {}".format(self.name, period))
+        self.period = period
+
+    def set_wakeup(self, wakeup: float):
+        """ Sets the elapsed-time at which an event-driven Scheduler should step this controller even if it is
+        idle. Use this for a controller that waits in States.NOP for time to pass
+
+        Parameters
+        ----------
+        wakeup: float
+            The elapsed-time to step at, or None to only be woken by commands and responses
+        :return:
+        """
+        self.wakeup = wakeup
+
+    def is_idle(self) -> bool:
+        """ Returns True if stepping this controller would do nothing until its command or a child's response
+        changes: there is no new command and the current one isn't being executed. An event-driven Scheduler
+        parks idle controllers. Subclasses whose pre_process() or post_process() do work on every step should
+        return False
+
+        Parameters
+        ----------
+
+        :return: True if the controller can be parked
+        """
+        return self.cur_state == States.NOP and not self.cmd.new_command
+
+    def set_rng(self, rng: np.random.Generator):
+        """ Sets the random number generator for this controller. The default is unseeded
+
+        Parameters
+        ----------
+        rng: np.random.Generator
+            The generator, such as np.random.default_rng(seed)
+        :return:
+        """
+        self.rng = rng
+
     def add_child_cmd(self, cmd: CommandObject):
         """ Adds a CommandObject to this instance's child_cmd_dict
 
@@ -256,14 +346,15 @@ class BaseController():
         return (self.rsp)
 
     def step(self):
-        """ Update the clocks, and call the pre_process(), decision_process() and post_process() methods
+        """ Update the clocks, and call the pre_process(), decision_process() and post_process() methods. dclock is
+        the time since the last step, however many ticks ago that was
 
         Parameters
         ----------
 
         :return:
         """
-        current = self.ddict.get_entry("elapsed-time").data
+        current = self.elapsed_time.get()
         self.dclock = current - self.clock
         self.clock = current
         self.elapsed += self.dclock
@@ -396,7 +487,8 @@ class BaseController():
     @staticmethod
     def link_parent_child(parent: "BaseController", child: "BaseController", ddict: DataDictionary):
         """ Convenience class that creates a CommandObject and ResponseObject between a child and parent and adds these
-        objects to the data dictionary
+        objects to the data dictionary. The link is also recorded in the parent's children and the child's parent, so
+        a Scheduler can work out the step order from the top of the hierarchy
 
         Parameters
         ----------
@@ -416,6 +508,8 @@ class BaseController():
         child.set_rsp_obj(p2c_rsp)
         parent.add_child_cmd(p2c_cmd)
         parent.add_child_rsp(p2c_rsp)
+        child.parent = parent
+        parent.children.append(child)
         de = DictionaryEntry(p2c_cmd.name, DictionaryTypes.COMMAND, p2c_cmd)
         ddict.add_entry(de)
         de = DictionaryEntry(p2c_rsp.name, DictionaryTypes.RESPONSE, p2c_rsp)
@@ -452,27 +546,24 @@ if __name__ == "__main__":
     child_ctrl = BaseController("child_controller", ddict)
     BaseController.link_parent_child(parent_ctrl, child_ctrl, ddict)
 
-    # Set the INIT command that will start the hierarchy, then iterate until the INIT->RUN->TERMINATE sequence completes
+    # Set the INIT command that will start the hierarchy, then iterate until the INIT->RUN->TERMINATE sequence completes.
+    # The Scheduler steps the parent and then the child, which it finds from link_parent_child()
+    from rcsnn.base.Scheduler import Scheduler
+    sched = Scheduler(ddict, [parent_ctrl])
     top_to_parent_cmd_obj.set(Commands.INIT, 1)
-    done = False
-    current_step = 0
-    while not done:
-        print("\nstep[{}]---------------".format(current_step))
-        elapsed_time_entry.data += 0.1
-        ddict.store(skip = 1)
-        parent_ctrl.step()
-        print(parent_ctrl.to_string())
-
-        child_ctrl.step()
-        print(child_ctrl.to_string())
 
+    def sequence() -> bool:
+        print("\nstep[{}]---------------".format(sched.tick_count - 1))
+        for ctrl in sched.order:
+            print(ctrl.to_string())
         if top_to_parent_cmd_obj.test(Commands.INIT) and parent_ctrl.rsp.test(Responses.DONE):
             top_to_parent_cmd_obj.set(Commands.RUN, 2)
         elif top_to_parent_cmd_obj.test(Commands.RUN) and parent_ctrl.rsp.test(Responses.DONE):
             top_to_parent_cmd_obj.set(Commands.TERMINATE, 3)
         elif top_to_parent_cmd_obj.test(Commands.TERMINATE) and parent_ctrl.rsp.test(Responses.DONE):
-            done = True
+            return True
+        return False
 
-        current_step += 1
+    sched.run(sequence)
     print("\nDataDictionary:\n{}".format(ddict.to_string()))
     ddict.to_excel("../../data/", "base-controller.xlsx")
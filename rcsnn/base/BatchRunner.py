@@ -0,0 +1,327 @@
+import contextlib
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, array_column_names
+from rcsnn.base.Scheduler import Scheduler
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class BatchRunner:
+    '''
+    The BatchRunner class runs many independent instances of a hierarchy, for Monte Carlo statistics, and collects
+    the results in one set of columns instead of a csv or xlsx file per run. Each run builds a fresh hierarchy with
+    the scenario function, seeds it with its own stream from np.random.SeedSequence(seed).spawn(n_runs), and runs it
+    with Scheduler.run() until done() returns True or max_ticks have run. Runs are spread over a process pool, and
+    whatever the controllers print is thrown away. The results are:
+
+    summary: one row per run, with the run number, the ticks it took, whether done() returned True, the seconds it
+    took, and the final value of each entry in summary_names
+
+    histories: one row per tick of every run, with the run number, the tick, and the value of each entry in
+    history_names at that tick (NaN or None where the entry has no sample)
+
+    ARRAY entries have one column per element, named like the csv columns. COMMAND and RESPONSE values are strings.
+    The scenario has to be a function at the top level of a module, such as rcsnn.nn_ext.bd_mon.make_scenario, so
+    the worker processes can import it
+
+    Attributes
+    ----------
+    scenario:Callable
+        Builds a hierarchy and returns (Scheduler, done), where done is the function to pass to Scheduler.run()
+    n_runs:int
+        The number of runs
+    seed:int
+        The seed that the stream for every run is derived from. Run i can be repeated on its own by seeding its
+        Scheduler with np.random.SeedSequence(seed).spawn(n_runs)[i]
+    workers:int
+        The number of worker processes. 0 runs everything in this process
+    max_ticks:int
+        The most ticks in a run
+    summary_names:List
+        The entries whose final value goes in the summary
+    history_names:List
+        The entries whose history goes in the histories
+    summary:Dict
+        The summary columns, by name. Set by run()
+    histories:Dict
+        The history columns, by name. Set by run()
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    run(self):
+        Runs the batch and collects the results
+    to_arrow(self) -> Tuple:
+        Returns the summary and histories as pyarrow Tables
+    write_parquet(self, summary_file:str, history_file:str):
+        Writes the summary and histories to Parquet files
+    to_string(self) -> str:
+        Returns the size of the batch and the columns collected
+    '''
+    scenario:Callable[[], Tuple[Scheduler, Callable[[], bool]]]
+    n_runs:int
+    seed:int
+    workers:int
+    max_ticks:int
+    summary_names:List[str]
+    history_names:List[str]
+    summary:Dict[str, np.ndarray]
+    histories:Dict[str, np.ndarray]
+
+    def __init__(self, scenario:Callable[[], Tuple[Scheduler, Callable[[], bool]]], n_runs:int, seed:int = 0,
+                 workers:int = 0, max_ticks:int = 1000, summary_names:List[str] = None,
+                 history_names:List[str] = None):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        scenario: Callable[[], Tuple[Scheduler, Callable[[], bool]]]
+            A top-level function that builds a hierarchy and returns its Scheduler and done() function
+        n_runs: int
+            The number of runs
+        seed: int = 0
+            The seed that the stream for every run is derived from
+        workers: int = 0
+            The number of worker processes. The default runs everything in this process
+        max_ticks: int = 1000
+            The most ticks in a run
+        summary_names: List[str] = None
+            The entries whose final value goes in the summary
+        history_names: List[str] = None
+            The entries whose history goes in the histories
+        """
+        if n_runs < 1:
+            raise ValueError("-------- ERROR -------- BatchRunner() n_runs must be at least 1, not {}".format(n_runs))
+        self.reset()
+        self.scenario = scenario
+        self.n_runs = n_runs
+        self.seed = seed
+        self.workers = workers
+        self.max_ticks = max_ticks
+        self.summary_names = [] if summary_names is None else list(summary_names)
+        self.history_names = [] if history_names is None else list(history_names)
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.summary = {}
+        self.histories = {}
+
+    def run(self):
+        """ Runs the batch and collects the results into summary and histories. Runs are handed to the workers in
+        chunks, and the results are put together in run order, so they don't depend on the number of workers
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.reset()
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_runs)
+        tasks = [(self.scenario, i, seeds[i], self.max_ticks, self.summary_names, self.history_names)
+                 for i in range(self.n_runs)]
+        if self.workers < 1:
+            results = [run_instance(task) for task in tasks]
+        else:
+            chunksize = max(1, self.n_runs // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(run_instance, tasks, chunksize=chunksize))
+        self.summary = join_columns([row for row, history in results], [1] * len(results))
+        self.histories = join_columns([history for row, history in results], [len(history["run"]) for row, history in results])
+
+    def to_arrow(self) -> Tuple[Any, Any]:
+        """ Returns the summary and histories as pyarrow Tables. Requires pyarrow
+
+        Parameters
+        ----------
+
+        :return: A (summary, histories) tuple of Tables
+        """
+        if pa is None:
+            raise ImportError("BatchRunner.to_arrow() requires pyarrow (pip install pyarrow)")
+        return pa.table(self.summary), pa.table(self.histories)
+
+    def write_parquet(self, summary_file:str, history_file:str = None):
+        """ Writes the summary and histories to Parquet files. Requires pyarrow
+
+        Parameters
+        ----------
+        summary_file: str
+            The path of the summary file
+        history_file: str = None
+            The path of the histories file. If None, the histories aren't written
+        :return:
+        """
+        summary, histories = self.to_arrow()
+        pq.write_table(summary, summary_file)
+        if history_file is not None:
+            pq.write_table(histories, history_file)
+
+    def to_string(self) -> str:
+        """ Returns the size of the batch and the columns collected
+
+        Parameters
+        ----------
+
+        :return: A string with the number of runs, the summary columns, and the number of history rows
+        """
+        history_rows = len(self.histories["run"]) if "run" in self.histories else 0
+        return "BatchRunner: {} runs (seed = {}, workers = {})\n\tsummary: {}\n\thistories: {} rows of {}".format(
+            self.n_runs, self.seed, self.workers, list(self.summary.keys()), history_rows, list(self.histories.keys()))
+
+
+def entry_columns(de:DictionaryEntry, values:np.ndarray) -> List[Tuple[str, np.ndarray]]:
+    """ Returns the columns for an entry's values: one column, or one per element for an ARRAY entry.
+    COMMAND and RESPONSE values are turned into strings
+
+    Parameters
+    ----------
+    de: DictionaryEntry
+        The entry
+    values: np.ndarray
+        Values of the entry, one per row
+    :return: A list of (name, column) tuples
+    """
+    t = de.get_type()
+    if t == DictionaryTypes.ARRAY:
+        flat = values.reshape(len(values), -1)
+        return list(zip(array_column_names(de.name, values.shape[1:]), flat.T))
+    if t == DictionaryTypes.COMMAND or t == DictionaryTypes.RESPONSE:
+        return [(de.name, np.array([None if v is None else str(v) for v in values], dtype=object))]
+    return [(de.name, values)]
+
+
+def align(ticks:np.ndarray, values:np.ndarray, first:int, n:int) -> np.ndarray:
+    """ Returns one value per tick for ticks first up to first + n, with NaN (or None) where there is no sample
+
+    Parameters
+    ----------
+    ticks: np.ndarray
+        The tick of each value
+    values: np.ndarray
+        The values
+    first: int
+        The first tick
+    n: int
+        The number of ticks
+    :return: An array of length n
+    """
+    if len(ticks) == n:
+        return np.array(values)
+    if values.dtype.kind in "biuf":
+        out = np.full(n, np.nan)
+    else:
+        out = np.full(n, None, dtype=object)
+    out[ticks - first] = values
+    return out
+
+
+def run_instance(task:Tuple) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    """ Builds and runs one instance of the scenario, with everything it prints thrown away. Runs in the worker
+    processes
+
+    Parameters
+    ----------
+    task: Tuple
+        (scenario, run, seed, max_ticks, summary_names, history_names)
+    :return: The summary row and the history columns of the run
+    """
+    scenario, run, seed, max_ticks, summary_names, history_names = task
+    t = time.perf_counter()
+    finished = [False]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        sched, done = scenario()
+        sched.seed(seed)
+
+        def check() -> bool:
+            finished[0] = done()
+            return finished[0]
+
+        ticks = sched.run(check, max_ticks=max_ticks)
+    ddict:DataDictionary = sched.ddict
+
+    row = {"run": run, "ticks": ticks, "done": finished[0], "secs": time.perf_counter() - t}
+    for name in summary_names:
+        de = ddict.get_entry(name)
+        if de.get_type() == DictionaryTypes.ARRAY:
+            values = np.asarray(de.stored_value())[np.newaxis]
+        else:
+            values = np.empty(1, dtype=object)
+            values[0] = de.stored_value()
+        for col_name, col in entry_columns(de, values):
+            row[col_name] = col[0]
+
+    entries = [ddict.get_entry(name) for name in history_names]
+    tick_lists = [de.history.ticks() for de in entries]
+    first = min([int(tl[0]) for tl in tick_lists if len(tl) > 0], default=0)
+    last = max([int(tl[-1]) for tl in tick_lists if len(tl) > 0], default=-1)
+    n = last - first + 1
+    history = {"run": np.full(n, run, dtype=np.int64), "tick": np.arange(first, last + 1, dtype=np.int64)}
+    for de, tl in zip(entries, tick_lists):
+        for col_name, col in entry_columns(de, de.data_list):
+            history[col_name] = align(tl, col, first, n)
+    return row, history
+
+
+def join_columns(parts:List[Dict[str, Any]], lengths:List[int]) -> Dict[str, np.ndarray]:
+    """ Joins the columns of each run into one set of columns. A column that a run doesn't have is filled with None
+
+    Parameters
+    ----------
+    parts: List[Dict[str, Any]]
+        The columns (or, for the summary, the single values) of each run, by name
+    lengths: List[int]
+        The number of rows in each run
+    :return: The joined columns, by name, in the order they were first seen
+    """
+    names = []
+    for part in parts:
+        for name in part.keys():
+            if name not in names:
+                names.append(name)
+    joined = {}
+    for name in names:
+        cols = []
+        for part, n in zip(parts, lengths):
+            if name not in part:
+                cols.append(np.full(n, None, dtype=object))
+            elif n == 1 and np.ndim(part[name]) == 0:
+                cols.append(np.array([part[name]], dtype=None if isinstance(part[name], (int, float, np.number)) else object))
+            else:
+                cols.append(np.asarray(part[name]))
+        joined[name] = np.concatenate(cols) if len(cols) > 0 else np.array([])
+    return joined
+
+
+if __name__ == "__main__":
+    from rcsnn.nn_ext.bd_mon import make_scenario
+
+    batch = BatchRunner(make_scenario, 200, seed=42, workers=4, max_ticks=100,
+                        summary_names=["elapsed-time", "target_pos"],
+                        history_names=["nav-heading", "RSP_ship-controller_to_board-monitor"])
+    t = time.perf_counter()
+    batch.run()
+    print("{} runs in {:.2f}s".format(batch.n_runs, time.perf_counter() - t))
+    print(batch.to_string())
+    for name in ["ticks", "target_pos_0_0", "target_pos_1_1"]:
+        col = batch.summary[name].astype(float)
+        print("\t{}: mean = {:.3f}, std = {:.3f}, min = {:.3f}, max = {:.3f}".format(name, col.mean(), col.std(), col.min(), col.max()))
+
+    # the same seed gives the same results, whatever the number of workers
+    again = BatchRunner(make_scenario, 20, seed=42, workers=0, max_ticks=100, summary_names=["target_pos"])
+    again.run()
+    print("repeatable: {}".format(np.array_equal(again.summary["target_pos_0_0"], batch.summary["target_pos_0_0"][:20])))
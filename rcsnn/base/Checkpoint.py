@@ -0,0 +1,373 @@
+import pickle
+import numpy as np
+from typing import Any, Dict
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.ResponseObject import ResponseObject
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes
+from rcsnn.base.DeltaHistory import DeltaHistory
+from rcsnn.base.SampledHistory import SampledHistory
+from rcsnn.base.MemmapHistory import MemmapHistory
+from rcsnn.base.CompressedHistory import CompressedHistory
+from rcsnn.base.SnapshotMatrix import SnapshotColumn
+
+# The fields of CommandObjects and ResponseObjects that are saved. They are read and written with getattr() and
+# setattr(), so objects whose fields are properties (like a SharedCommandObject) are saved the same way
+command_fields = ["serial", "cmd", "parentname", "childname", "new_command", "name"]
+response_fields = ["serial", "rsp", "parentname", "childname", "name"]
+
+
+class Checkpoint:
+    '''
+    The Checkpoint class saves a DataDictionary to a binary file and restores it, so a long simulation can be resumed
+    mid-run instead of replayed from tick 0. The file is an uncompressed NumPy .npz archive. Every history buffer is
+    one array in the archive, read back in one piece, and everything else (types, current values, the fields of
+    CommandObjects and ResponseObjects, counters, buffer positions) is a pickled header. Because the header is
+    pickled, only restore checkpoints you wrote yourself.
+
+    Controllers keep their own state (cur_state, clock) outside of the DataDictionary, so it is not part of the
+    checkpoint
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary to save or restore
+    arrays:Dict
+        The arrays to write, by key. Filled by save()
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    save(self, filename:str):
+        Writes the DataDictionary to a checkpoint file
+    restore(self, filename:str):
+        Loads a checkpoint file into the DataDictionary
+    '''
+    ddict:DataDictionary
+    arrays:Dict[str, np.ndarray]
+
+    def __init__(self, ddict:DataDictionary):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to save or restore
+        """
+        self.reset()
+        self.ddict = ddict
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.arrays = {}
+
+    def add_array(self, a:np.ndarray) -> str:
+        """ Queues an array to be written and returns its key in the archive
+
+        Parameters
+        ----------
+        a: np.ndarray
+            The array to write
+        :return: The key
+        """
+        key = "a{}".format(len(self.arrays))
+        self.arrays[key] = np.asarray(a)
+        return key
+
+    def buffer_state(self, hb:HistoryBuffer) -> Dict:
+        """ Returns the header for a HistoryBuffer, queuing its samples as an array
+
+        Parameters
+        ----------
+        hb: HistoryBuffer
+            The buffer to save
+        :return: A Dict of the buffer's configuration and position
+        """
+        return {"values":self.add_array(hb.view()), "shape":hb.shape, "capacity":hb.capacity,
+                "eviction":hb.eviction, "total":hb.total, "stride":hb.stride, "start_tick":hb.start_tick}
+
+    def make_buffer(self, state:Dict, npz:Any) -> HistoryBuffer:
+        """ Rebuilds a HistoryBuffer from its header and the archive, writing the samples in one bulk copy
+
+        Parameters
+        ----------
+        state: Dict
+            The header from buffer_state()
+        npz: NpzFile
+            The open archive
+        :return: The HistoryBuffer
+        """
+        v = npz[state["values"]]
+        n = len(v)
+        capacity = state["capacity"]
+        hb = HistoryBuffer(v.dtype, capacity, state["eviction"], state["shape"])
+        hb.buf[:n] = v
+        if hb.eviction == EvictionTypes.OVERWRITE:
+            # the oldest sample is written to slot 0, so the window starts there
+            hb.buf[capacity:capacity + n] = v
+            hb.pos = n % capacity
+        else:
+            hb.pos = n
+        hb.size = n
+        hb.total = state["total"]
+        hb.stride = state["stride"]
+        hb.start_tick = state["start_tick"]
+        return hb
+
+    def history_state(self, de:DictionaryEntry) -> Dict:
+        """ Returns the header for an entry's history, queuing its buffers as arrays
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to save
+        :return: A Dict with a "kind" that says which history class it is
+        """
+        h = de.history
+        if isinstance(h, SnapshotColumn):
+            return {"kind":"snapshot", "col":h.col, "start_tick":h.start_tick}
+        if isinstance(h, DeltaHistory):
+            return {"kind":"delta", "change_index":self.buffer_state(h.change_index),
+                    "values":self.buffer_state(h.values), "total":h.total, "start_tick":h.start_tick}
+        if isinstance(h, SampledHistory):
+            return {"kind":"sampled", "policy":h.policy, "index":self.buffer_state(h.index),
+                    "values":self.buffer_state(h.values), "total":h.total, "start_tick":h.start_tick}
+        if isinstance(h, MemmapHistory):
+            return {"kind":"memmap", "values":self.add_array(h.view()), "dtype":np.dtype(h.dtype).str,
+                    "filename":h.filename, "hot_window":h.hot_window, "start_tick":h.start_tick}
+        if isinstance(h, CompressedHistory):
+            # the sealed blocks are saved as they are, so nothing is decompressed
+            data = [data for count, data in h.blocks]
+            return {"kind":"compressed", "dtype":np.dtype(h.dtype).str, "block_size":h.block_size,
+                    "counts":[count for count, data in h.blocks], "lengths":[len(d) for d in data],
+                    "blocks":self.add_array(np.concatenate(data) if len(data) > 0 else np.zeros(0, dtype=np.uint8)),
+                    "open":self.add_array(h.open[:h.open_count]), "start_tick":h.start_tick}
+        return {"kind":"buffer", "buffer":self.buffer_state(h)}
+
+    def make_history(self, de:DictionaryEntry, state:Dict, npz:Any) -> Any:
+        """ Rebuilds an entry's history from its header and the archive. Snapshot columns are rebuilt by
+        restore()
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry the history belongs to
+        state: Dict
+            The header from history_state()
+        npz: NpzFile
+            The open archive
+        :return: The history
+        """
+        kind = state["kind"]
+        if kind == "delta":
+            values = self.make_buffer(state["values"], npz)
+            dh = DeltaHistory(values.dtype)
+            dh.change_index = self.make_buffer(state["change_index"], npz)
+            dh.values = values
+            dh.total = state["total"]
+            dh.prev = values.last()
+            dh.start_tick = state["start_tick"]
+            return dh
+        if kind == "sampled":
+            values = self.make_buffer(state["values"], npz)
+            sh = SampledHistory(state["policy"], values.dtype, clock=self.ddict.current_time)
+            # the constructor resets its copy of the policy, so put back the saved one
+            sh.policy = state["policy"]
+            sh.index = self.make_buffer(state["index"], npz)
+            sh.values = values
+            sh.total = state["total"]
+            sh.start_tick = state["start_tick"]
+            return sh
+        if kind == "memmap":
+            v = npz[state["values"]]
+            if self.ddict.memmap_dir is None:
+                # the saved file may still belong to a live dictionary, so it is never reused. Without a memmap_dir
+                # of its own, the entry keeps its history in memory
+                hb = HistoryBuffer(np.dtype(state.get("dtype", v.dtype)), max(1, len(v)), EvictionTypes.GROW)
+                hb.extend(v)
+                hb.start_tick = state["start_tick"]
+                return hb
+            mh = MemmapHistory(MemmapHistory.make_filename(self.ddict.memmap_dir, de.name),
+                               np.dtype(state.get("dtype", v.dtype)), state["hot_window"])
+            mh.extend(v)
+            mh.start_tick = state["start_tick"]
+            return mh
+        if kind == "compressed":
+            ch = CompressedHistory(np.dtype(state["dtype"]), state["block_size"])
+            data = npz[state["blocks"]]
+            offsets = np.concatenate([[0], np.cumsum(state["lengths"])]).astype(np.int64)
+            ch.blocks = [(count, data[offsets[i]:offsets[i + 1]]) for i, count in enumerate(state["counts"])]
+            v = npz[state["open"]]
+            ch.reserve(len(v))
+            ch.open[:len(v)] = v
+            ch.open_count = len(v)
+            ch.total = sum(state["counts"]) + len(v)
+            ch.start_tick = state["start_tick"]
+            return ch
+        return self.make_buffer(state["buffer"], npz)
+
+    def data_state(self, de:DictionaryEntry) -> Any:
+        """ Returns the current data of an entry in a form that can be pickled. CommandObjects and ResponseObjects
+        are saved as a Dict of their fields
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to save
+        :return: The data
+        """
+        if isinstance(de.data, CommandObject):
+            return {f:getattr(de.data, f) for f in command_fields}
+        if isinstance(de.data, ResponseObject):
+            return {f:getattr(de.data, f) for f in response_fields}
+        return de.data
+
+    def restore_data(self, de:DictionaryEntry, data:Any):
+        """ Sets the current data of an entry. CommandObjects and ResponseObjects that already exist are updated in
+        place, so the controllers that hold them see the restored serials and states
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to restore
+        data: Any
+            The data from data_state()
+        :return:
+        """
+        t = de.get_type()
+        if t == DictionaryTypes.COMMAND or t == DictionaryTypes.RESPONSE:
+            obj_class = CommandObject if t == DictionaryTypes.COMMAND else ResponseObject
+            if not isinstance(de.data, obj_class):
+                de.data = obj_class(data["parentname"], data["childname"])
+            for key, val in data.items():
+                setattr(de.data, key, val)
+        elif t == DictionaryTypes.ARRAY and isinstance(de.data, np.ndarray) and isinstance(data, np.ndarray) and \
+                de.data.shape == data.shape:
+            # controllers may hold the array and write it in place
+            de.data[...] = data
+        else:
+            de.data = data
+
+    def save(self, filename:str):
+        """ Writes the DataDictionary to a checkpoint file
+
+        Parameters
+        ----------
+        filename: str
+            The file to write. NumPy adds ".npz" if it doesn't end with it
+        :return:
+        """
+        self.reset()
+        dd = self.ddict
+        entries = []
+        de:DictionaryEntry
+        for de in dd.ddict.values():
+            entries.append({"name":de.name, "type":de.get_type().name, "master":de.master,
+                            "data":self.data_state(de), "history":self.history_state(de)})
+        snapshot = None
+        if dd.snapshot is not None:
+            snapshot = {}
+            for block_name in ["ints", "floats", "cats"]:
+                block = getattr(dd.snapshot, block_name)
+                snapshot[block_name] = {"matrix":self.buffer_state(block.matrix),
+                                        "names":[de.name for de in block.entries],
+                                        "categories":block.categories, "width":len(block.row)}
+        header = {"entries":entries, "snapshot":snapshot, "count":dd.count, "store_count":dd.store_count,
+                  "log_line":dd.log_line, "time_index":self.buffer_state(dd.time_index)}
+        self.arrays["header"] = np.frombuffer(pickle.dumps(header), dtype=np.uint8)
+        np.savez(filename, **self.arrays)
+        self.reset()
+
+    def restore(self, filename:str):
+        """ Loads a checkpoint file into the DataDictionary. Entries that already exist keep their
+        DictionaryEntry (and CommandObject or ResponseObject) objects, so controllers and EntryHandles that
+        refer to them stay valid. Entries that aren't in the checkpoint are removed. New entries are attached
+        to matching Subscriptions, the same as add_entry() does. The DataDictionary has to be in snapshot mode
+        if, and only if, the saved one was. Memmapped histories are written to new files in its memmap_dir, or
+        kept in memory if it doesn't have one
+
+        Parameters
+        ----------
+        filename: str
+            The checkpoint file
+        :return:
+        """
+        dd = self.ddict
+        with np.load(filename, allow_pickle=True) as npz:
+            header = pickle.loads(npz["header"].tobytes())
+            if (header["snapshot"] is None) != (dd.snapshot is None):
+                raise ValueError("-------- ERROR -------- Checkpoint.restore() {} was {}saved in snapshot mode".format(
+                    filename, "not " if header["snapshot"] is None else ""))
+            names = [e["name"] for e in header["entries"]]
+            for name in [name for name in dd.ddict.keys() if name not in names]:
+                dd.remove_entry(name)
+
+            entries = {}
+            added = []
+            for e in header["entries"]:
+                de = dd.ddict.get(e["name"])
+                if de is None or de.get_type().name != e["type"]:
+                    if de is not None:
+                        dd.match_subscriptions(de, False)
+                    de = DictionaryEntry(e["name"], DictionaryTypes[e["type"]], None, e["master"])
+                    added.append(de)
+                de.master = e["master"]
+                self.restore_data(de, e["data"])
+                if e["history"]["kind"] != "snapshot":
+                    de.history = self.make_history(de, e["history"], npz)
+                entries[de.name] = de
+            dd.ddict = entries
+
+            if header["snapshot"] is not None:
+                for block_name, state in header["snapshot"].items():
+                    block = getattr(dd.snapshot, block_name)
+                    block.matrix = self.make_buffer(state["matrix"], npz)
+                    block.entries = [entries[name] for name in state["names"]]
+                    block.row = np.zeros(state["width"], dtype=block.matrix.dtype)
+                    block.categories = list(state["categories"])
+                    block.category_codes = {v:i for i, v in enumerate(block.categories)}
+                for e in header["entries"]:
+                    h = e["history"]
+                    if h["kind"] == "snapshot":
+                        de = entries[e["name"]]
+                        de.history = SnapshotColumn(dd.snapshot_block(de), h["col"], h["start_tick"])
+
+            dd.count = header["count"]
+            dd.store_count = header["store_count"]
+            dd.log_line = header["log_line"]
+            dd.time_index = self.make_buffer(header["time_index"], npz)
+        dd.store_list = [de for de in entries.values() if not isinstance(de.history, SnapshotColumn)]
+        for name in list(dd.handles.keys()):
+            dd.update_handle(name)
+        for de in added:
+            dd.match_subscriptions(de, True)
+
+
+if __name__ == "__main__":
+    from rcsnn.base.Commands import Commands
+
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [(0, 0), (1, 1)]))
+    cmd_obj = CommandObject("parent", "child")
+    ddict.add_entry(DictionaryEntry(cmd_obj.name, DictionaryTypes.COMMAND, cmd_obj))
+    for i in range(1, 11):
+        ddict.get_entry("elapsed-time").data += 0.1
+        ddict.get_entry("test_int").data = i
+        if i == 5:
+            cmd_obj.set(Commands.RUN, cmd_obj.next_serial())
+        ddict.store(1)
+
+    Checkpoint(ddict).save("test_checkpoint.npz")
+    restored = DataDictionary()
+    Checkpoint(restored).restore("test_checkpoint.npz")
+    print(restored.to_string())
+    print(restored.get_entry(cmd_obj.name).data.to_string())
@@ -0,0 +1,269 @@
+import numpy as np
+from typing import Any, List, Tuple
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+class ColumnarWriter:
+    '''
+    The ColumnarWriter class exports the history in a DataDictionary to a Parquet or Arrow IPC (Feather v2) file.
+    The file has one row per tick and one column per entry, plus a "tick" column, and is written in chunks of
+    chunk_rows ticks, so analysis tools can read single columns without loading the whole file. ARRAY entries are
+    fixed-size list columns with the elements in row-major order, and the field's "shape" metadata holds the shape.
+    Requires pyarrow
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary to export
+    chunk_rows:int
+        The number of ticks in each row group (Parquet) or record batch (Arrow IPC)
+    names:List
+        The column names, starting with "tick". "elapsed-time" comes next if the DataDictionary has it
+    columns:List
+        (ticks, values, type) tuples for each entry column, in the same order as names[1:]
+    schema:pa.Schema
+        The schema of the file
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    collect(self):
+        Gathers the ticks and values of every entry's history and works out the schema
+    tick_range(self) -> Tuple:
+        Returns the first and last tick in any entry's history
+    chunk(self, start:int, stop:int) -> pa.RecordBatch:
+        Returns the rows for ticks start up to stop as a RecordBatch
+    chunks(self):
+        Yields a RecordBatch for each chunk_rows ticks
+    write_parquet(self, filename:str):
+        Writes the history to a Parquet file, one row group per chunk
+    write_feather(self, filename:str):
+        Writes the history to an Arrow IPC (Feather v2) file, one record batch per chunk
+    '''
+    ddict:DataDictionary
+    chunk_rows:int
+    names:List[str]
+    columns:List[Tuple[np.ndarray, np.ndarray, Any]]
+    schema:Any
+
+    def __init__(self, ddict:DataDictionary, chunk_rows:int = 65536):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to export
+        chunk_rows: int = 65536
+            The number of ticks in each row group or record batch
+        """
+        if pa is None:
+            raise ImportError("ColumnarWriter requires pyarrow (pip install pyarrow)")
+        self.reset()
+        self.ddict = ddict
+        self.chunk_rows = chunk_rows
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.names = []
+        self.columns = []
+        self.schema = None
+
+    def arrow_type(self, values:np.ndarray) -> Any:
+        """ Returns the Arrow type for a column of history values. Object columns that Arrow can't convert, or that
+        are all None, are written as strings. The (ticks, *shape) history of an ARRAY entry is a fixed-size list
+
+        Parameters
+        ----------
+        values: np.ndarray
+            The values in an entry's history
+        :return: A pyarrow DataType
+        """
+        if values.ndim > 1:
+            return pa.list_(pa.from_numpy_dtype(values.dtype), int(np.prod(values.shape[1:])))
+        if values.dtype != object:
+            return pa.from_numpy_dtype(values.dtype)
+        try:
+            t = pa.array(values, from_pandas=True).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+            return pa.string()
+        if pa.types.is_null(t):
+            return pa.string()
+        return t
+
+    def collect(self):
+        """ Gathers the ticks and values of every entry's history and works out the schema
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.reset()
+        names = list(self.ddict.ddict.keys())
+        if "elapsed-time" in names:
+            names.remove("elapsed-time")
+            names.insert(0, "elapsed-time")
+        fields = [pa.field("tick", pa.int64())]
+        de:DictionaryEntry
+        for name in names:
+            de = self.ddict.ddict[name]
+            values = de.data_list
+            t = self.arrow_type(values)
+            self.names.append(name)
+            self.columns.append((de.history.ticks(), values, t))
+            metadata = None
+            if values.ndim > 1:
+                metadata = {"shape": ",".join(map(str, values.shape[1:]))}
+            fields.append(pa.field(name, t, metadata=metadata))
+        self.names.insert(0, "tick")
+        self.schema = pa.schema(fields)
+
+    def tick_range(self) -> Tuple[int, int]:
+        """ Returns the first and last tick in any entry's history
+
+        Parameters
+        ----------
+
+        :return: A (first, last) tuple. If there is no history, last is less than first
+        """
+        first = self.ddict.store_count
+        last = -1
+        for ticks, values, t in self.columns:
+            if len(ticks) > 0:
+                first = min(first, int(ticks[0]))
+                last = max(last, int(ticks[-1]))
+        return first, last
+
+    def column_chunk(self, ticks:np.ndarray, values:np.ndarray, t:Any, start:int, stop:int) -> Any:
+        """ Returns one entry's values for ticks start up to stop as an Arrow array. Ticks the entry has no
+        sample for are null
+
+        Parameters
+        ----------
+        ticks: np.ndarray
+            The tick of each value
+        values: np.ndarray
+            The entry's history
+        t: pa.DataType
+            The Arrow type of the column
+        start: int
+            The first tick in the chunk
+        stop: int
+            One past the last tick in the chunk
+        :return: A pyarrow Array of length stop - start
+        """
+        i0 = np.searchsorted(ticks, start)
+        i1 = np.searchsorted(ticks, stop)
+        v = values[i0:i1]
+        if i1 - i0 < stop - start:
+            mask = np.ones(stop - start, dtype=bool)
+            idx = ticks[i0:i1] - start
+            mask[idx] = False
+            full = np.zeros((stop - start,) + values.shape[1:], dtype=values.dtype)
+            full[idx] = v
+            v = full
+        else:
+            mask = None
+        if v.ndim > 1:
+            # the whole block of arrays goes over as one flat buffer. The validity bitmap is built by hand, since
+            # FixedSizeListArray.from_arrays() only takes a mask in newer versions of pyarrow
+            flat = pa.array(v.reshape(-1), type=t.value_type)
+            validity = None if mask is None else pa.array(~mask, type=pa.bool_()).buffers()[1]
+            return pa.Array.from_buffers(t, stop - start, [validity], children=[flat])
+        if pa.types.is_string(t) and v.dtype == object:
+            v = np.array([None if x is None else str(x) for x in v], dtype=object)
+        if v.dtype == object:
+            if mask is not None:
+                v = v.copy()
+                v[mask] = None
+            return pa.array(v, type=t, from_pandas=True)
+        return pa.array(v, type=t, mask=mask)
+
+    def chunk(self, start:int, stop:int) -> Any:
+        """ Returns the rows for ticks start up to stop as a RecordBatch
+
+        Parameters
+        ----------
+        start: int
+            The first tick in the chunk
+        stop: int
+            One past the last tick in the chunk
+        :return: A pyarrow RecordBatch
+        """
+        arrays = [pa.array(np.arange(start, stop, dtype=np.int64))]
+        for ticks, values, t in self.columns:
+            arrays.append(self.column_chunk(ticks, values, t, start, stop))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def chunks(self):
+        """ Yields a RecordBatch for each chunk_rows ticks
+
+        Parameters
+        ----------
+        :return: A generator of pyarrow RecordBatches
+        """
+        first, last = self.tick_range()
+        for start in range(first, last + 1, self.chunk_rows):
+            yield self.chunk(start, min(start + self.chunk_rows, last + 1))
+
+    def write_parquet(self, filename:str):
+        """ Writes the history to a Parquet file, one row group per chunk
+
+        Parameters
+        ----------
+        filename: str
+            The path of the file to write
+        :return:
+        """
+        self.collect()
+        with pq.ParquetWriter(filename, self.schema) as writer:
+            for batch in self.chunks():
+                writer.write_table(pa.Table.from_batches([batch], schema=self.schema))
+
+    def write_feather(self, filename:str):
+        """ Writes the history to an Arrow IPC (Feather v2) file, one record batch per chunk
+
+        Parameters
+        ----------
+        filename: str
+            The path of the file to write
+        :return:
+        """
+        self.collect()
+        with pa.OSFile(filename, "wb") as sink:
+            with pa.ipc.new_file(sink, self.schema) as writer:
+                for batch in self.chunks():
+                    writer.write_batch(batch)
+
+
+if __name__ == "__main__":
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "Hello, world"))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros((2, 2))))
+    for i in range(1, 21):
+        ddict.get_entry("elapsed-time").data += 0.1
+        ddict.get_entry("test_int").data = i
+        ddict.get_entry("test_string").data = "str_{}".format(i)
+        ddict.get_entry("test_array").data[:] = i
+        if i == 10:
+            ddict.add_entry(DictionaryEntry("test_late", DictionaryTypes.FLOAT, 0.5))
+        ddict.store(1)
+
+    cw = ColumnarWriter(ddict, chunk_rows=8)
+    cw.write_parquet("test.parquet")
+    print(pq.read_table("test.parquet", columns=["tick", "test_late", "test_array"]).to_pandas())
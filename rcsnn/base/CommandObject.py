@@ -1,4 +1,5 @@
 from rcsnn.base.Commands import Commands
+from typing import Callable, List
 
 class CommandObject():
     '''
@@ -18,6 +19,8 @@ class CommandObject():
         A flag that indicates that this command has ben set but not acted on
     name:str
         The name of this command
+    listeners:List
+        Callables with no arguments that are called when set() changes the command. Used by DictionaryEntry observers
 
 
     Methods
@@ -41,6 +44,7 @@ class CommandObject():
     childname:str
     new_command:bool
     name:str
+    listeners:List[Callable]
 
     def __init__(self, parentname: str, childname: str):
         """ Constructor. Sets up this instance
@@ -54,6 +58,7 @@ class CommandObject():
         :return:
         """
         self.reset()
+        self.listeners = []
         self.parentname = parentname
         self.childname = childname
         self.name = "CMD_{}_to_{}".format(parentname, childname)
@@ -96,6 +101,8 @@ class CommandObject():
             self.new_command = True
             self.cmd = cmd
             self.serial = serial
+            for listener in self.listeners:
+                listener()
 
     def get(self) -> Commands:
         """ Get the current Commands enum
@@ -0,0 +1,554 @@
+import numpy as np
+from typing import Any, List, Tuple
+
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes, fits_dtype, fitting_types
+
+# The payload widths for a nonzero delta-of-delta in an INT block. The 3-bit code for each sample picks one
+dod_widths = np.array([2, 4, 7, 10, 16, 24, 40, 64], dtype=np.int64)
+
+
+def bit_length(x:np.ndarray) -> np.ndarray:
+    """ Returns the number of bits needed for each value, like int.bit_length()
+
+    Parameters
+    ----------
+    x: np.ndarray
+        A uint64 array
+    :return: An int64 array. Zero for values of zero
+    """
+    x = x.copy()
+    n = np.zeros(len(x), dtype=np.int64)
+    for k in [32, 16, 8, 4, 2, 1]:
+        big = (x >> np.uint64(k)) != 0
+        n += k * big
+        x[big] >>= np.uint64(k)
+    return n + (x != 0)
+
+
+def pack_fields(values:np.ndarray, widths:np.ndarray) -> np.ndarray:
+    """ Packs the low widths[i] bits of each value into one bitstream, most significant bit first
+
+    Parameters
+    ----------
+    values: np.ndarray
+        A uint64 array of field values
+    widths: np.ndarray
+        The width in bits (0 to 64) of each field
+    :return: A uint8 array of the packed bits, padded to a whole byte
+    """
+    shifts = np.arange(63, -1, -1, dtype=np.uint64)
+    bits = ((values[:, None] >> shifts) & np.uint64(1)).astype(np.uint8)
+    keep = np.arange(64)[None, :] >= (64 - widths)[:, None]
+    return np.packbits(bits[keep])
+
+
+def unpack_fields(data:np.ndarray, start:int, widths:np.ndarray) -> np.ndarray:
+    """ Reads consecutive fields from a bitstream written by pack_fields(). Every field is read at once: each one is
+    taken from the 9 bytes that hold it, so no field depends on the one before it
+
+    Parameters
+    ----------
+    data: np.ndarray
+        The uint8 bitstream, with at least 9 bytes of padding after the last field
+    start: int
+        The bit offset of the first field
+    widths: np.ndarray
+        The width in bits (0 to 64) of each field
+    :return: A uint64 array of the field values
+    """
+    n = len(widths)
+    if n == 0:
+        return np.zeros(0, dtype=np.uint64)
+    offsets = start + np.concatenate([[0], np.cumsum(widths[:-1])]).astype(np.int64)
+    window = data[(offsets >> 3)[:, None] + np.arange(9)]
+    hi = np.ascontiguousarray(window[:, :8]).view(">u8").ravel().astype(np.uint64)
+    s = (offsets & 7).astype(np.uint64)
+    v = (hi << s) | (window[:, 8].astype(np.uint64) >> (np.uint64(8) - s))
+    shift = np.minimum(64 - widths, 63).astype(np.uint64)
+    return np.where(widths == 0, np.uint64(0), v >> shift)
+
+
+def padded(data:np.ndarray) -> np.ndarray:
+    # unpack_fields() reads 9 bytes at every field offset
+    return np.concatenate([data, np.zeros(9, dtype=np.uint8)])
+
+
+def encode_xor(values:np.ndarray) -> np.ndarray:
+    """ Compresses float64 values by XORing each one with the one before it. Smooth or repeated values share their
+    sign, exponent and high mantissa bits, so the XOR is mostly zeros. A zero XOR takes 1 bit. Otherwise the
+    number of leading zeros (5 bits), the number of meaningful bits (6 bits) and the meaningful bits are written
+
+    Parameters
+    ----------
+    values: np.ndarray
+        At least one float64 value
+    :return: The block as a uint8 array
+    """
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xors = bits[1:] ^ bits[:-1]
+    changed = xors != 0
+    x = xors[changed]
+    lead = np.minimum(64 - bit_length(x), 31)
+    trail = bit_length(x & (~x + np.uint64(1))) - 1
+    length = 64 - lead - trail
+    headers = np.empty(2 * len(x), dtype=np.uint64)
+    headers[0::2] = lead
+    headers[1::2] = length - 1
+    fields = np.concatenate([bits[:1], changed.astype(np.uint64), headers, x >> trail.astype(np.uint64)])
+    widths = np.concatenate([[64], np.ones(len(xors), dtype=np.int64), np.tile([5, 6], len(x)), length])
+    return pack_fields(fields, widths)
+
+
+def decode_xor(data:np.ndarray, n:int) -> np.ndarray:
+    """ Decompresses a block written by encode_xor()
+
+    Parameters
+    ----------
+    data: np.ndarray
+        The block
+    n: int
+        The number of values in the block
+    :return: A float64 array
+    """
+    data = padded(data)
+    first = unpack_fields(data, 0, np.array([64]))
+    changed = unpack_fields(data, 64, np.ones(n - 1, dtype=np.int64)) != 0
+    m = int(changed.sum())
+    headers = unpack_fields(data, 64 + n - 1, np.tile([5, 6], m))
+    lead = headers[0::2].astype(np.int64)
+    length = headers[1::2].astype(np.int64) + 1
+    meaningful = unpack_fields(data, 64 + n - 1 + 11 * m, length)
+    xors = np.zeros(n, dtype=np.uint64)
+    xors[0] = first[0]
+    xors[1:][changed] = meaningful << (64 - lead - length).astype(np.uint64)
+    return np.bitwise_xor.accumulate(xors).view(np.float64)
+
+
+def encode_ints(values:np.ndarray) -> np.ndarray:
+    """ Compresses int64 values as delta-of-deltas. Counters and steadily changing values have a delta-of-delta
+    of zero, which takes 1 bit. Other values take a 3-bit width code and the zigzag-encoded delta-of-delta in
+    one of the dod_widths
+
+    Parameters
+    ----------
+    values: np.ndarray
+        At least one int64 value
+    :return: The block as a uint8 array
+    """
+    v = np.ascontiguousarray(values, dtype=np.int64)
+    if len(v) < 2:
+        return pack_fields(v.view(np.uint64), np.array([64]))
+    deltas = np.diff(v)
+    dod = np.diff(deltas)
+    zz = ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+    changed = zz != 0
+    z = zz[changed]
+    codes = np.searchsorted(dod_widths, bit_length(z))
+    fields = np.concatenate([v[:1].view(np.uint64), deltas[:1].view(np.uint64), changed.astype(np.uint64),
+                             codes.astype(np.uint64), z])
+    widths = np.concatenate([[64, 64], np.ones(len(zz), dtype=np.int64), np.full(len(z), 3), dod_widths[codes]])
+    return pack_fields(fields, widths)
+
+
+def decode_ints(data:np.ndarray, n:int) -> np.ndarray:
+    """ Decompresses a block written by encode_ints()
+
+    Parameters
+    ----------
+    data: np.ndarray
+        The block
+    n: int
+        The number of values in the block
+    :return: An int64 array
+    """
+    data = padded(data)
+    if n < 2:
+        return unpack_fields(data, 0, np.array([64])).view(np.int64)
+    head = unpack_fields(data, 0, np.array([64, 64])).view(np.int64)
+    changed = unpack_fields(data, 128, np.ones(n - 2, dtype=np.int64)) != 0
+    m = int(changed.sum())
+    codes = unpack_fields(data, 128 + n - 2, np.full(m, 3)).astype(np.int64)
+    z = unpack_fields(data, 128 + n - 2 + 3 * m, dod_widths[codes])
+    zz = np.zeros(n - 2, dtype=np.uint64)
+    zz[changed] = z
+    dod = (zz >> np.uint64(1)).view(np.int64) ^ -(zz & np.uint64(1)).view(np.int64)
+    steps = np.empty(n, dtype=np.int64)
+    steps[0] = head[0]
+    steps[1] = head[1]
+    steps[2:] = dod
+    # the first cumsum turns delta-of-deltas into deltas (after the first), the second turns deltas into values
+    steps[1:] = np.cumsum(steps[1:])
+    return np.cumsum(steps)
+
+
+def encode_floats(values:np.ndarray) -> np.ndarray:
+    """ Compresses a block of float64 values with whichever is smaller: encode_xor(), which is best for values that
+    repeat or change in a few bits, or encode_ints() on the bit patterns, which is best for steady ramps such as
+    elapsed-time. A ramp moves the bit pattern by a nearly constant number of steps, so its delta-of-delta is a
+    few bits even when each value's mantissa changes completely. The first byte says which was used
+
+    Parameters
+    ----------
+    values: np.ndarray
+        At least one float64 value
+    :return: The block as a uint8 array
+    """
+    v = np.ascontiguousarray(values, dtype=np.float64)
+    xor = encode_xor(v)
+    dod = encode_ints(v.view(np.int64))
+    if len(dod) < len(xor):
+        return np.concatenate([[1], dod]).astype(np.uint8)
+    return np.concatenate([[0], xor]).astype(np.uint8)
+
+
+def decode_floats(data:np.ndarray, n:int) -> np.ndarray:
+    """ Decompresses a block written by encode_floats()
+
+    Parameters
+    ----------
+    data: np.ndarray
+        The block
+    n: int
+        The number of values in the block
+    :return: A float64 array
+    """
+    if data[0] == 1:
+        return decode_ints(data[1:], n).view(np.float64)
+    return decode_xor(data[1:], n)
+
+
+# The (encoder, decoder) for each dtype that can be compressed
+codecs = {np.dtype(np.float64): (encode_floats, decode_floats), np.dtype(np.int64): (encode_ints, decode_ints)}
+
+
+class CompressedHistory:
+    '''
+    The CompressedHistory class keeps the history of an INT or FLOAT entry in compressed blocks. Samples are written
+    to an open block of block_size values. When it is full, it is sealed: INT blocks are delta-of-delta encoded, and
+    FLOAT blocks are XOR-encoded or delta-of-delta encoded on their bit patterns, whichever is smaller, all in the
+    style of Facebook's Gorilla. The open block is then reused. There is one
+    sample per tick, so ticks are not stored. Blocks are decompressed into NumPy when the history is read.
+
+    Unlike Gorilla, every field is read at a position that can be computed up front, so a block is decoded with
+    vectorized NumPy rather than bit by bit. This costs a few header bits per changed value
+
+    Attributes
+    ----------
+    dtype:Any
+        np.int64 or np.float64
+    block_size:int
+        The number of samples in each block
+    blocks:List
+        (count, data) tuples for the sealed blocks, oldest first. data is a uint8 array
+    open:np.ndarray
+        The samples that haven't been sealed yet. It starts small and doubles as samples arrive, up to block_size,
+        so an entry with a short history doesn't pay for a whole block
+    open_count:int
+        The number of samples in open
+    total:int
+        The number of samples
+    start_tick:int
+        The tick of the first append
+    eviction:str
+        Always "compressed". Nothing is ever evicted
+    capacity:int
+        The number of samples the sealed blocks and the open block have room for
+    cache:Tuple
+        The (total, values) of the last call to view(), so reading the history several times between appends only
+        decompresses it once
+    fitting:frozenset
+        The value types that always fit dtype, so append() only checks other types with fits_dtype()
+
+    Methods
+    -------
+    reset(self):
+        Empties the history
+    reserve(self, count:int):
+        Makes sure the open block has room for count samples
+    append(self, value:Any):
+        Writes a value into the open block, sealing it if it is full
+    extend(self, values:np.ndarray):
+        Appends an array of samples, sealing whole blocks directly from it
+    to_buffer(self) -> HistoryBuffer:
+        Returns an object HistoryBuffer with the same samples
+    seal(self):
+        Compresses the open block
+    block_values(self, i:int) -> np.ndarray:
+        Decompresses one sealed block
+    view(self) -> np.ndarray:
+        Returns all the samples, oldest first
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample
+    last(self) -> Any:
+        Returns the most recent sample
+    value_at(self, tick:int) -> Any:
+        Returns the sample at a tick, decompressing only the block that holds it
+    nbytes(self) -> int:
+        Returns the number of bytes used by the samples
+    '''
+    dtype:Any
+    block_size:int
+    blocks:List[Tuple[int, np.ndarray]]
+    open:np.ndarray
+    open_count:int
+    total:int
+    start_tick:int
+    eviction:str
+    cache:Any
+    fitting:frozenset
+
+    def __init__(self, dtype:Any = np.float64, block_size:int = 1024):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        dtype: Any = np.float64
+            np.int64 or np.float64
+        block_size: int = 1024
+            The number of samples in each block. Larger blocks compress a little better, but decompressing
+            one sample with value_at() decompresses its whole block
+        """
+        if np.dtype(dtype) not in codecs:
+            raise ValueError("-------- ERROR -------- CompressedHistory() can't compress dtype {}".format(np.dtype(dtype)))
+        self.dtype = np.dtype(dtype).type
+        self.fitting = fitting_types[np.dtype(dtype).kind]
+        self.block_size = block_size
+        self.eviction = "compressed"
+        self.start_tick = 0
+        self.reset()
+
+    @property
+    def capacity(self) -> int:
+        return self.total - self.open_count + self.block_size
+
+    def reset(self):
+        """ Empties the history
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.blocks = []
+        self.open = np.empty(min(16, self.block_size), dtype=self.dtype)
+        self.open_count = 0
+        self.total = 0
+        self.cache = None
+
+    def reserve(self, count:int):
+        """ Makes sure the open block has room for count samples, doubling it up to block_size
+
+        Parameters
+        ----------
+        count: int
+            The number of samples the open block has to hold. At most block_size
+        :return:
+        """
+        if count <= len(self.open):
+            return
+        size = len(self.open)
+        while size < count:
+            size *= 2
+        nb = np.empty(min(size, self.block_size), dtype=self.dtype)
+        nb[:self.open_count] = self.open[:self.open_count]
+        self.open = nb
+
+    def append(self, value:Any):
+        """ Writes a value into the open block, sealing it if it is full. A value that doesn't fit dtype (None, or a
+        fraction in an INT history) raises a ValueError, and an int out of range an OverflowError, before anything
+        is changed. DictionaryEntry.store() then falls back to to_buffer()
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        :return:
+        """
+        if type(value) not in self.fitting and not fits_dtype(value, self.dtype):
+            raise ValueError("-------- ERROR -------- CompressedHistory.append() {!r} can't be stored as {}".format(
+                value, np.dtype(self.dtype)))
+        if self.open_count == len(self.open):
+            self.reserve(self.open_count + 1)
+        self.open[self.open_count] = value
+        self.open_count += 1
+        self.total += 1
+        self.cache = None
+        if self.open_count == self.block_size:
+            self.seal()
+
+    def extend(self, values:np.ndarray):
+        """ Appends an array of samples. Whole blocks are compressed directly from the array. As with append(), a
+        ValueError is raised before anything is changed if any of the samples don't fit dtype
+
+        Parameters
+        ----------
+        values: np.ndarray
+            The samples to store, oldest first
+        :return:
+        """
+        values = np.asarray(values)
+        if not np.can_cast(values.dtype, self.dtype, "safe") and not all([fits_dtype(v, self.dtype) for v in values]):
+            raise ValueError("-------- ERROR -------- CompressedHistory.extend() the samples can't all be stored as {}".format(
+                np.dtype(self.dtype)))
+        i = 0
+        n = len(values)
+        encode = codecs[np.dtype(self.dtype)][0]
+        if self.open_count > 0:
+            i = min(n, self.block_size - self.open_count)
+            self.reserve(self.open_count + i)
+            self.open[self.open_count:self.open_count + i] = values[:i]
+            self.open_count += i
+            if self.open_count == self.block_size:
+                self.seal()
+        while n - i >= self.block_size:
+            self.blocks.append((self.block_size, encode(values[i:i + self.block_size].astype(self.dtype))))
+            i += self.block_size
+        self.reserve(n - i)
+        self.open[:n - i] = values[i:]
+        self.open_count += n - i
+        self.total += n
+        self.cache = None
+
+    def to_buffer(self) -> HistoryBuffer:
+        """ Returns an object HistoryBuffer with the same samples. Used when an entry has to store a value that
+        can't be compressed, the way a HistoryBuffer promotes
+
+        Parameters
+        ----------
+
+        :return: A GROW HistoryBuffer holding every sample
+        """
+        hb = HistoryBuffer(object, max(1, self.total), EvictionTypes.GROW)
+        hb.start_tick = self.start_tick
+        hb.extend(self.view().astype(object))
+        return hb
+
+    def seal(self):
+        """ Compresses the open block and adds it to the sealed blocks. Called when the open block is full
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.open_count == 0:
+            return
+        encode = codecs[np.dtype(self.dtype)][0]
+        self.blocks.append((self.open_count, encode(self.open[:self.open_count])))
+        self.open_count = 0
+
+    def block_values(self, i:int) -> np.ndarray:
+        """ Decompresses one sealed block
+
+        Parameters
+        ----------
+        i: int
+            The index of the block in blocks
+        :return: A new array of the block's samples
+        """
+        count, data = self.blocks[i]
+        return codecs[np.dtype(self.dtype)][1](data, count)
+
+    def view(self) -> np.ndarray:
+        """ Returns all the samples, oldest first. Unlike HistoryBuffer.view(), this is a new array, decompressed
+        from the sealed blocks
+
+        Parameters
+        ----------
+
+        :return: The samples
+        """
+        if self.cache is not None and self.cache[0] == self.total:
+            return self.cache[1]
+        parts = [self.block_values(i) for i in range(len(self.blocks))]
+        parts.append(self.open[:self.open_count])
+        v = np.concatenate(parts)
+        self.cache = (self.total, v)
+        return v
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view()
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        return self.start_tick + np.arange(self.total, dtype=np.int64)
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        return self.start_tick
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if there are none
+        """
+        if self.open_count > 0:
+            return self.open[self.open_count - 1]
+        if len(self.blocks) > 0:
+            return self.block_values(len(self.blocks) - 1)[-1]
+        return None
+
+    def value_at(self, tick:int) -> Any:
+        """ Returns the sample at a tick, decompressing only the block that holds it. Every sealed block but the
+        last one is full, so the block is found by division. Ticks after the last sample return the last sample,
+        the same as a DeltaHistory
+
+        Parameters
+        ----------
+        tick: int
+            The DataDictionary tick
+        :return: The value, or None if the tick is before the first sample
+        """
+        i = tick - self.start_tick
+        if i < 0 or self.total == 0:
+            return None
+        if i >= self.total:
+            return self.last()
+        sealed = self.total - self.open_count
+        if i >= sealed:
+            return self.open[i - sealed]
+        b = i // self.block_size
+        return self.block_values(b)[i - b * self.block_size]
+
+    def nbytes(self) -> int:
+        """ Returns the number of bytes used by the samples, compressed and open
+
+        Parameters
+        ----------
+
+        :return: The number of bytes
+        """
+        return sum(len(data) for count, data in self.blocks) + self.open.nbytes
+
+    def __len__(self) -> int:
+        return self.total
+
+    def to_string(self) -> str:
+        raw = self.total * np.dtype(self.dtype).itemsize
+        return "CompressedHistory (dtype = {}): {} samples in {} blocks, {} bytes ({:.1f}x)".format(
+            np.dtype(self.dtype), self.total, len(self.blocks), self.nbytes(), raw / max(1, self.nbytes()))
+
+
+if __name__ == "__main__":
+    t = np.arange(100000) * 0.1
+    for name, dtype, values in [("elapsed-time", np.float64, np.cumsum(np.full(100000, 0.1))),
+                                ("nav-heading", np.float64, np.round(np.sin(t / 50) * 180, 1)),
+                                ("step-count", np.int64, np.arange(100000) // 7),
+                                ("idle-output", np.float64, np.repeat(np.arange(100.0), 1000))]:
+        ch = CompressedHistory(dtype)
+        for v in values[:5000]:
+            ch.append(v)
+        ch.extend(values[5000:])
+        print("{}: {}, exact = {}".format(name, ch.to_string(), np.array_equal(ch.view(), values)))
@@ -0,0 +1,184 @@
+from operator import eq
+from typing import Any, Iterable
+
+
+class VersionedList(list):
+    '''
+    The VersionedList class is a list that counts its changes. Every method that changes the list adds one to
+    version, so a CopyOnWrite can tell that the list hasn't changed without comparing its elements. Changes to
+    the elements themselves (such as appending to a list inside the list) are not counted
+
+    Attributes
+    ----------
+    version:int
+        The number of changes made to the list
+
+    Methods
+    -------
+    touch(self):
+        Counts a change. Call after changing an element in a way the list can't see
+    '''
+    __slots__ = ["version"]
+    version:int
+
+    def __init__(self, values:Iterable = ()):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        values: Iterable = ()
+            The initial elements
+        """
+        super().__init__(values)
+        self.version = 0
+
+    def touch(self):
+        """ Counts a change. Call after changing an element in a way the list can't see, such as changing an
+        element that is itself mutable
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.version += 1
+
+    def __reduce__(self) -> Any:
+        # copies and pickles are built from the elements, since unpickling would otherwise call extend() before
+        # version is set
+        return VersionedList, (list(self),)
+
+    def __setitem__(self, key:Any, value:Any):
+        self.version += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key:Any):
+        self.version += 1
+        super().__delitem__(key)
+
+    def __iadd__(self, values:Iterable) -> "VersionedList":
+        self.version += 1
+        return super().__iadd__(values)
+
+    def __imul__(self, n:int) -> "VersionedList":
+        self.version += 1
+        return super().__imul__(n)
+
+    def append(self, value:Any):
+        self.version += 1
+        super().append(value)
+
+    def extend(self, values:Iterable):
+        self.version += 1
+        super().extend(values)
+
+    def insert(self, index:int, value:Any):
+        self.version += 1
+        super().insert(index, value)
+
+    def pop(self, index:int = -1) -> Any:
+        self.version += 1
+        return super().pop(index)
+
+    def remove(self, value:Any):
+        self.version += 1
+        super().remove(value)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+    def sort(self, *args, **kwargs):
+        self.version += 1
+        super().sort(*args, **kwargs)
+
+    def reverse(self):
+        self.version += 1
+        super().reverse()
+
+
+class CopyOnWrite:
+    '''
+    The CopyOnWrite class takes the snapshots of a mutable value that go into a DictionaryEntry's history. A list is
+    stored as a tuple of its elements, so changing the list in place afterwards can't change the history. A new
+    tuple is only made when the list has changed. Otherwise the previous tuple is stored again, so ticks where
+    nothing changed share one snapshot. For a VersionedList, "changed" is one comparison of version counters. For
+    a plain list, the elements are compared with the previous snapshot, and the list is only copied if one of them
+    differs. Snapshots are shallow, so the elements
+    should be immutable (numbers, strings, tuples)
+
+    Attributes
+    ----------
+    source:Any
+        The value the last snapshot was taken of
+    version:int
+        The version of source when the last snapshot was taken, if it is a VersionedList
+    frozen:Any
+        The last snapshot
+
+    Methods
+    -------
+    reset(self):
+        Forgets the last snapshot
+    take(self, value:Any) -> Any:
+        Returns an immutable snapshot of the value, reusing the last one if the value hasn't changed
+    '''
+    __slots__ = ["source", "version", "frozen"]
+    source:Any
+    version:int
+    frozen:Any
+
+    def __init__(self):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        """
+        self.reset()
+
+    def reset(self):
+        """ Forgets the last snapshot
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.source = None
+        self.version = -1
+        self.frozen = None
+
+    def take(self, value:Any) -> Any:
+        """ Returns an immutable snapshot of the value, reusing the last one if the value hasn't changed. Values
+        that aren't lists are returned as they are
+
+        Parameters
+        ----------
+        value: Any
+            The current value of the entry
+        :return: A tuple of the list's elements, or the value itself
+        """
+        if not isinstance(value, list):
+            return value
+        if isinstance(value, VersionedList):
+            if value is self.source and value.version == self.version:
+                return self.frozen
+            self.version = value.version
+            frozen = tuple(value)
+        else:
+            frozen = self.frozen
+            if frozen is None or len(value) != len(frozen) or not all(map(eq, value, frozen)):
+                frozen = tuple(value)
+        self.source = value
+        self.frozen = frozen
+        return frozen
+
+
+if __name__ == "__main__":
+    cow = CopyOnWrite()
+    vl = VersionedList([(0, 0), (1, 1)])
+    history = []
+    for i in range(6):
+        if i % 3 == 0:
+            vl[0] = (i, i)
+        history.append(cow.take(vl))
+    print("history = {}".format(history))
+    print("distinct snapshots = {}".format(len(set(id(h) for h in history))))
@@ -0,0 +1,211 @@
+import numpy as np
+from typing import Any, List, Tuple, TextIO, Union
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, array_column_names
+
+
+class CsvLogger:
+    '''
+    The CsvLogger class writes the current values in a DataDictionary to a csv file once per call to log(). Unlike
+    DataDictionary.log_to_csv(), it keeps the file open, works out the columns once, and writes rows in batches.
+    Entries added to the DataDictionary after the first call to log() are not logged
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary to log
+    filename:str
+        The name of the logfile
+    skip:int
+        The number of calls to log() per row written. The default is 1, which writes out everything
+    batch_size:int
+        The number of rows to hold before writing them to the file
+    log_line:int
+        The number of times log() has been called
+    columns:List
+        (DictionaryEntry, is_list) tuples, in column order. is_list is True for LIST and ARRAY entries. Set on the
+        first call to log()
+    header:List
+        The column names, with LIST and ARRAY entries expanded to one column per element
+    rows:List
+        Formatted rows that have not been written yet
+    f:TextIO
+        The open logfile, or None if it has not been opened or has been closed
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    open(self):
+        Opens the file, clearing anything that was in it, and writes the header
+    snapshot(self) -> List:
+        Returns the current values of the logged entries, with LIST and ARRAY entries expanded
+    log(self):
+        If log_line % skip == 0, adds a row with the current values
+    write_values(self, log_line:int, values:List):
+        Formats a row of values and queues it for writing
+    flush(self):
+        Writes any queued rows to the file
+    close(self):
+        Writes any queued rows and closes the file
+    '''
+    ddict:DataDictionary
+    filename:str
+    skip:int
+    batch_size:int
+    log_line:int
+    columns:List[Tuple[DictionaryEntry, bool]]
+    header:List[str]
+    rows:List[str]
+    f:Union[TextIO, None]
+
+    def __init__(self, ddict:DataDictionary, filename:str, skip:int = 1, batch_size:int = 100):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to log
+        filename: str
+            The name of the logfile
+        skip: int = 1
+            The number of calls to log() per row written
+        batch_size: int = 100
+            The number of rows to hold before writing them to the file. Set to 1 to write every row as it's logged
+        """
+        self.reset()
+        self.ddict = ddict
+        self.filename = filename
+        self.skip = skip
+        self.batch_size = batch_size
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.log_line = 0
+        self.columns = []
+        self.header = []
+        self.rows = []
+        self.f = None
+
+    def open(self):
+        """ Opens the file, clearing anything that was in it, and writes the header. The LIST entries are expanded
+        to as many columns as they have elements now. ARRAY entries are expanded to one column per element of
+        their declared shape
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.columns = []
+        self.header = ["log_line"]
+        de:DictionaryEntry
+        for key, de in self.ddict.ddict.items():
+            if de.get_type() == DictionaryTypes.LIST:
+                self.columns.append((de, True))
+                self.header.extend(["{}_{}".format(key, i) for i in range(len(de.get_data()))])
+            elif de.get_type() == DictionaryTypes.ARRAY:
+                self.columns.append((de, True))
+                self.header.extend(array_column_names(key, de.history.shape))
+            else:
+                self.columns.append((de, False))
+                self.header.append(key)
+        self.f = open(self.filename, mode="w")
+        self.f.write(", ".join(self.header) + ", \n")
+
+    def snapshot(self) -> List:
+        """ Returns the current values of the logged entries, with LIST and ARRAY entries expanded. ARRAY values
+        are copied out in one call, so the list doesn't change if the array is changed in place later
+
+        Parameters
+        ----------
+
+        :return: A list of values in column order
+        """
+        values = []
+        for de, is_list in self.columns:
+            if is_list:
+                d = de.get_data()
+                values.extend(d.ravel().tolist() if isinstance(d, np.ndarray) else d)
+            else:
+                values.append(de.get_data())
+        return values
+
+    def log(self):
+        """ If log_line % skip == 0, adds a row with the current values. Opens the file on the first call
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.f is None:
+            self.open()
+        if (self.log_line % self.skip) == 0:
+            self.write_values(self.log_line, self.snapshot())
+        self.log_line += 1
+
+    def write_values(self, log_line:int, values:List):
+        """ Formats a row of values and queues it for writing. The rows are written when batch_size is reached
+
+        Parameters
+        ----------
+        log_line: int
+            The value for the log_line column
+        values: List
+            The values, as returned by snapshot()
+        :return:
+        """
+        self.rows.append("{}, {}, \n".format(log_line, ", ".join(map(str, values))))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """ Writes any queued rows to the file
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.f is not None and len(self.rows) > 0:
+            self.f.write("".join(self.rows))
+            self.f.flush()
+        self.rows = []
+
+    def close(self):
+        """ Writes any queued rows and closes the file
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.f is not None:
+            self.flush()
+            self.f.close()
+            self.f = None
+
+    def __enter__(self) -> "CsvLogger":
+        return self
+
+    def __exit__(self, exc_type:Any, exc_val:Any, exc_tb:Any):
+        self.close()
+
+
+if __name__ == "__main__":
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [1, 2, 3]))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros(2)))
+
+    with CsvLogger(ddict, "testlog.csv", skip=2, batch_size=4) as logger:
+        for i in range(1, 21):
+            ddict.get_entry("test_int").data = i
+            ddict.get_entry("test_list").data = [i, i+1, i+2]
+            ddict.get_entry("test_array").data[:] = [i/10, -i/10]
+            ddict.store(1)
+            logger.log()
+    with open("testlog.csv") as f:
+        print(f.read())
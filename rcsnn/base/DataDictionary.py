@@ -1,10 +1,26 @@
 import os
 import sys
+import copy
+import json
+import fnmatch
 from enum import Enum
 import time
+import shutil
+import tempfile
+from operator import attrgetter
+from functools import lru_cache
 import numpy as np
 import pandas as pd
-from typing import Any, List, Dict, Union
+from typing import Any, List, Dict, Union, Callable, Tuple, Iterable, TextIO
+
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes
+from rcsnn.base.SnapshotMatrix import SnapshotMatrix, SnapshotColumn
+from rcsnn.base.MemmapHistory import MemmapHistory
+from rcsnn.base.DeltaHistory import DeltaHistory
+from rcsnn.base.SampledHistory import SampledHistory
+from rcsnn.base.SamplingPolicy import SamplingPolicy
+from rcsnn.base.CopyOnWrite import CopyOnWrite, VersionedList
+from rcsnn.base.CompressedHistory import CompressedHistory
 
 
 class DictionaryTypes(Enum):
@@ -13,10 +29,83 @@ class DictionaryTypes(Enum):
     FLOAT = "float"
     STRING = "string"
     LIST = "list"
+    ARRAY = "array"
     COMMAND = "cmd"
     RESPONSE = "rsp"
 
 
+# The NumPy dtype used to store the history of each DictionaryType. Anything not listed is stored as an object
+history_dtypes = {DictionaryTypes.INT: np.int64, DictionaryTypes.FLOAT: np.float64}
+
+# How get_data() and store() turn the data of each DictionaryType into a value. Anything not listed uses the data as-is
+value_getters = {DictionaryTypes.COMMAND: attrgetter("cmd"), DictionaryTypes.RESPONSE: attrgetter("rsp")}
+
+# The DictionaryTypes whose values can be changed in place, and so are stored as CopyOnWrite snapshots
+value_snapshots = {DictionaryTypes.LIST: CopyOnWrite}
+
+# (history dtype, value getter) for each DictionaryType, so that a new entry only needs one lookup
+type_info = {dt: (history_dtypes.get(dt, object), value_getters.get(dt)) for dt in DictionaryTypes}
+
+# DictionaryEntry.first until the entry has a value to store when its history is created
+no_value = object()
+
+
+@lru_cache(maxsize=None)
+def history_spec(dtype:Any, capacity:int, eviction:str, shape:Tuple) -> Tuple:
+    # the (dtype, capacity, eviction, shape) a history is created with, shared by all the entries that use it
+    return dtype, capacity, eviction, shape
+
+# The DictionaryType for each name, as used in to_dict() and set_entry_from_dict()
+type_names = {dt.name: dt for dt in DictionaryTypes}
+
+
+def values_equal(a:Any, b:Any) -> bool:
+    """ Compares two entry values. ARRAY values are equal if they have the same shape and elements
+
+    Parameters
+    ----------
+    a: Any
+        The first value
+    b: Any
+        The second value
+    :return: True if the values are equal
+    """
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b)
+    return a == b
+
+
+def copy_value(value:Any) -> Any:
+    """ Returns a copy of an entry value that won't change when the entry's list or array is changed in place.
+    Other values are returned as they are
+
+    Parameters
+    ----------
+    value: Any
+        The value to copy
+    :return: The copy
+    """
+    if isinstance(value, (list, np.ndarray)):
+        return copy.copy(value)
+    return value
+
+
+def array_column_names(name:str, shape:Tuple) -> List[str]:
+    """ Returns the column names for an ARRAY entry when it is written one element per column, in the same
+    (row-major) order as ndarray.ravel(). An entry "pos" with shape (2, 2) has the columns pos_0_0, pos_0_1, pos_1_0
+    and pos_1_1
+
+    Parameters
+    ----------
+    name: str
+        The name of the entry
+    shape: Tuple
+        The shape of the entry's values
+    :return: A list of column names
+    """
+    return ["{}_{}".format(name, "_".join(map(str, index))) for index in np.ndindex(*shape)]
+
+
 class DictionaryEntry:
     '''
     The DictionaryEntry class creates a data entry that all controllers use to communicate and current and historical
@@ -25,15 +114,36 @@ class DictionaryEntry:
     Attributes
     ----------
     type:DictionaryTypes
-        The type of data this is. Can be a simple type like and INT or a FLOAT, or something more complex like COMMAND or RESPONSE
+        The type of data this is. Can be a simple type like and INT or a FLOAT, or something more complex like COMMAND or RESPONSE.
+        ARRAY entries hold a NumPy array with a fixed dtype and shape, and their history is one (ticks, *shape) array
     name:str
         The name of this value
     master:bool
-        A flag that indicates if this value comes from another dictionary. If it does, we sync to the master whenever possible
+        A flag that indicates if this value comes from another dictionary. If it does, we sync to the master whenever
+        possible. A DictionaryReplica creates entries with master = False, and never overwrites entries with master = True
     data:Any
         The data stored in this entry
-    data_list:List
-        A list of historical values. May be a sampling of the values to save space
+    history:HistoryBuffer
+        The typed buffer that holds the historical values. May be a sampling of the values to save space. It is
+        created the first time it is used, so an entry that is never stored doesn't allocate one
+    spec:Tuple
+        Until the history is created, the (dtype, capacity, eviction, shape) it will be created with. None afterwards
+    first:Any
+        Until the history is created, the value stored at construction, which becomes the first sample, or no_value
+        if there was none. None afterwards
+    getter:Callable
+        Turns data into the value returned by get_data() and stored by store(). Set when the type is set, so
+        the type doesn't have to be checked on every call. None if data is used as-is
+    cow:CopyOnWrite
+        For LIST entries, takes the snapshots that store() puts in the history, so changing the list in place
+        doesn't change past samples. A VersionedList makes an unchanged list cost one comparison. None otherwise
+    verbose:bool
+        Class-wide flag. If True, print a line whenever an entry is constructed. The default is False
+    data_list:np.ndarray
+        A read-only view of the historical values in the history, oldest first
+    observers:List
+        The callbacks that are called with this entry when set_data(), or a set() on its CommandObject or
+        ResponseObject, changes the value. None if there are none, so entries nobody watches pay nothing
 
     Methods
     -------
@@ -47,18 +157,46 @@ class DictionaryEntry:
         Returns the type of this entry
     store(self):
         Saves the current value. If it's a COMMAND or RESPONSE, return the string value
+    stored_value(self) -> Any:
+        Returns the value that store() puts in the history
     to_string(self, num_history:int=10) -> str:
         Returns a string with the name, type, value, and last n values from the history
     to_dict(self) -> Dict:
         Returns a Dict with the name, type, and current value
+    set_history(self, capacity:int, eviction:str):
+        Replaces the history with one that has a different capacity and eviction policy, keeping the stored values
+    set_delta_history(self):
+        Replaces the history with a DeltaHistory that only records changes, keeping the stored values
+    set_compressed_history(self, block_size:int = 1024):
+        Replaces the history with a CompressedHistory, keeping the stored values
+    set_sampling(self, policy:SamplingPolicy, clock:Callable = None):
+        Replaces the history with a SampledHistory that keeps the samples chosen by the policy
+    value_at(self, tick:int) -> Any:
+        Returns the value that was stored at a DataDictionary tick
+    add_observer(self, callback:Callable):
+        Adds a callback that is called with this entry whenever its value changes
+    remove_observer(self, callback:Callable):
+        Removes a callback added with add_observer()
+    notify(self):
+        Calls every observer with this entry
+    make_history(self) -> HistoryBuffer:
+        Creates the history from spec
     '''
-    type:DictionaryTypes
+    __slots__ = ["entry_type", "name", "master", "data", "hist", "spec", "first", "getter", "cow", "observers"]
+    entry_type:DictionaryTypes
     name:str
     master:bool  # or slave if from another dictionary
     data:Any
-    data_list:List
-
-    def __init__(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True):
+    hist:Union[HistoryBuffer, None]
+    spec:Union[Tuple, None]
+    first:Any
+    getter:Union[Callable, None]
+    cow:Union[CopyOnWrite, None]
+    observers:Union[List[Callable], None]
+    verbose = False
+
+    def __init__(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True,
+                 capacity:int = 16, eviction:str = EvictionTypes.GROW, dtype:Any = None, shape:Tuple = None):
         """Constructor: Sets up the basic components of the class
 
         Parameters
@@ -71,16 +209,78 @@ class DictionaryEntry:
             The data stored in this entry
         master:bool
             A flag that indicates if this value comes from another dictionary. If it does, we sync to the master whenever possible
+        capacity:int = 16
+            The number of history samples to preallocate. For EvictionTypes.OVERWRITE and DECIMATE, this is also the maximum
+        eviction:str = EvictionTypes.GROW
+            What the history does when it is full. The default grows the buffer so that no history is lost
+        dtype:Any = None
+            ARRAY only. The NumPy dtype of the array. The default is the dtype of data, or float64 if there is no data
+        shape:Tuple = None
+            ARRAY only. The shape of the array. The default is the shape of data, or a scalar if there is no data
         """
-        print("DataDictionary: adding name='{}' type = '{}'".format(name, type))
-        self.reset()
-        self.type = type
+        if DictionaryEntry.verbose:
+            print("DataDictionary: adding name='{}' type = '{}'".format(name, type))
+        sample_shape = ()
+        if type == DictionaryTypes.ARRAY:
+            # the entry gets its own copy, so the caller's array can't change the stored value behind its back
+            if data is not None:
+                data = np.array(data, dtype=dtype)
+                if shape is not None and data.shape != tuple(shape):
+                    raise ValueError("-------- ERROR -------- DictionaryEntry() {} has shape {}, not {}".format(
+                        name, data.shape, tuple(shape)))
+                dtype = data.dtype
+                shape = data.shape
+            sample_shape = () if shape is None else tuple(shape)
+            self.getter = None
+            if dtype is None:
+                dtype = np.float64
+        else:
+            dtype, self.getter = type_info.get(type, (object, None))
+        self.cow = CopyOnWrite() if type in value_snapshots else None
+        self.observers = None
+        self.entry_type = type
         self.name = name
         self.data = data
         self.master = master
-        self.data_list = []
-        if data != None:
-            self.store() # store the first entry
+        self.hist = None
+        self.spec = history_spec(dtype, capacity, eviction, sample_shape)
+        self.first = no_value
+        if data is not None:
+            if type == DictionaryTypes.ARRAY:
+                # the array can be changed in place before the history exists, so its first sample is written now
+                self.store()
+            else:
+                # store the first entry when the history is created. The value can't change behind its back: scalars,
+                # strings and LIST snapshots don't change, and other values are stored by reference anyway
+                self.first = self.stored_value()
+
+    @property
+    def history(self) -> HistoryBuffer:
+        h = self.hist
+        if h is None:
+            h = self.make_history()
+        return h
+
+    @history.setter
+    def history(self, history:HistoryBuffer):
+        self.hist = history
+        self.spec = None
+        self.first = None
+
+    def make_history(self) -> HistoryBuffer:
+        """ Creates the history from spec, storing the value the entry was constructed with, if there was one
+
+        Parameters
+        ----------
+
+        :return: The new history
+        """
+        dtype, capacity, eviction, shape = self.spec
+        h = HistoryBuffer(dtype, capacity, eviction, shape)
+        if self.first is not no_value:
+            h.append(self.first)
+        self.history = h
+        return h
 
     def reset(self):
         """ Resets all the global values for this class
@@ -92,17 +292,178 @@ class DictionaryEntry:
         self.type = None
         self.name = "unset"
         self.data = None
-        self.data_list = []
+        self.history = HistoryBuffer()
+        self.observers = None
+
+    @property
+    def type(self) -> DictionaryTypes:
+        return self.entry_type
+
+    @type.setter
+    def type(self, type:DictionaryTypes):
+        self.entry_type = type
+        self.getter = value_getters.get(type)
+        self.cow = CopyOnWrite() if type in value_snapshots else None
+
+    @property
+    def data_list(self) -> np.ndarray:
+        """ A read-only view of the stored values, oldest first. Kept so code written against the original
+        list-based history still works
+
+        Parameters
+        ----------
+
+        :return: A NumPy view of the history that can't be written to
+        """
+        # a new view, so that the history's own arrays stay writeable
+        values = self.history.view().view()
+        values.flags.writeable = False
+        return values
+
+    def set_history(self, capacity:int, eviction:str):
+        """ Replaces the history with one that has a different capacity and eviction policy, keeping the stored values
+
+        Parameters
+        ----------
+        capacity:int
+            The number of samples to preallocate. For EvictionTypes.OVERWRITE and DECIMATE, this is also the maximum
+        eviction:str
+            One of the EvictionTypes
+        :return:
+        """
+        hb = HistoryBuffer(self.history.dtype, capacity, eviction, getattr(self.history, "shape", ()))
+        hb.copy_from(self.history)
+        self.history = hb
+
+    def set_delta_history(self):
+        """ Replaces the history with a DeltaHistory that only records changes, keeping the stored values
+
+        Parameters
+        ----------
+        :return:
+        """
+        dh = DeltaHistory(self.history.dtype)
+        dh.start_tick = self.history.first_tick()
+        dh.extend(self.history.view())
+        self.history = dh
+
+    def set_compressed_history(self, block_size:int = 1024):
+        """ Replaces the history with a CompressedHistory, keeping the stored values. Only INT and FLOAT entries
+        can be compressed. If some of the stored values don't fit the entry's dtype (such as None), the history is
+        left as it is
+
+        Parameters
+        ----------
+        block_size:int = 1024
+            The number of samples in each compressed block
+        :return:
+        """
+        ch = CompressedHistory(history_dtypes.get(self.entry_type, self.history.dtype), block_size)
+        ch.start_tick = self.history.first_tick()
+        try:
+            ch.extend(self.history.view())
+        except (ValueError, OverflowError):
+            # some of the stored values can't be compressed, so the entry keeps its history
+            return
+        self.history = ch
+
+    def set_sampling(self, policy:SamplingPolicy, clock:Callable = None):
+        """ Replaces the history with a SampledHistory that keeps the samples chosen by the policy. The values that
+        have already been stored are passed through the policy
+
+        Parameters
+        ----------
+        policy: SamplingPolicy
+            The policy. The history works with its own copy
+        clock: Callable = None
+            Returns the current elapsed-time. Needed by time-based policies
+        :return:
+        """
+        sh = SampledHistory(policy, self.history.dtype, clock=clock)
+        sh.start_tick = self.history.first_tick()
+        for v in self.history.view():
+            sh.append(v)
+        self.history = sh
+
+    def value_at(self, tick:int) -> Any:
+        """ Returns the value that was stored at a DataDictionary tick. If the history has been decimated or sampled,
+        this is the most recent sample at or before the tick
+
+        Parameters
+        ----------
+        tick: int
+            The DataDictionary tick (the value of store_count when the value was stored)
+        :return: The stored value, or None if the tick is before the oldest sample
+        """
+        if isinstance(self.history, (DeltaHistory, CompressedHistory)):
+            return self.history.value_at(tick)
+        i = np.searchsorted(self.history.ticks(), tick, side="right") - 1
+        if i < 0:
+            return None
+        return self.history.view()[i]
 
     def set_data(self, data:Any):
-        """ Sets the current data value
+        """ Sets the current data value. If the entry has observers and the value changes, they are notified.
+        ARRAY values are not copied, so as with LIST values, an array that is changed in place won't be seen as a change
 
         Parameters
         ----------
         data: The current value for this entry
         :return:
         """
+        if self.observers is None:
+            self.data = data
+            return
+        old = self.get_data()
         self.data = data
+        if not values_equal(self.get_data(), old):
+            self.notify()
+
+    def add_observer(self, callback:Callable):
+        """ Adds a callback that is called with this entry whenever set_data() changes its value. For COMMAND and
+        RESPONSE entries, it is also called when the CommandObject or ResponseObject is set
+
+        Parameters
+        ----------
+        callback: Callable
+            Called as callback(entry)
+        :return:
+        """
+        if self.observers is None:
+            self.observers = []
+        self.observers.append(callback)
+        listeners = getattr(self.data, "listeners", None)
+        if listeners is not None and self.notify not in listeners:
+            listeners.append(self.notify)
+
+    def remove_observer(self, callback:Callable):
+        """ Removes a callback added with add_observer()
+
+        Parameters
+        ----------
+        callback: Callable
+            The callback to remove
+        :return:
+        """
+        if self.observers is None or callback not in self.observers:
+            return
+        self.observers.remove(callback)
+        if len(self.observers) == 0:
+            self.observers = None
+            listeners = getattr(self.data, "listeners", None)
+            if listeners is not None and self.notify in listeners:
+                listeners.remove(self.notify)
+
+    def notify(self):
+        """ Calls every observer with this entry
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.observers is not None:
+            for callback in list(self.observers):
+                callback(self)
 
     def get_data(self) -> Any:
         """ Gets the current data value
@@ -112,12 +473,9 @@ class DictionaryEntry:
 
         :return: The current value for this entry
         """
-        if self.type == DictionaryTypes.COMMAND:
-            return self.data.cmd#.name
-        elif self.type == DictionaryTypes.RESPONSE:
-            return self.data.rsp#.name
-        else:
+        if self.getter is None:
             return self.data
+        return self.getter(self.data)
 
     def get_type(self) -> DictionaryTypes:
         """ Gets the type for this entry
@@ -127,23 +485,46 @@ class DictionaryEntry:
 
         :return: The DictionaryTypes value for this entry
         """
-        return self.type
+        return self.entry_type
+
+    def stored_value(self) -> Any:
+        """ Returns the value that store() puts in the history: the current value, with LIST values as an
+        immutable snapshot
+
+        Parameters
+        ----------
+
+        :return: The value to store
+        """
+        if self.cow is not None:
+            return self.cow.take(self.data)
+        return self.get_data()
 
     def store(self):
-        """ Stores the current data value
+        """ Stores the current data value. LIST values are stored as snapshots, which are shared between ticks
+        where the list hasn't changed
 
         Parameters
         ----------
         :return:
         """
-        if self.type == DictionaryTypes.COMMAND:
-            n = self.data.cmd#.name
-            self.data_list.append(n)
-        elif self.type == DictionaryTypes.RESPONSE:
-            n = self.data.rsp#.name
-            self.data_list.append(n)
+        if self.cow is not None:
+            value = self.cow.take(self.data)
+        elif self.getter is None:
+            value = self.data
         else:
-            self.data_list.append(self.data)
+            value = self.getter(self.data)
+        h = self.hist
+        if h is None:
+            h = self.make_history()
+        try:
+            h.append(value)
+        except (TypeError, ValueError, OverflowError):
+            if not isinstance(self.history, CompressedHistory):
+                raise
+            # a value that can't be compressed, such as None. The entry falls back to an object HistoryBuffer
+            self.history = self.history.to_buffer()
+            self.history.append(value)
 
     def to_string(self, num_history:int=10) -> str:
         """ Returns a string with the name, type, value, and last n values from the history
@@ -154,21 +535,233 @@ class DictionaryEntry:
             How many values of history to show
         :return: The string describing this this entry
         """
-        return "{} (type = {}): current = {}, history{}".format(self.name, self.get_type(), self.get_data(),
-                                                                self.data_list[num_history:])
+        current = self.get_data()
+        if isinstance(current, np.ndarray):
+            current = current.tolist()
+        return "{} (type = {}): current = {}, history{}".format(self.name, self.get_type(), current,
+                                                                self.data_list[num_history:].tolist())
 
     def to_dict(self) -> Dict:
-        """ Returns a Dict with the name, type, and current value
+        """ Returns a Dict with the name, type, and current value. ARRAY entries also have their dtype and shape,
+        and the value is a nested list so the Dict can be written as JSON
 
         Parameters
         ----------
 
         :return: The Dict for this entry
         """
+        if self.entry_type == DictionaryTypes.ARRAY:
+            a = np.asarray(self.data, dtype=self.history.dtype)
+            return {"name":self.name, "type":self.entry_type.name, "current":a.tolist(),
+                    "dtype":a.dtype.str, "shape":list(self.history.shape)}
         return {"name":self.name, "type":self.get_type().name, "current":self.get_data()}
 
 
 
+class EntryHandle:
+    '''
+    The EntryHandle class is a stable reference to a named entry in a DataDictionary. It is created with
+    DataDictionary.bind(), usually in a controller's add_init(), and gives direct access to the entry's data without
+    a lookup by name. The entry doesn't have to exist when the handle is bound. If the entry is removed and added
+    again, the handle follows it
+
+    Attributes
+    ----------
+    name:str
+        The name of the entry
+    ddict:DataDictionary
+        The DataDictionary that the entry is in
+    entry:DictionaryEntry
+        The entry, or None if there is no entry with this name yet
+
+    Methods
+    -------
+    resolve(self) -> DictionaryEntry:
+        Returns the entry, raising a KeyError if it doesn't exist
+    get(self) -> Any:
+        Returns the entry's data
+    set(self, data:Any):
+        Sets the entry's data
+    '''
+    __slots__ = ["name", "ddict", "entry"]
+    name:str
+    ddict:"DataDictionary"
+    entry:Union[DictionaryEntry, None]
+
+    def __init__(self, name:str, ddict:"DataDictionary"):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        name: str
+            The name of the entry
+        ddict: DataDictionary
+            The DataDictionary that the entry is in
+        """
+        self.name = name
+        self.ddict = ddict
+        self.entry = ddict.ddict.get(name)
+
+    def resolve(self) -> DictionaryEntry:
+        """ Returns the entry, raising a KeyError if it doesn't exist
+
+        Parameters
+        ----------
+
+        :return: The DictionaryEntry
+        """
+        if self.entry is None:
+            raise KeyError("-------- ERROR -------- EntryHandle.resolve() No entry named '{}'".format(self.name))
+        return self.entry
+
+    def get(self) -> Any:
+        """ Returns the entry's data. For COMMAND and RESPONSE entries, this is the CommandObject or ResponseObject
+
+        Parameters
+        ----------
+
+        :return: The data stored in the entry
+        """
+        e = self.entry
+        if e is None:
+            e = self.resolve()
+        return e.data
+
+    def set(self, data:Any):
+        """ Sets the entry's data
+
+        Parameters
+        ----------
+        data: Any
+            The new value
+        :return:
+        """
+        e = self.entry
+        if e is None:
+            e = self.resolve()
+        e.set_data(data)
+
+
+class Subscription:
+    '''
+    The Subscription class connects a callback to the entries of a DataDictionary whose names match a pattern. It is
+    created with DataDictionary.subscribe(), and follows entries as they are added and removed. An immediate
+    subscription calls the callback with each entry as it changes. A coalesced subscription is checked once per
+    DataDictionary.store(), and calls the callback with a list of the entries whose value is different from the last
+    delivery, which also catches values that were written directly to DictionaryEntry.data
+
+    Attributes
+    ----------
+    pattern:str
+        An entry name, or an fnmatch-style pattern such as "CMD_*"
+    callback:Callable
+        Called as callback(entry), or callback(entries) if coalesced
+    coalesce:bool
+        If True, changes are delivered once per store()
+    entries:List
+        The entries that match the pattern
+    last:Dict
+        For coalesced subscriptions, a copy of the last delivered value of each entry, by name. Lists and arrays are
+        copied, so changes made to them in place are seen
+
+    Methods
+    -------
+    matches(self, name:str) -> bool:
+        Returns True if the name matches the pattern
+    attach(self, de:DictionaryEntry):
+        Starts watching an entry
+    detach(self, de:DictionaryEntry):
+        Stops watching an entry
+    deliver(self):
+        For coalesced subscriptions, calls the callback with the entries that changed since the last delivery
+    '''
+    __slots__ = ["pattern", "callback", "coalesce", "entries", "last"]
+    pattern:str
+    callback:Callable
+    coalesce:bool
+    entries:List[DictionaryEntry]
+    last:Dict[str, Any]
+
+    def __init__(self, pattern:str, callback:Callable, coalesce:bool = False):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        pattern: str
+            An entry name, or an fnmatch-style pattern
+        callback: Callable
+            Called as callback(entry), or callback(entries) if coalesced
+        coalesce: bool = False
+            If True, changes are delivered once per store()
+        """
+        self.pattern = pattern
+        self.callback = callback
+        self.coalesce = coalesce
+        self.entries = []
+        self.last = {}
+
+    def matches(self, name:str) -> bool:
+        """ Returns True if the name matches the pattern
+
+        Parameters
+        ----------
+        name: str
+            The name of an entry
+        :return: True if it matches
+        """
+        return name == self.pattern or fnmatch.fnmatchcase(name, self.pattern)
+
+    def attach(self, de:DictionaryEntry):
+        """ Starts watching an entry
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to watch
+        :return:
+        """
+        self.entries.append(de)
+        if self.coalesce:
+            self.last[de.name] = copy_value(de.get_data())
+        else:
+            de.add_observer(self.callback)
+
+    def detach(self, de:DictionaryEntry):
+        """ Stops watching an entry
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to stop watching
+        :return:
+        """
+        if de not in self.entries:
+            return
+        self.entries.remove(de)
+        if self.coalesce:
+            self.last.pop(de.name, None)
+        else:
+            de.remove_observer(self.callback)
+
+    def deliver(self):
+        """ For coalesced subscriptions, calls the callback with the entries that changed since the last delivery.
+        Nothing is called if none of them changed
+
+        Parameters
+        ----------
+        :return:
+        """
+        changed = []
+        last = self.last
+        for de in self.entries:
+            v = de.get_data()
+            if not values_equal(v, last[de.name]):
+                last[de.name] = copy_value(v)
+                changed.append(de)
+        if len(changed) > 0:
+            self.callback(changed)
+
+
 class DataDictionary:
     '''
     The DictionaryEntry class creates a data entry that all controllers use to communicate and current and historical
@@ -184,34 +777,91 @@ class DataDictionary:
         The number of items that have been stored which can be up to count
     log_line:int
         The line in the log output. If it is zero, then write headers
+    capacity:int
+        The history capacity that entries are given when they are added to this dictionary
+    eviction:str
+        The EvictionTypes policy that entries are given when they are added to this dictionary
+    snapshot:Union[SnapshotMatrix, None]
+        In snapshot mode, the matrices that hold the history of INT, FLOAT, COMMAND and RESPONSE entries. None otherwise
+    store_list:List
+        The entries that store() has to call individually. In snapshot mode, this excludes the entries in the matrices
+    handles:Dict
+        The EntryHandles that have been bound, by name, so they can be kept up to date as entries are added and removed
+    memmap_dir:Union[str, None]
+        In memmap mode, the directory that holds a MemmapHistory file for each INT and FLOAT entry. It is a new
+        subdirectory of the memmap_dir passed to the constructor, so dictionaries can share one. close() deletes it.
+        None otherwise
+    memmap_root:Union[str, None]
+        The memmap_dir passed to the constructor, if this dictionary created it, so close() can remove it once it is
+        empty. None otherwise
+    hot_window:int
+        In memmap mode, the number of samples of each entry's history that are kept in memory
+    delta:bool
+        In delta mode, entries that are stored individually keep a DeltaHistory, which only records changes.
+        ARRAY entries keep their (ticks, *shape) HistoryBuffer
+    compress:bool
+        In compress mode, INT and FLOAT entries keep a CompressedHistory
+    elapsed_time:EntryHandle
+        The handle for the "elapsed-time" entry, which the time index is read from
+    time_index:HistoryBuffer
+        The elapsed-time at each tick, starting at time_index.start_tick. Empty until there is an "elapsed-time" entry
+    subscriptions:List
+        The Subscriptions to entries in this dictionary
+    coalesced:List
+        The Subscriptions in subscriptions that are delivered once per store()
 
     Methods
     -------
     reset(self):
         Resets all the global values for this Base class
-    add_entry(self, de: DictionaryEntry):
+    add_entry(self, de: DictionaryEntry, policy:SamplingPolicy = None):
         Adds a DictionaryEntry to the dictionary using the DictionaryEntry's name as the key. If the key already exists
-        in the ddict, throw a ValueError
-    new_entry(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True) -> DictionaryEntry:
+        in the ddict, throw a ValueError. The entry's history is converted to this dictionary's capacity and eviction,
+        or to a SampledHistory if a policy is given
+    new_entry(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True, policy:SamplingPolicy = None) -> DictionaryEntry:
         Creates a new DictionaryEntry and adds it to this DataDictionary, and returns the new entry
-    set_entries_from_dict(self, dict_list:List):
+    set_entries_from_dict(self, dict_list:Iterable):
         Set a batch of entrise from a List of Dicts. Useful for loading from a file
+    set_entries_from_jsonl(self, source:Union[str, TextIO]) -> int:
+        Set entries from a JSON Lines file, one Dict per line, without reading the whole file into memory
     set_entry_from_dict(self, d:Dict) -> bool:
         Set a single entry from a Dict
     remove_entry(self, name: str) -> bool:
         Delete the entry from the ddict. If successful return True, otherwise False
     get_entry(self, name: str) -> DictionaryEntry:
         Get a DictionaryEntry based on the key. If no entry return None
+    bind(self, name: str) -> EntryHandle:
+        Get a stable EntryHandle for the named entry, which does not need to exist yet
+    update_handle(self, name: str):
+        Point the bound EntryHandle for name (if any) at the current entry
+    subscribe(self, pattern:str, callback:Callable, coalesce:bool = False) -> Subscription:
+        Calls callback when the value of an entry whose name matches pattern changes
+    unsubscribe(self, sub:Subscription):
+        Stops a Subscription
     has_entry(self, name:str) -> bool:
         Check to see if the key exists in the ddict. Return True if so, otherwise False
     safe_get_entry_val(self, name:str, default:Any) -> Any:
         Returns a value associated with the key. If none, then the default value is returned
+    snapshot_block(self, de: DictionaryEntry):
+        Returns the SnapshotBlock that holds the history for this entry's type, or None if the entry is stored individually
     store(self, skip: int = 10):
         If the count % skip, then store values in item's histories.
+    current_time(self) -> Union[float, None]:
+        Returns the current value of the "elapsed-time" entry, or None if there isn't one
+    tick_at(self, t:float) -> int:
+        Returns the most recent tick at or before elapsed-time t
+    tick_range(self, t0:float, t1:float) -> Tuple:
+        Returns the first tick and one past the last tick with an elapsed-time from t0 up to t1
+    value_as_of(self, name:str, t:float) -> Any:
+        Returns the value that an entry had at elapsed-time t
+    query_range(self, name:str, t0:float, t1:float) -> Tuple:
+        Returns the elapsed-times and values of an entry's samples from t0 up to t1
     log_to_csv(self, filename, skip:int = 1):
         Generate a file with all the stored data in csv format
     to_excel(self, pathname: str, filename: str):
         Generate a file with all the stored data in excel format
+    close(self):
+        Writes out and releases any history that is kept in files
     to_string(self) -> str:
         Generate a (big!) string using the default to_string() behavior for DictionaryEntrys
     to_short_string(self) -> str:
@@ -223,14 +873,75 @@ class DataDictionary:
     count:int
     store_count:int
     log_line:int
-
-    def __init__(self):
+    capacity:int
+    eviction:str
+    snapshot:Union[SnapshotMatrix, None]
+    store_list:List
+    handles:Dict
+    memmap_dir:Union[str, None]
+    memmap_root:Union[str, None]
+    hot_window:int
+    delta:bool
+    compress:bool
+    elapsed_time:EntryHandle
+    time_index:HistoryBuffer
+    subscriptions:List[Subscription]
+    coalesced:List[Subscription]
+
+    def __init__(self, capacity:int = 16, eviction:str = EvictionTypes.GROW, snapshot:bool = False,
+                 memmap_dir:str = None, hot_window:int = 4096, delta:bool = False, compress:bool = False):
         """Constructor: Sets up the basic components of the class
 
         Parameters
         ----------
-
+        capacity:int = 16
+            The history capacity for entries in this dictionary. For EvictionTypes.OVERWRITE and DECIMATE, this
+            bounds the memory used by each entry's history
+        eviction:str = EvictionTypes.GROW
+            What each entry's history does when it is full. The default keeps everything
+        snapshot:bool = False
+            If True, the histories of INT, FLOAT, COMMAND and RESPONSE entries are kept as columns in tick-by-entry
+            matrices, so that store() writes one row per matrix instead of calling store() on each entry
+        memmap_dir:str = None
+            If set, the full history of each INT and FLOAT entry is kept in a MemmapHistory file in a new
+            subdirectory of this directory, with only the last hot_window samples in memory. The directory is
+            created if it doesn't exist. Can't be combined with snapshot
+        hot_window:int = 4096
+            In memmap mode, the number of samples of each entry's history that are kept in memory
+        delta:bool = False
+            If True, entries keep a DeltaHistory that records (tick, value) only when the value changes, and
+            rebuilds the full series when it's read. capacity and eviction are ignored. INT and FLOAT entries are
+            memmapped instead if memmap_dir is set. ARRAY entries keep a HistoryBuffer. Can't be combined with snapshot
+        compress:bool = False
+            If True, the full history of each INT and FLOAT entry is kept in a CompressedHistory, which compresses it
+            in blocks and decompresses it when it's read. capacity and eviction are ignored for these entries. Other
+            entries are unaffected, so this can be combined with delta. Can't be combined with snapshot or memmap_dir
         """
+        if snapshot and memmap_dir is not None:
+            raise ValueError("-------- ERROR -------- DataDictionary() snapshot and memmap_dir can't be combined")
+        if snapshot and delta:
+            raise ValueError("-------- ERROR -------- DataDictionary() snapshot and delta can't be combined")
+        if compress and (snapshot or memmap_dir is not None):
+            raise ValueError("-------- ERROR -------- DataDictionary() compress can't be combined with snapshot or memmap_dir")
+        self.capacity = capacity
+        self.delta = delta
+        self.compress = compress
+        self.eviction = eviction
+        self.memmap_dir = None
+        self.memmap_root = None
+        if memmap_dir is not None:
+            # each dictionary gets its own subdirectory, so dictionaries that share a memmap_dir don't truncate
+            # each other's files
+            try:
+                os.makedirs(memmap_dir)
+                self.memmap_root = memmap_dir
+            except FileExistsError:
+                pass
+            self.memmap_dir = tempfile.mkdtemp(prefix="ddict_", dir=memmap_dir)
+        self.hot_window = hot_window
+        self.snapshot = None
+        if snapshot:
+            self.snapshot = SnapshotMatrix(capacity, eviction)
         self.reset()
 
     def reset(self):
@@ -241,25 +952,94 @@ class DataDictionary:
         :return:
         """
         self.ddict = {}
+        self.store_list = []
+        self.handles = {}
+        self.subscriptions = []
+        self.coalesced = []
+        self.elapsed_time = self.bind("elapsed-time")
+        # the time index has to cover every tick that an entry can have, so it is only bounded for OVERWRITE
+        if self.eviction == EvictionTypes.OVERWRITE:
+            self.time_index = HistoryBuffer(np.float64, self.capacity, EvictionTypes.OVERWRITE)
+        else:
+            self.time_index = HistoryBuffer(np.float64, max(16, self.capacity), EvictionTypes.GROW)
         self.count = 0
         self.store_count = 0
         self.log_line = 0
+        if self.snapshot is not None:
+            self.snapshot = SnapshotMatrix(self.capacity, self.eviction)
+
+    def snapshot_block(self, de: DictionaryEntry):
+        """ Returns the SnapshotBlock that holds the history for this entry's type, or None if the entry is stored
+        individually
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to look up
+        :return: The SnapshotBlock or None
+        """
+        if self.snapshot is None:
+            return None
+        if de.type == DictionaryTypes.INT:
+            return self.snapshot.ints
+        if de.type == DictionaryTypes.FLOAT:
+            return self.snapshot.floats
+        if de.type == DictionaryTypes.COMMAND or de.type == DictionaryTypes.RESPONSE:
+            return self.snapshot.cats
+        return None
 
-    def add_entry(self, de: DictionaryEntry):
+    def add_entry(self, de: DictionaryEntry, policy:SamplingPolicy = None):
         """ Adds a DictionaryEntry to the dictionary using the DictionaryEntry's name as the key.
-        If the key already exists, throw a ValueError
+        If the key already exists, throw a ValueError. If the entry's history doesn't use this dictionary's
+        eviction policy, it is converted
 
         Parameters
         ----------
         de: DictionaryEntry
             The entry to add
+        policy: SamplingPolicy = None
+            If set, the entry keeps a SampledHistory that uses this policy instead of the dictionary's history
+            settings, and is stored individually even in snapshot mode
         :return:
         """
         if de.name in self.ddict:
             raise ValueError("-------- ERROR -------- DataDictionary.add_entry() Duplicate definition of {}".format(de.name))
+        if policy is not None and de.type == DictionaryTypes.ARRAY:
+            raise ValueError("-------- ERROR -------- DataDictionary.add_entry() {} is an ARRAY, which can't use a "
+                             "SamplingPolicy".format(de.name))
+        block = None if policy is not None else self.snapshot_block(de)
+        if block is not None:
+            de.history = block.add_column(de, self.store_count)
+            self.ddict[de.name] = de
+            self.update_handle(de.name)
+            self.match_subscriptions(de, True)
+            return
+        # the first stored value (if any) lines up with the most recent DataDictionary.store()
+        de.history.start_tick = self.store_count - de.history.total + 1
+        if policy is not None:
+            de.set_sampling(policy, self.current_time)
+        elif self.memmap_dir is not None and de.type in history_dtypes:
+            mh = MemmapHistory(MemmapHistory.make_filename(self.memmap_dir, de.name), history_dtypes[de.type],
+                               self.hot_window)
+            mh.start_tick = de.history.first_tick()
+            mh.extend(de.history.view())
+            de.history = mh
+        elif self.compress and de.type in history_dtypes:
+            if not isinstance(de.history, CompressedHistory):
+                de.set_compressed_history()
+        elif self.delta and de.type != DictionaryTypes.ARRAY:
+            if not isinstance(de.history, DeltaHistory):
+                de.set_delta_history()
+        elif de.history.eviction != self.eviction or \
+                (self.eviction != EvictionTypes.GROW and de.history.capacity != self.capacity):
+            de.set_history(self.capacity, self.eviction)
         self.ddict[de.name] = de
+        self.store_list.append(de)
+        self.update_handle(de.name)
+        self.match_subscriptions(de, True)
 
-    def new_entry(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True) -> DictionaryEntry:
+    def new_entry(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True,
+                  policy:SamplingPolicy = None) -> DictionaryEntry:
         """ Creates a new DictionaryEntry and adds it to this DataDictionary, and returns the new entry
 
         Parameters
@@ -272,31 +1052,53 @@ class DataDictionary:
             The data stored in this entry
         master:bool
             A flag that indicates if this value comes from another dictionary. If it does, we sync to the master whenever possible
+        policy:SamplingPolicy = None
+            If set, the SamplingPolicy that decides which of the entry's values are kept
 
         return:
             The newly created DictionaryEntry
         """
-        de:DictionaryEntry = DictionaryEntry(name, type, data, master)
-        self.add_entry(de)
+        de:DictionaryEntry = DictionaryEntry(name, type, data, master, self.capacity, self.eviction)
+        self.add_entry(de, policy)
         return de
 
-    def set_entries_from_dict(self, dict_list:List):
+    def set_entries_from_dict(self, dict_list:Iterable):
         """ set a batch of entrise from a List of Dicts. Useful for loading from a file. Entries are in the form of:
         [{'name': 'test_int', 'type': 'INT', 'current': 20}, {'name': 'test_float', 'type': 'FLOAT', 'current': 22.0}]
 
         Parameters
         ----------
-        dict_list:List
-            An array of Dicts
+        dict_list:Iterable
+            An array of Dicts, or any iterable of them, such as a generator that reads them from a file
         :return:
         """
         entry:Dict
         for entry in dict_list:
             self.set_entry_from_dict(entry)
 
+    def set_entries_from_jsonl(self, source:Union[str, TextIO]) -> int:
+        """ Set entries from a JSON Lines file, with one Dict in the to_dict() form per line. Lines are read and
+        applied one at a time, so very large files don't have to fit in memory. Blank lines are skipped
+
+        Parameters
+        ----------
+        source:Union[str, TextIO]
+            The name of the file, or an open text file
+        :return: The number of entries that were set
+        """
+        if isinstance(source, str):
+            with open(source) as f:
+                return self.set_entries_from_jsonl(f)
+        count = 0
+        for line in source:
+            line = line.strip()
+            if len(line) > 0 and self.set_entry_from_dict(json.loads(line)):
+                count += 1
+        return count
+
     def set_entry_from_dict(self, d:Dict) -> bool:
         """ set an entry from a Dict. Useful for loading from a file. Entries are in the form of:
-        {'name': 'test_int', 'type': 'INT', 'current': 20}
+        {'name': 'test_int', 'type': 'INT', 'current': 20}. ARRAY entries can also have 'dtype' and 'shape'
 
         Parameters
         ----------
@@ -315,21 +1117,42 @@ class DataDictionary:
             print("DataDictionary.set_entry_from_dict(): KeyError with {}".format(d))
             return False
 
-        if name in self.ddict:
-            e = self.get_entry(name)
+        e = self.ddict.get(name)
+        type = type_names.get(type_name) if e is None else e.get_type()
+        if type is None:
+            return False
+        if type == DictionaryTypes.ARRAY:
+            current = np.array(current, dtype=d.get("dtype", None if e is None else e.history.dtype))
+            if "shape" in d:
+                current = current.reshape(d["shape"])
+        elif type == DictionaryTypes.LIST:
+            # the dictionary owns this list, so it can count its changes, and store() doesn't compare the elements
+            current = VersionedList(current)
+        if e is not None:
             e.set_data(current)
+            return True
+        de = DictionaryEntry(name, type, None, True, self.capacity, self.eviction,
+                             current.dtype if type == DictionaryTypes.ARRAY else None,
+                             current.shape if type == DictionaryTypes.ARRAY else None)
+        de.data = current
+        block = self.snapshot_block(de)
+        if block is not None and block.can_backfill(self.store_count):
+            de.history = block.add_column(de, self.store_count, backfill=True)
+            self.ddict[name] = de
+            self.update_handle(name)
+            self.match_subscriptions(de, True)
+            return True
+        # the entry is given the current value for every tick so far, as if it had always been stored
+        de.history.fill(de.stored_value(), self.store_count + 1)
+        if block is None:
+            self.add_entry(de)
         else:
-            dt:Enum
-            type:DictionaryTypes
-            for dt in DictionaryTypes:
-                if type_name == dt.name:
-                    type = dt
-                    de = DictionaryEntry(name, type, current)
-                    for i in range(self.store_count):
-                        de.store()
-                    self.ddict[name] = de
-                    return True
-        return False
+            # the block's rows start after tick 0, so the entry is stored on its own to keep a value for every tick
+            self.ddict[name] = de
+            self.store_list.append(de)
+            self.update_handle(name)
+            self.match_subscriptions(de, True)
+        return True
 
     def remove_entry(self, name: str) -> bool:
         """ Delete the entry from the ddict. If successful return True, otherwise False
@@ -341,7 +1164,13 @@ class DataDictionary:
         :return: True if successful
         """
         if name in self.ddict:
-            del self.ddict[name]
+            de = self.ddict.pop(name)
+            if isinstance(de.history, SnapshotColumn):
+                self.snapshot.remove_entry(de)
+            else:
+                self.store_list.remove(de)
+            self.update_handle(name)
+            self.match_subscriptions(de, False)
             return True
         return False
 
@@ -360,6 +1189,93 @@ class DataDictionary:
             print("DataDictionary.get_entry(): No entry named '{}'".format(name))
         return None
 
+    def bind(self, name: str) -> EntryHandle:
+        """ Get a stable EntryHandle for the named entry. The entry doesn't have to exist yet, so controllers can
+        bind everything they use in add_init() and skip the lookup by name on every step()
+
+        Parameters
+        ----------
+        name: str
+            The key value of the entry
+        :return: The EntryHandle for the name. Binding the same name twice returns the same handle
+        """
+        h = self.handles.get(name)
+        if h is None:
+            h = EntryHandle(name, self)
+            self.handles[name] = h
+        return h
+
+    def update_handle(self, name: str):
+        """ Point the bound EntryHandle for name (if any) at the current entry. Called when entries are added or removed
+
+        Parameters
+        ----------
+        name: str
+            The key value of the entry
+        :return:
+        """
+        h = self.handles.get(name)
+        if h is not None:
+            h.entry = self.ddict.get(name)
+
+    def subscribe(self, pattern:str, callback:Callable, coalesce:bool = False) -> Subscription:
+        """ Calls callback when the value of an entry whose name matches pattern changes. Entries added later that
+        match are included
+
+        Parameters
+        ----------
+        pattern: str
+            An entry name, or an fnmatch-style pattern such as "CMD_*" or "*-controller"
+        callback: Callable
+            If coalesce is False, called as callback(entry) whenever set_data(), or a set() on the entry's
+            CommandObject or ResponseObject, changes the value. If coalesce is True, called once per store() as
+            callback(entries) with the entries whose value has changed since the last call
+        coalesce: bool = False
+            Deliver changes once per store() instead of as they happen
+        :return: The Subscription, to pass to unsubscribe()
+        """
+        sub = Subscription(pattern, callback, coalesce)
+        for de in self.ddict.values():
+            if sub.matches(de.name):
+                sub.attach(de)
+        self.subscriptions.append(sub)
+        if coalesce:
+            self.coalesced.append(sub)
+        return sub
+
+    def unsubscribe(self, sub:Subscription):
+        """ Stops a Subscription
+
+        Parameters
+        ----------
+        sub: Subscription
+            The Subscription returned by subscribe()
+        :return:
+        """
+        for de in list(sub.entries):
+            sub.detach(de)
+        if sub in self.subscriptions:
+            self.subscriptions.remove(sub)
+        if sub in self.coalesced:
+            self.coalesced.remove(sub)
+
+    def match_subscriptions(self, de:DictionaryEntry, added:bool):
+        """ Attaches a newly added entry to the Subscriptions that match it, or detaches a removed one
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry
+        added: bool
+            True if the entry was added, False if it was removed
+        :return:
+        """
+        for sub in self.subscriptions:
+            if added and sub.matches(de.name):
+                sub.attach(de)
+            elif not added:
+                sub.detach(de)
+
     def has_entry(self, name:str) -> bool:
         """ Check to see if the key exists in the ddict. Return True if so, otherwise False
 
@@ -390,7 +1306,8 @@ class DataDictionary:
         return default
 
     def store(self, skip: int = 10):
-        """ If the count % skip, then store values in all the item's histories.
+        """ If the count % skip, then store values in all the item's histories. Coalesced Subscriptions are delivered on
+        every call, whether or not anything is stored
 
         Parameters
         ----------
@@ -398,14 +1315,117 @@ class DataDictionary:
             The number of frames to skip. The default is 10. Set to 1 to store everything
         :return:
         """
+        for sub in self.coalesced:
+            sub.deliver()
         self.count += 1
         if (self.count % skip) == 0:
+            et = self.elapsed_time.entry
+            if et is not None:
+                if self.time_index.total == 0:
+                    # start the index at the current tick, which has the value the entry was added with
+                    self.time_index.start_tick = self.store_count
+                    self.time_index.append(et.data if len(et.history) == 0 else et.history.last())
+                self.time_index.append(et.data)
             self.store_count += 1
-            for entry in self.ddict.values():
+            if self.snapshot is not None:
+                # entries whose values no longer fit their block are stored individually from now on
+                self.store_list.extend(self.snapshot.store())
+            for entry in self.store_list:
                 entry.store()
 
+    def current_time(self) -> Union[float, None]:
+        """ Returns the current value of the "elapsed-time" entry. Used as the clock for time-based SamplingPolicies
+
+        Parameters
+        ----------
+
+        :return: The elapsed-time, or None if there is no "elapsed-time" entry
+        """
+        e = self.elapsed_time.entry
+        if e is None:
+            return None
+        return e.data
+
+    def tick_at(self, t:float) -> int:
+        """ Returns the most recent tick at or before elapsed-time t, using a binary search of the time index
+
+        Parameters
+        ----------
+        t: float
+            The elapsed-time
+        :return: The tick, or -1 if t is before the oldest tick in the time index
+        """
+        i = np.searchsorted(self.time_index.view(), t, side="right") - 1
+        if i < 0:
+            return -1
+        return self.time_index.first_tick() + int(i)
+
+    def tick_range(self, t0:float, t1:float) -> Tuple[int, int]:
+        """ Returns the first tick and one past the last tick with an elapsed-time from t0 up to (not including) t1
+
+        Parameters
+        ----------
+        t0: float
+            The start of the range
+        t1: float
+            The end of the range
+        :return: A (first, stop) tuple of ticks. If no ticks are in the range, first == stop
+        """
+        times = self.time_index.view()
+        first = self.time_index.first_tick()
+        return first + int(np.searchsorted(times, t0, side="left")), first + int(np.searchsorted(times, t1, side="left"))
+
+    def value_as_of(self, name:str, t:float) -> Any:
+        """ Returns the value that an entry had at elapsed-time t, which is its most recent sample at or before t
+
+        Parameters
+        ----------
+        name: str
+            The name of the entry
+        t: float
+            The elapsed-time
+        :return: The value, or None if there is no sample at or before t
+        """
+        tick = self.tick_at(t)
+        if tick < 0:
+            return None
+        return self.ddict[name].value_at(tick)
+
+    def query_range(self, name:str, t0:float, t1:float) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the elapsed-times and values of an entry's samples from t0 up to (not including) t1. Both arrays
+        are views into the time index and the history where the history allows it (everything except DeltaHistory, CompressedHistory
+        and COMMAND/RESPONSE columns in snapshot mode)
+
+        Parameters
+        ----------
+        name: str
+            The name of the entry
+        t0: float
+            The start of the range
+        t1: float
+            The end of the range
+        :return: A (times, values) tuple of arrays with the same length
+        """
+        h = self.ddict[name].history
+        tick0, tick1 = self.tick_range(t0, t1)
+        ticks = h.ticks()
+        i0 = int(np.searchsorted(ticks, tick0, side="left"))
+        i1 = int(np.searchsorted(ticks, tick1, side="left"))
+        times = self.time_index.view()
+        if i1 <= i0:
+            return times[:0], h.view()[:0]
+        base = self.time_index.first_tick()
+        sel = ticks[i0:i1] - base
+        step = int(sel[1] - sel[0]) if len(sel) > 1 else 1
+        if len(sel) > 2 and np.any(np.diff(sel) != step):
+            # a SampledHistory can keep samples at any tick
+            return times[sel], h.view()[i0:i1]
+        return times[sel[0]:sel[-1] + 1:step], h.view()[i0:i1]
+
     def log_to_csv(self, filename, skip:int = 1):
-        """ Generate a file with all the stored data in csv format
+        """ Generate a file with all the stored data in csv format. This opens and closes the file on every call. For
+        logging every tick, use a CsvLogger, which keeps the file open and writes rows in batches, or an AsyncLogger,
+        which also moves the writing to a background thread
 
         Parameters
         ----------
@@ -428,6 +1448,8 @@ class DataDictionary:
                         l = val.get_data()
                         for i in range(len(l)):
                             f.write("{}_{}, ".format(key, i))
+                    elif t == DictionaryTypes.ARRAY:
+                        f.write("".join("{}, ".format(c) for c in array_column_names(key, val.history.shape)))
                     else:
                         f.write("{}, ".format(key))
                 f.write("\n")
@@ -439,13 +1461,18 @@ class DataDictionary:
                         l = val.get_data()
                         for v in l:
                             f.write("{}, ".format(v))
+                    elif t == DictionaryTypes.ARRAY:
+                        # the whole array is formatted in one call rather than element by element
+                        f.write("{}, ".format(", ".join(map(str, np.ravel(val.get_data()).tolist()))))
                     else:
                         f.write("{}, ".format(val.get_data()))
                 f.write("\n")
             self.log_line += 1
 
     def to_excel(self, pathname: str, filename: str):
-        """ Generate a file with all the stored data in Excel format
+        """ Generate a file with all the stored data in Excel format, one row per entry. This builds the whole
+        history as one DataFrame, so for long runs use an ExcelWriter, which streams one row per tick and splits
+        across sheets past Excel's limits, or a ColumnarWriter, which is much faster and produces smaller files
 
         Parameters
         ----------
@@ -457,20 +1484,40 @@ class DataDictionary:
         """
         index_list = []
         rows = []
-        num_rows = len(self.ddict)
-        max_cols = 0
         for key, val in self.ddict.items():
+            if val.get_type() == DictionaryTypes.ARRAY:
+                # one row per element, named like the csv columns
+                index_list.extend(array_column_names(key, val.history.shape))
+                rows.extend(val.data_list.reshape(len(val.data_list), -1).T)
+                continue
             index_list.append(key)
             rows.append(val.data_list)
-            max_cols = max(max_cols, len(val.data_list))
-        empty = np.zeros((num_rows, max_cols))
         df = pd.DataFrame(rows, index_list)
-        cur_dir = os.getcwd()
-        os.chdir(pathname)
-        writer = pd.ExcelWriter(filename)
-        df.to_excel(writer)
-        writer.save()
-        os.chdir(cur_dir)
+        with pd.ExcelWriter(os.path.join(pathname, filename)) as writer:
+            df.to_excel(writer)
+
+    def close(self, keep_files:bool = False):
+        """ Writes out and releases any history that is kept in files. Call at the end of a run in memmap mode, once
+        the history has been read or exported. The subdirectory that holds the files is deleted, along with the
+        memmap_dir passed to the constructor if this dictionary created it and nothing else is in it. The memmapped
+        histories can't be read after that. Entries added afterwards keep their history in memory
+
+        Parameters
+        ----------
+        keep_files: bool = False
+            If True, the files are kept, and can be loaded with np.fromfile()
+        :return:
+        """
+        for val in self.ddict.values():
+            if isinstance(val.history, MemmapHistory):
+                val.history.close()
+        if self.memmap_dir is None or keep_files:
+            return
+        shutil.rmtree(self.memmap_dir)
+        self.memmap_dir = None
+        if self.memmap_root is not None and len(os.listdir(self.memmap_root)) == 0:
+            os.rmdir(self.memmap_root)
+        self.memmap_root = None
 
     def to_string(self) -> str:
         """ Generate a (big!) string using the default to_string() behavior for DictionaryEntrys
@@ -499,7 +1546,8 @@ class DataDictionary:
         return to_return
 
     def to_dict_array(self) -> List:
-        """ Create a list of Dicts that can be saved out as a file and loaded in using set_entries_from_dict()
+        """ Create a list of Dicts that can be saved out as a file and loaded in using set_entries_from_dict(). Only
+        the current values are included. To save and restore everything, including histories, use a Checkpoint
 
         Parameters
         ----------
@@ -520,6 +1568,7 @@ if __name__ == "__main__":
     ddict.add_entry(DictionaryEntry("test_float", DictionaryTypes.FLOAT, 3.141592))
     ddict.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "Hello, world"))
     ddict.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [1, 2, 3, 4, 5]))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros((2, 2))))
 
     for i in range(1, 21):
         print("adding data i = {}".format(i))
@@ -529,6 +1578,7 @@ if __name__ == "__main__":
         l = []
         l.extend(range(i, i+10))
         ddict.get_entry("test_list").data = l
+        ddict.get_entry("test_array").data[:] = [[i, -i], [i/10, -i/10]]
 
         ddict.store(1)
         ddict.log_to_csv("testlog.csv", 2)
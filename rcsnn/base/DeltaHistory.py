@@ -0,0 +1,247 @@
+import numpy as np
+from typing import Any, Tuple
+
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes
+
+
+class DeltaHistory:
+    '''
+    The DeltaHistory class keeps the history of a DictionaryEntry as change points. A value is only recorded,
+    together with its tick, when it differs from the previous one, so entries that sit at the same value for
+    most of a run (commands, responses, idle outputs) take a few samples instead of one per tick. It has the same
+    reading methods as a HistoryBuffer. view() and ticks() reconstruct the dense, one-sample-per-tick series
+
+    Attributes
+    ----------
+    dtype:Any
+        The NumPy dtype of the recorded values
+    change_index:HistoryBuffer
+        The append count (starting at zero) at which each change was recorded
+    values:HistoryBuffer
+        The value of each change
+    prev:Any
+        The most recently recorded value
+    total:int
+        The number of times append() has been called
+    start_tick:int
+        The tick of the first append
+    eviction:str
+        Always "delta". Nothing is ever evicted
+    capacity:int
+        The number of change points the buffers have room for
+
+    Methods
+    -------
+    reset(self):
+        Empties the history
+    append(self, value:Any):
+        Records the value if it differs from the previous one
+    extend(self, values:np.ndarray):
+        Appends an array of samples, finding the changes in one vectorized comparison
+    changes(self) -> Tuple:
+        Returns the (ticks, values) of every change point
+    value_at(self, tick:int) -> Any:
+        Returns the value that the entry had at a tick
+    dense(self, start:int, stop:int) -> np.ndarray:
+        Returns one sample per tick for ticks start up to stop
+    view(self) -> np.ndarray:
+        Returns one sample per tick, oldest first
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample
+    last(self) -> Any:
+        Returns the most recent sample
+    '''
+    dtype:Any
+    change_index:HistoryBuffer
+    values:HistoryBuffer
+    prev:Any
+    total:int
+    start_tick:int
+    eviction:str
+
+    def __init__(self, dtype:Any = object, capacity:int = 16):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        dtype: Any = object
+            The NumPy dtype of the recorded values
+        capacity: int = 16
+            The number of change points to preallocate. The buffers grow as needed
+        """
+        self.dtype = dtype
+        self.eviction = "delta"
+        self.start_tick = 0
+        self.change_index = HistoryBuffer(np.int64, capacity, EvictionTypes.GROW)
+        self.values = HistoryBuffer(dtype, capacity, EvictionTypes.GROW)
+        self.reset()
+
+    @property
+    def capacity(self) -> int:
+        return self.values.capacity
+
+    def reset(self):
+        """ Empties the history
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.change_index.reset()
+        self.values.reset()
+        self.prev = None
+        self.total = 0
+
+    def append(self, value:Any):
+        """ Records the value if it differs from the previous one. DictionaryEntry stores LIST values as CopyOnWrite
+        snapshots, so lists changed in place are seen. Other mutable values must be replaced rather than changed in
+        place, or the change won't be seen
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        :return:
+        """
+        if self.total == 0 or value != self.prev:
+            self.change_index.append(self.total)
+            self.values.append(value)
+            self.prev = value
+            self.dtype = self.values.dtype
+        self.total += 1
+
+    def extend(self, values:np.ndarray):
+        """ Appends an array of samples. This is the same as calling append() for each one, but the change points
+        are found with one vectorized comparison
+
+        Parameters
+        ----------
+        values: np.ndarray
+            The samples to store, oldest first
+        :return:
+        """
+        n = len(values)
+        if n == 0:
+            return
+        changed = np.empty(n, dtype=bool)
+        changed[0] = self.total == 0 or values[0] != self.prev
+        changed[1:] = values[1:] != values[:-1]
+        idx = np.flatnonzero(changed)
+        self.change_index.extend(self.total + idx)
+        self.values.extend(values[idx])
+        if len(idx) > 0:
+            self.prev = values[idx[-1]]
+        self.dtype = self.values.dtype
+        self.total += n
+
+    def changes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Returns the ticks and values of every change point
+
+        Parameters
+        ----------
+
+        :return: A (ticks, values) tuple of arrays. values is a view into the history
+        """
+        return self.start_tick + self.change_index.view(), self.values.view()
+
+    def value_at(self, tick:int) -> Any:
+        """ Returns the value that the entry had at a tick, which is the most recent change at or before it
+
+        Parameters
+        ----------
+        tick: int
+            The DataDictionary tick
+        :return: The value, or None if the tick is before the first sample
+        """
+        i = np.searchsorted(self.change_index.view(), tick - self.start_tick, side="right") - 1
+        if i < 0 or self.total == 0:
+            return None
+        return self.values.view()[i]
+
+    def dense(self, start:int = None, stop:int = None) -> np.ndarray:
+        """ Returns one sample per tick for ticks start up to stop, rebuilt from the change points
+
+        Parameters
+        ----------
+        start: int = None
+            The first tick. The default is the first sample. Ticks before the first sample are not included
+        stop: int = None
+            One past the last tick. The default is one past the last sample. Ticks after the last sample are
+            not included
+        :return: A new array of samples
+        """
+        first = self.start_tick
+        end = self.start_tick + self.total
+        start = first if start is None else max(start, first)
+        stop = end if stop is None else min(stop, end)
+        if stop <= start:
+            return self.values.view()[:0].copy()
+        ci = self.change_index.view()
+        i0 = np.searchsorted(ci, start - first, side="right") - 1
+        i1 = np.searchsorted(ci, stop - first, side="left")
+        # each change runs until the next one, clipped to the requested range
+        bounds = np.empty(i1 - i0 + 1, dtype=np.int64)
+        bounds[0] = start - first
+        bounds[1:-1] = ci[i0 + 1:i1]
+        bounds[-1] = stop - first
+        return np.repeat(self.values.view()[i0:i1], np.diff(bounds))
+
+    def view(self) -> np.ndarray:
+        """ Returns one sample per tick, oldest first. Unlike HistoryBuffer.view(), this is a new array
+
+        Parameters
+        ----------
+
+        :return: The reconstructed samples
+        """
+        return self.dense()
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view()
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        return self.start_tick + np.arange(self.total, dtype=np.int64)
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        return self.start_tick
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if there are none
+        """
+        return self.values.last()
+
+    def __len__(self) -> int:
+        return self.total
+
+    def to_string(self) -> str:
+        return "DeltaHistory (dtype = {}): {} samples in {} changes".format(
+            np.dtype(self.dtype), self.total, len(self.values))
+
+
+if __name__ == "__main__":
+    dh = DeltaHistory(object)
+    for i in range(20):
+        dh.append("init" if i < 5 else ("run" if i < 15 else "done"))
+    print(dh.to_string())
+    print("changes = {}".format(dh.changes()))
+    print("value_at(7) = {}".format(dh.value_at(7)))
+    print("dense(3, 8) = {}".format(dh.dense(3, 8)))
+    print("view = {}".format(dh.view()))
@@ -0,0 +1,371 @@
+import copy
+import threading
+import numpy as np
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Any, Dict, List, Tuple, Union
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, values_equal
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.ResponseObject import ResponseObject
+
+
+def wire_value(de:DictionaryEntry) -> Any:
+    """ Returns the value of an entry as it is sent to replicas. COMMAND and RESPONSE entries are sent as
+    (serial, cmd) and (serial, rsp), so a new command with the same string is still seen as a change
+
+    Parameters
+    ----------
+    de: DictionaryEntry
+        The entry
+    :return: The value to send
+    """
+    t = de.entry_type
+    if t == DictionaryTypes.COMMAND:
+        return de.data.serial, de.data.cmd
+    if t == DictionaryTypes.RESPONSE:
+        return de.data.serial, de.data.rsp
+    return de.data
+
+
+class DictionaryPublisher:
+    '''
+    The DictionaryPublisher class sends the changes to the master entries of a DataDictionary to any number of
+    DictionaryReplicas. Call publish() once per tick, after DataDictionary.store(). Each call sends one message to each
+    replica with only the entries that changed since the last call (possibly none), plus the names of entries that were removed.
+    A replica that connects is sent every master entry first. Entries with master == False came from somewhere else,
+    so they are not published
+
+    Replicas connect over a multiprocessing.connection address (a ("host", port) tuple or a Unix socket path), or
+    one end of a multiprocessing.Pipe() can be added with add_connection()
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary to publish
+    listener:Listener
+        Accepts replicas on address, or None if there is no address
+    connections:List
+        The replicas that are being sent deltas
+    pending:List
+        The replicas that have connected but haven't been sent the full dictionary yet
+    last:Dict
+        The last value sent for each entry, by name
+    lock:threading.Lock
+        Protects pending, which is added to by the thread that accepts replicas
+    accept_thread:threading.Thread
+        Waits for replicas to connect
+
+    Methods
+    -------
+    add_connection(self, conn:Connection):
+        Adds a replica's connection. It will be sent the full dictionary on the next publish()
+    changes(self, full:bool) -> Tuple:
+        Returns the (name, type name, value) of every master entry that changed, and the names of removed entries
+    publish(self):
+        Sends the changes since the last call to every replica
+    close(self):
+        Closes the listener and every connection
+    '''
+    ddict:DataDictionary
+    listener:Union[Listener, None]
+    connections:List[Connection]
+    pending:List[Connection]
+    last:Dict[str, Any]
+    lock:threading.Lock
+    accept_thread:Union[threading.Thread, None]
+
+    def __init__(self, ddict:DataDictionary, address:Any = None, authkey:bytes = None):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to publish
+        address: Any = None
+            If set, a multiprocessing.connection address to accept replicas on, such as ("localhost", 6000)
+        authkey: bytes = None
+            If set, replicas have to use the same key to connect
+        """
+        self.ddict = ddict
+        self.connections = []
+        self.pending = []
+        self.last = {}
+        self.lock = threading.Lock()
+        self.listener = None
+        self.accept_thread = None
+        if address is not None:
+            self.listener = Listener(address, authkey=authkey)
+            self.accept_thread = threading.Thread(target=self.accept_loop, daemon=True)
+            self.accept_thread.start()
+
+    def accept_loop(self):
+        # runs in accept_thread until the listener is closed
+        while True:
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError):
+                return
+            self.add_connection(conn)
+
+    def add_connection(self, conn:Connection):
+        """ Adds a replica's connection. It will be sent the full dictionary on the next publish()
+
+        Parameters
+        ----------
+        conn: Connection
+            The connection, such as one end of a multiprocessing.Pipe()
+        :return:
+        """
+        with self.lock:
+            self.pending.append(conn)
+
+    def changes(self, full:bool = False) -> Tuple[List, List]:
+        """ Returns the master entries that changed since the last call, and the names of entries that were removed.
+        Updates the last values that were sent
+
+        Parameters
+        ----------
+        full: bool = False
+            If True, return every master entry, but don't update the last values
+        :return: A (changed, removed) tuple. changed is a list of (name, type name, value) tuples
+        """
+        changed = []
+        last = self.last
+        de:DictionaryEntry
+        for name, de in self.ddict.ddict.items():
+            if not de.master:
+                continue
+            v = wire_value(de)
+            if full:
+                changed.append((name, de.entry_type.name, v))
+            elif name not in last or not values_equal(v, last[name]):
+                # lists and arrays are usually changed in place, so keep a copy to compare against
+                last[name] = copy.copy(v) if isinstance(v, (list, np.ndarray)) else v
+                changed.append((name, de.entry_type.name, v))
+        removed = [name for name in last if name not in self.ddict.ddict]
+        if not full:
+            for name in removed:
+                del last[name]
+        return changed, removed
+
+    def send(self, conn:Connection, msg:Tuple) -> bool:
+        # sends a message, returning False if the replica has gone away
+        try:
+            conn.send(msg)
+            return True
+        except (OSError, EOFError, BrokenPipeError):
+            conn.close()
+            return False
+
+    def publish(self):
+        """ Sends the changes since the last call to every replica, as one message per replica. Replicas that have
+        just connected are sent every master entry instead. Replicas that have gone away are dropped
+
+        Parameters
+        ----------
+        :return:
+        """
+        tick = self.ddict.store_count
+        changed, removed = self.changes()
+        # ticks with no changes are still sent, so replicas can keep their histories in step
+        msg = ("tick", tick, changed, removed)
+        self.connections = [c for c in self.connections if self.send(c, msg)]
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+        if len(pending) > 0:
+            msg = ("tick", tick, self.changes(full=True)[0], [])
+            self.connections.extend([c for c in pending if self.send(c, msg)])
+
+    def close(self):
+        """ Tells every replica that the publisher is done, and closes the listener and every connection
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+        msg = ("close", self.ddict.store_count, [], [])
+        for c in self.connections + self.pending:
+            self.send(c, msg)
+            c.close()
+        self.connections = []
+        self.pending = []
+
+
+class DictionaryReplica:
+    '''
+    The DictionaryReplica class keeps a DataDictionary in sync with a DictionaryPublisher. Each call to poll()
+    applies the messages that have arrived. Entries that don't exist are created with master == False. Entries
+    that this dictionary owns (master == True) are never overwritten, so two processes can each own part of a
+    hierarchy and replicate the rest from each other. Values are set with set_data() and CommandObject.set() /
+    ResponseObject.set(), so observers on the replica see the changes
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The replica DataDictionary
+    conn:Connection
+        The connection to the publisher
+    store_ticks:bool
+        If True, ddict.store(1) is called after each tick is applied, so the replica's history has a sample for
+        every tick that the master published
+    tick:int
+        The master's store_count in the last message that was applied
+    connected:bool
+        False once the publisher has closed the connection, or close() has been called
+
+    Methods
+    -------
+    poll(self, timeout:float) -> int:
+        Applies every message that has arrived, waiting up to timeout for the first
+    apply(self, changed:List, removed:List):
+        Applies the changes in one message
+    close(self):
+        Closes the connection
+    '''
+    ddict:DataDictionary
+    conn:Connection
+    store_ticks:bool
+    tick:int
+    connected:bool
+
+    def __init__(self, ddict:DataDictionary, address:Any = None, conn:Connection = None, authkey:bytes = None,
+                 store_ticks:bool = False):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The replica DataDictionary
+        address: Any = None
+            The address that the DictionaryPublisher is listening on
+        conn: Connection = None
+            A connection to use instead of an address, such as the other end of a Pipe() given to add_connection()
+        authkey: bytes = None
+            The publisher's authkey
+        store_ticks: bool = False
+            If True, store the replica's history once per tick that is applied
+        """
+        if conn is None:
+            conn = Client(address, authkey=authkey)
+        self.ddict = ddict
+        self.conn = conn
+        self.store_ticks = store_ticks
+        self.tick = -1
+        self.connected = True
+
+    def poll(self, timeout:float = 0) -> int:
+        """ Applies every message that has arrived, waiting up to timeout seconds for the first
+
+        Parameters
+        ----------
+        timeout: float = 0
+            The number of seconds to wait for a message. None waits forever
+        :return: The number of messages applied
+        """
+        count = 0
+        try:
+            while self.connected and self.conn.poll(timeout if count == 0 else 0):
+                kind, tick, changed, removed = self.conn.recv()
+                if kind == "close":
+                    self.close()
+                    break
+                self.apply(changed, removed)
+                self.tick = tick
+                if self.store_ticks:
+                    self.ddict.store(1)
+                count += 1
+        except (EOFError, OSError):
+            self.connected = False
+        return count
+
+    def apply(self, changed:List, removed:List):
+        """ Applies the changes in one message. Entries that this dictionary is the master of are skipped
+
+        Parameters
+        ----------
+        changed: List
+            (name, type name, value) tuples
+        removed: List
+            The names of entries that the master removed
+        :return:
+        """
+        dd = self.ddict
+        for name, type_name, v in changed:
+            de = dd.ddict.get(name)
+            if de is None:
+                # the entry is added empty and then set like any other change, so the observers and subscriptions
+                # that add_entry() attaches to it see the initial value
+                t = DictionaryTypes[type_name]
+                if t == DictionaryTypes.ARRAY:
+                    de = DictionaryEntry(name, t, None, False, dtype=v.dtype, shape=v.shape)
+                else:
+                    de = DictionaryEntry(name, t, None, False)
+                if t == DictionaryTypes.COMMAND or t == DictionaryTypes.RESPONSE:
+                    # the parent and child names are only used for the object's name, which is already known
+                    de.data = CommandObject("", "") if t == DictionaryTypes.COMMAND else ResponseObject("", "")
+                    de.data.name = name
+                dd.add_entry(de)
+            elif de.master:
+                continue
+            t = de.entry_type
+            if t == DictionaryTypes.COMMAND or t == DictionaryTypes.RESPONSE:
+                de.data.set(v[1], v[0])
+            else:
+                de.set_data(v)
+        for name in removed:
+            de = dd.ddict.get(name)
+            if de is not None and not de.master:
+                dd.remove_entry(name)
+
+    def close(self):
+        """ Closes the connection
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.conn.close()
+        self.connected = False
+
+
+def monitor(conn:Connection):
+    # the replica side of the demo below: a read-only monitor that prints what changes
+    ddict = DataDictionary()
+    replica = DictionaryReplica(ddict, conn=conn, store_ticks=True)
+    ddict.subscribe("*", lambda entries: print("replica tick {}: {}".format(
+        replica.tick, ", ".join("{} = {}".format(de.name, de.get_data()) for de in entries))), coalesce=True)
+    while replica.connected:
+        replica.poll(0.1)
+    print(ddict.to_string())
+
+
+if __name__ == "__main__":
+    import multiprocessing as mp
+    from rcsnn.base.Commands import Commands
+
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 0))
+    ddict.add_entry(DictionaryEntry("test_static", DictionaryTypes.STRING, "never changes"))
+    cmd_obj = CommandObject("parent", "child")
+    ddict.add_entry(DictionaryEntry(cmd_obj.name, DictionaryTypes.COMMAND, cmd_obj))
+
+    publisher = DictionaryPublisher(ddict)
+    master_end, replica_end = mp.Pipe()
+    publisher.add_connection(master_end)
+    p = mp.Process(target=monitor, args=(replica_end,))
+    p.start()
+    for i in range(1, 11):
+        ddict.get_entry("elapsed-time").data += 0.1
+        if i % 3 == 0:
+            ddict.get_entry("test_int").data = i
+        if i == 5:
+            cmd_obj.set(Commands.RUN, cmd_obj.next_serial())
+        ddict.store(1)
+        publisher.publish()
+    publisher.close()
+    p.join()
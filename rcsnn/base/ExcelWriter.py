@@ -0,0 +1,240 @@
+import numpy as np
+from typing import Any, List, Tuple
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, array_column_names
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# The size of an Excel worksheet
+excel_max_rows = 1048576
+excel_max_cols = 16384
+
+
+class ExcelWriter:
+    '''
+    The ExcelWriter class exports the history in a DataDictionary to an xlsx file, for when the results have to be a
+    spreadsheet. Unlike DataDictionary.to_excel(), it writes one row per tick and one column per entry (ARRAY entries
+    get one column per element), and it streams the rows through openpyxl's write-only mode, chunk_rows ticks at a
+    time, so the whole history never has to be turned into Python objects at once. Ticks an entry has no sample
+    for are left blank. Past Excel's row or column limit, the data is split across sheets: each sheet holds up to
+    max_rows - 1 ticks and max_cols - 1 entry columns, and starts with a header row and a "tick" column.
+    Requires openpyxl
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary to export
+    chunk_rows:int
+        The number of ticks converted and written at a time
+    max_rows:int
+        The number of rows in a sheet, including the header
+    max_cols:int
+        The number of columns in a sheet, including the tick column
+    names:List
+        The column names, not including "tick". "elapsed-time" comes first if the DataDictionary has it
+    columns:List
+        (ticks, values) tuples for each column, in the same order as names
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    collect(self):
+        Gathers the ticks and values of every entry's history
+    tick_range(self) -> Tuple:
+        Returns the first and last tick in any entry's history
+    column_chunk(self, ticks:np.ndarray, values:np.ndarray, start:int, stop:int) -> List:
+        Returns one column's cells for ticks start up to stop
+    sheet_names(self) -> List:
+        Returns the name and the (first tick, last tick, first column, last column) of each sheet
+    write(self, filename:str):
+        Writes the history to an xlsx file
+    '''
+    ddict:DataDictionary
+    chunk_rows:int
+    max_rows:int
+    max_cols:int
+    names:List[str]
+    columns:List[Tuple[np.ndarray, np.ndarray]]
+
+    def __init__(self, ddict:DataDictionary, chunk_rows:int = 10000, max_rows:int = excel_max_rows,
+                 max_cols:int = excel_max_cols):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary to export
+        chunk_rows: int = 10000
+            The number of ticks converted and written at a time
+        max_rows: int = excel_max_rows
+            The number of rows in a sheet, including the header. The default is Excel's limit
+        max_cols: int = excel_max_cols
+            The number of columns in a sheet, including the tick column. The default is Excel's limit
+        """
+        if Workbook is None:
+            raise ImportError("ExcelWriter requires openpyxl (pip install openpyxl)")
+        if max_rows < 2 or max_cols < 2:
+            raise ValueError("-------- ERROR -------- ExcelWriter() sheets need room for a header row and a tick column")
+        self.reset()
+        self.ddict = ddict
+        self.chunk_rows = chunk_rows
+        self.max_rows = max_rows
+        self.max_cols = max_cols
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.names = []
+        self.columns = []
+
+    def collect(self):
+        """ Gathers the ticks and values of every entry's history. ARRAY entries are split into one column per
+        element, named like the csv columns
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.reset()
+        names = list(self.ddict.ddict.keys())
+        if "elapsed-time" in names:
+            names.remove("elapsed-time")
+            names.insert(0, "elapsed-time")
+        de:DictionaryEntry
+        for name in names:
+            de = self.ddict.ddict[name]
+            values = de.data_list
+            ticks = de.history.ticks()
+            if de.get_type() == DictionaryTypes.ARRAY:
+                flat = values.reshape(len(values), -1)
+                for i, col_name in enumerate(array_column_names(name, values.shape[1:])):
+                    self.names.append(col_name)
+                    self.columns.append((ticks, flat[:, i]))
+            else:
+                self.names.append(name)
+                self.columns.append((ticks, values))
+
+    def tick_range(self) -> Tuple[int, int]:
+        """ Returns the first and last tick in any entry's history
+
+        Parameters
+        ----------
+
+        :return: A (first, last) tuple. If there is no history, last is less than first
+        """
+        first = self.ddict.store_count
+        last = -1
+        for ticks, values in self.columns:
+            if len(ticks) > 0:
+                first = min(first, int(ticks[0]))
+                last = max(last, int(ticks[-1]))
+        return first, last
+
+    def column_chunk(self, ticks:np.ndarray, values:np.ndarray, start:int, stop:int) -> List:
+        """ Returns one column's cells for ticks start up to stop, as Python values that openpyxl can write. Ticks
+        the entry has no sample for are None. Values that aren't numbers or strings are written as strings
+
+        Parameters
+        ----------
+        ticks: np.ndarray
+            The tick of each value
+        values: np.ndarray
+            The column's history
+        start: int
+            The first tick in the chunk
+        stop: int
+            One past the last tick in the chunk
+        :return: A list of length stop - start
+        """
+        i0 = np.searchsorted(ticks, start)
+        i1 = np.searchsorted(ticks, stop)
+        v = values[i0:i1]
+        if v.dtype == object:
+            v = np.array([x if x is None or isinstance(x, (int, float, str)) else str(x) for x in v], dtype=object)
+        if i1 - i0 == stop - start:
+            return v.tolist()
+        full = np.full(stop - start, None, dtype=object)
+        full[ticks[i0:i1] - start] = v.tolist()
+        return full.tolist()
+
+    def sheet_names(self) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+        """ Returns the name of each sheet and the ticks and columns it holds. A run that fits on one sheet is
+        written to "data". Otherwise sheets are named "data_<first tick>" and, if the columns don't fit, also
+        "_c<first column>"
+
+        Parameters
+        ----------
+
+        :return: A list of (name, (first tick, stop tick, first column, stop column)) tuples
+        """
+        first, last = self.tick_range()
+        rows = self.max_rows - 1
+        cols = self.max_cols - 1
+        row_starts = list(range(first, last + 1, rows)) or [first]
+        col_starts = list(range(0, len(self.names), cols)) or [0]
+        sheets = []
+        for c in col_starts:
+            for r in row_starts:
+                name = "data"
+                if len(row_starts) > 1:
+                    name += "_{}".format(r)
+                if len(col_starts) > 1:
+                    name += "_c{}".format(c)
+                sheets.append((name, (r, min(r + rows, last + 1), c, min(c + cols, len(self.names)))))
+        return sheets
+
+    def write(self, filename:str):
+        """ Writes the history to an xlsx file, one sheet at a time and chunk_rows ticks at a time
+
+        Parameters
+        ----------
+        filename: str
+            The path of the file to write
+        :return:
+        """
+        self.collect()
+        wb = Workbook(write_only=True)
+        for name, (start, stop, c0, c1) in self.sheet_names():
+            ws = wb.create_sheet(name)
+            ws.append(["tick"] + self.names[c0:c1])
+            for chunk_start in range(start, stop, self.chunk_rows):
+                chunk_stop = min(chunk_start + self.chunk_rows, stop)
+                cells = [self.column_chunk(ticks, values, chunk_start, chunk_stop) for ticks, values in self.columns[c0:c1]]
+                for row in zip(range(chunk_start, chunk_stop), *cells):
+                    ws.append(row)
+        wb.save(filename)
+
+
+if __name__ == "__main__":
+    from openpyxl import load_workbook
+
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "Hello, world"))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros(2)))
+    for i in range(1, 21):
+        ddict.get_entry("elapsed-time").data += 0.1
+        ddict.get_entry("test_int").data = i
+        ddict.get_entry("test_string").data = "str_{}".format(i)
+        ddict.get_entry("test_array").data[:] = [i, -i]
+        if i == 10:
+            ddict.add_entry(DictionaryEntry("test_late", DictionaryTypes.FLOAT, 0.5))
+        ddict.store(1)
+
+    # small limits to show the split across sheets
+    ew = ExcelWriter(ddict, chunk_rows=4, max_rows=9, max_cols=4)
+    ew.write("test.xlsx")
+    wb = load_workbook("test.xlsx", read_only=True)
+    for ws in wb.worksheets:
+        print(ws.title)
+        for row in ws.iter_rows(max_row=3, values_only=True):
+            print("\t{}".format(row))
@@ -0,0 +1,469 @@
+import numpy as np
+from functools import lru_cache
+from typing import Any, Tuple
+
+
+class EvictionTypes():
+    GROW = "grow"
+    OVERWRITE = "overwrite"
+    DECIMATE = "decimate"
+
+
+@lru_cache(maxsize=None)
+def int_range(dtype:np.dtype) -> Tuple[int, int]:
+    # the smallest and largest values an integer dtype can hold
+    info = np.iinfo(dtype)
+    return int(info.min), int(info.max)
+
+
+def fits_dtype(value:Any, dtype:Any) -> bool:
+    """ Returns True if a scalar value can be written into an array of the dtype without being changed. Integer
+    dtypes only hold integers in their range, and float dtypes only hold numbers, so None, strings, and fractions
+    aren't quietly stored as NaN, parsed numbers, or truncated integers. Object dtypes hold anything
+
+    Parameters
+    ----------
+    value: Any
+        The value to check
+    dtype: Any
+        The NumPy dtype of the array
+    :return: True if the value can be stored as it is
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind in "iu":
+        if not isinstance(value, (int, np.integer)):
+            return False
+        low, high = int_range(dtype)
+        return low <= value <= high
+    if dtype.kind == "f":
+        return isinstance(value, (int, float, np.integer, np.floating))
+    if dtype.kind == "b":
+        return isinstance(value, (bool, np.bool_))
+    return True
+
+
+# the types that always fit a numeric dtype kind, so that append() only calls fits_dtype() for anything else. A
+# Python int that is too big for an int buffer raises OverflowError when it is written, which also promotes
+fitting_types = {"i": frozenset([int, bool, np.int64, np.int32, np.int16, np.int8, np.uint8, np.uint16, np.uint32]),
+                 "f": frozenset([float, int, bool, np.float64, np.float32, np.float16, np.int64, np.int32])}
+
+
+class HistoryBuffer:
+    '''
+    The HistoryBuffer class holds the stored values of a DictionaryEntry in a typed, preallocated NumPy array, so that
+    appending a sample is a slot write rather than a Python list append
+
+    Attributes
+    ----------
+    dtype:Any
+        The NumPy dtype of the buffer. INT and FLOAT entries use int64 and float64. Everything else is stored as object
+    shape:Tuple
+        The shape of each sample. The default, (), stores scalars. A shape of (n,) stores rows of n values, which
+        makes the buffer a tick-by-column matrix
+    capacity:int
+        The number of samples the buffer can hold before the eviction policy is applied
+    eviction:str
+        One of the EvictionTypes. GROW doubles the buffer when it is full, OVERWRITE turns it into a ring buffer
+        that overwrites the oldest sample, and DECIMATE drops every other sample and halves the sample rate
+    buf:np.ndarray
+        The storage. For OVERWRITE it is twice the capacity and every value is written twice, so that the
+        window of valid samples is always contiguous and can be returned as a view
+    pos:int
+        The next slot to write to
+    size:int
+        The number of valid samples in the buffer
+    total:int
+        The number of times append() has been called
+    stride:int
+        The number of appends per stored sample. Only changes under DECIMATE
+    start_tick:int
+        The tick of the first append. Used to map samples back to DataDictionary ticks
+
+    Methods
+    -------
+    reset(self):
+        Empties the buffer without changing its configuration
+    append(self, value:Any):
+        Writes a value into the next slot, applying the eviction policy if the buffer is full
+    view(self) -> np.ndarray:
+        Returns the valid samples, oldest first, as a view into the buffer
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample in view()
+    last(self) -> Any:
+        Returns the most recent sample
+    set_last(self, value:Any):
+        Overwrites the most recent sample
+    widen(self, width:int, fill:Any):
+        Grows a buffer of rows to rows of width values, setting the new columns to fill
+    fill(self, value:Any, count:int):
+        Appends the same value count times, in one vectorized write where possible
+    extend(self, values:np.ndarray):
+        Appends an array of samples, in one vectorized write where possible
+    copy_from(self, other:"HistoryBuffer"):
+        Appends all the samples in another buffer to this one
+    to_string(self) -> str:
+        Returns a string describing the configuration and fill of this buffer
+    '''
+    __slots__ = ["dtype", "shape", "capacity", "eviction", "buf", "pos", "size", "total", "stride", "start_tick", "fitting"]
+    dtype:Any
+    shape:Tuple
+    capacity:int
+    eviction:str
+    buf:np.ndarray
+    pos:int
+    size:int
+    total:int
+    stride:int
+    start_tick:int
+    fitting:Any
+
+    def __init__(self, dtype:Any = object, capacity:int = 16, eviction:str = EvictionTypes.GROW, shape:Tuple = ()):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        dtype: Any
+            The NumPy dtype of the stored samples
+        capacity: int
+            The number of samples to preallocate. For OVERWRITE and DECIMATE, this is also the maximum
+        eviction: str
+            One of the EvictionTypes
+        shape: Tuple = ()
+            The shape of each sample
+        """
+        if capacity < 1:
+            raise ValueError("-------- ERROR -------- HistoryBuffer() capacity must be at least 1, not {}".format(capacity))
+        if eviction == EvictionTypes.DECIMATE and capacity < 2:
+            raise ValueError("-------- ERROR -------- HistoryBuffer() DECIMATE needs a capacity of at least 2")
+        self.dtype = dtype
+        self.shape = tuple(shape)
+        self.capacity = capacity
+        self.eviction = eviction
+        self.start_tick = 0
+        self.buf = np.empty(((2 * capacity if eviction == EvictionTypes.OVERWRITE else capacity),) + self.shape, dtype=dtype)
+        self.pos = 0
+        self.size = 0
+        self.total = 0
+        self.stride = 1
+        # the Python types that can be written to the buffer without a range check. None for object and row buffers
+        self.fitting = fitting_types.get(self.buf.dtype.kind) if self.shape == () else None
+
+    def reset(self):
+        """ Empties the buffer without changing its configuration
+
+        Parameters
+        ----------
+        :return:
+        """
+        slots = self.capacity
+        if self.eviction == EvictionTypes.OVERWRITE:
+            slots *= 2
+        self.buf = np.empty((slots,) + self.shape, dtype=self.dtype)
+        self.pos = 0
+        self.size = 0
+        self.total = 0
+        self.stride = 1
+
+    def promote(self):
+        """ Convert the buffer to an object array so that it can hold values that don't fit the numeric dtype
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.dtype = object
+        self.buf = self.buf.astype(object)
+        self.fitting = None
+
+    def append(self, value:Any):
+        """ Writes a value into the next slot, applying the eviction policy if the buffer is full. A scalar that
+        doesn't fit the dtype (None, a string, a fraction in an int buffer, or an integer out of range) promotes
+        the buffer to object first, so it is stored as it is
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        :return:
+        """
+        self.total += 1
+        stride = self.stride
+        if stride > 1 and (self.total - 1) % stride != 0:
+            return
+        size = self.size
+        capacity = self.capacity
+        eviction = self.eviction
+        if size == capacity:
+            if eviction == EvictionTypes.GROW:
+                self.capacity = capacity = capacity * 2
+                nb = np.empty((capacity,) + self.shape, dtype=self.dtype)
+                nb[:size] = self.buf[:size]
+                self.buf = nb
+            elif eviction == EvictionTypes.DECIMATE:
+                kept = self.buf[0:size:2].copy()
+                self.size = size = len(kept)
+                self.buf[:size] = kept
+                self.pos = size
+                self.stride *= 2
+                if (self.total - 1) % self.stride != 0:
+                    return
+        fitting = self.fitting
+        if fitting is not None and type(value) not in fitting and not fits_dtype(value, self.buf.dtype):
+            self.promote()
+        pos = self.pos
+        try:
+            self.buf[pos] = value
+        except (TypeError, ValueError, OverflowError):
+            self.promote()
+            self.buf[pos] = value
+        if eviction == EvictionTypes.OVERWRITE:
+            self.buf[pos + capacity] = value
+            self.pos = (pos + 1) % capacity
+            if size < capacity:
+                self.size = size + 1
+        else:
+            self.pos = pos + 1
+            self.size = size + 1
+
+    def view(self) -> np.ndarray:
+        """ Returns the valid samples, oldest first, as a view into the buffer
+
+        Parameters
+        ----------
+
+        :return: The stored samples. This is a view, so it changes as the buffer is written to
+        """
+        if self.eviction == EvictionTypes.OVERWRITE and self.size == self.capacity:
+            return self.buf[self.pos:self.pos + self.capacity]
+        return self.buf[:self.size]
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view(). Ticks count the appends, starting at start_tick
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        return self.first_tick() + np.arange(self.size, dtype=np.int64) * self.stride
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample in view()
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        if self.eviction == EvictionTypes.OVERWRITE:
+            return self.start_tick + self.total - self.size
+        return self.start_tick
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if the buffer is empty
+        """
+        if self.size == 0:
+            return None
+        if self.eviction == EvictionTypes.OVERWRITE:
+            return self.buf[(self.pos - 1) % self.capacity]
+        return self.buf[self.pos - 1]
+
+    def set_last(self, value:Any):
+        """ Overwrites the most recent sample. Used to fill in values that arrive after a row has been appended
+
+        Parameters
+        ----------
+        value: Any
+            The new value for the most recent sample
+        :return:
+        """
+        if self.size == 0:
+            return
+        if self.eviction == EvictionTypes.OVERWRITE:
+            i = (self.pos - 1) % self.capacity
+            self.buf[i] = value
+            self.buf[i + self.capacity] = value
+        else:
+            self.buf[self.pos - 1] = value
+
+    def widen(self, width:int, fill:Any):
+        """ Grows a buffer of rows to rows of width values, setting the new columns to fill. The buffer must
+        have been created with a shape of (n,)
+
+        Parameters
+        ----------
+        width: int
+            The new number of values in each row. Must be at least the current width
+        fill: Any
+            The value for the new columns in rows that have already been written
+        :return:
+        """
+        old = self.shape[0]
+        if width <= old:
+            return
+        nb = np.full((len(self.buf), width), fill, dtype=self.dtype)
+        nb[:, :old] = self.buf
+        self.buf = nb
+        self.shape = (width,)
+
+    def reserve(self, count:int):
+        # GROW only: doubles the capacity until it holds count samples, as append() would
+        if count <= self.capacity:
+            return
+        while self.capacity < count:
+            self.capacity *= 2
+        nb = np.empty((self.capacity,) + self.shape, dtype=self.dtype)
+        nb[:self.size] = self.buf[:self.size]
+        self.buf = nb
+
+    def write_ring(self, values:Any, n:int, fill:bool):
+        # OVERWRITE only: writes n samples (a repeated value if fill is True) at pos, wrapping and mirroring
+        first = min(n, self.capacity - self.pos)
+        segments = [(self.pos, 0, first), (0, first, n - first)]
+        for start, offset, length in segments:
+            if length <= 0:
+                continue
+            for base in [start, start + self.capacity]:
+                if fill:
+                    self.fill_slots(base, base + length, values)
+                else:
+                    self.buf[base:base + length] = values[offset:offset + length]
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def fill_slots(self, start:int, stop:int, value:Any):
+        # writes value into slots start up to stop. Scalars (including lists in an object buffer) use ndarray.fill(),
+        # samples with a shape are broadcast
+        if self.shape == ():
+            self.buf[start:stop].fill(value)
+        else:
+            self.buf[start:stop] = value
+
+    def fill(self, value:Any, count:int):
+        """ Appends the same value count times. This is the same as calling append(value) count times, but GROW and
+        OVERWRITE buffers, and empty DECIMATE buffers, are written in one vectorized fill
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        count: int
+            The number of times to store it
+        :return:
+        """
+        if count <= 0:
+            return
+        if self.stride == 1 and self.eviction == EvictionTypes.GROW:
+            self.reserve(self.size + count)
+            region = slice(self.size, self.size + count)
+        elif self.eviction == EvictionTypes.OVERWRITE:
+            region = None
+        elif self.eviction == EvictionTypes.DECIMATE and self.total == 0:
+            # every sample is the same, so only the final stride and size matter
+            stride = 1
+            while -(-count // stride) > self.capacity:
+                stride *= 2
+            self.stride = stride
+            region = slice(0, -(-count // stride))
+        else:
+            for i in range(count):
+                self.append(value)
+            return
+        if self.shape == () and self.buf.dtype.kind != "O" and not fits_dtype(value, self.buf.dtype):
+            self.promote()
+        try:
+            np.empty((1,) + self.shape, dtype=self.dtype)[0] = value
+        except (TypeError, ValueError, OverflowError):
+            self.promote()
+        if region is None:
+            n = min(count, self.capacity)
+            self.total += count - n
+            self.write_ring(value, n, True)
+            self.total += n
+            return
+        self.fill_slots(region.start, region.stop, value)
+        self.pos = self.size = region.stop
+        self.total += count
+
+    def extend(self, values:np.ndarray):
+        """ Appends an array of samples. This is the same as calling append() for each one, but GROW and OVERWRITE
+        buffers are written in one vectorized copy
+
+        Parameters
+        ----------
+        values: np.ndarray
+            The samples to store, oldest first
+        :return:
+        """
+        n = len(values)
+        if n == 0:
+            return
+        if self.shape == () and self.buf.dtype.kind != "O" and not np.can_cast(values.dtype, self.buf.dtype, "safe"):
+            # the same check as append(), made once for the whole array where the cast is known to be safe
+            if not all([fits_dtype(v, self.buf.dtype) for v in values]):
+                self.promote()
+        if self.stride == 1 and self.eviction == EvictionTypes.GROW:
+            self.reserve(self.size + n)
+            try:
+                self.buf[self.size:self.size + n] = values
+            except (TypeError, ValueError, OverflowError):
+                self.promote()
+                self.buf[self.size:self.size + n] = values
+            self.pos = self.size = self.size + n
+            self.total += n
+        elif self.eviction == EvictionTypes.OVERWRITE:
+            # only the last capacity samples can survive
+            skipped = max(0, n - self.capacity)
+            self.total += skipped
+            values = values[skipped:]
+            try:
+                self.write_ring(values, len(values), False)
+            except (TypeError, ValueError, OverflowError):
+                self.promote()
+                self.write_ring(values, len(values), False)
+            self.total += len(values)
+        else:
+            for v in values:
+                self.append(v)
+
+    def copy_from(self, other:"HistoryBuffer"):
+        """ Appends all the samples in another buffer to this one
+
+        Parameters
+        ----------
+        other: HistoryBuffer
+            The buffer to copy from
+        :return:
+        """
+        if self.total == 0:
+            self.start_tick = other.ticks()[0] if len(other) > 0 else other.start_tick
+        self.extend(other.view())
+
+    def __len__(self) -> int:
+        return self.size
+
+    def to_string(self) -> str:
+        """ Returns a string describing the configuration and fill of this buffer
+
+        Parameters
+        ----------
+
+        :return: A string with the dtype, eviction policy, fill, and capacity
+        """
+        return "HistoryBuffer (dtype = {}, shape = {}, eviction = {}): {} of {}, stride = {}".format(
+            np.dtype(self.dtype), self.shape, self.eviction, self.size, self.capacity, self.stride)
+
+
+if __name__ == "__main__":
+    for ev in [EvictionTypes.GROW, EvictionTypes.OVERWRITE, EvictionTypes.DECIMATE]:
+        hb = HistoryBuffer(np.int64, 4, ev)
+        for i in range(11):
+            hb.append(i)
+        print("{}\n\tview = {}\n\tticks = {}".format(hb.to_string(), hb.view(), hb.ticks()))
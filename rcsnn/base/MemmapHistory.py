@@ -0,0 +1,305 @@
+import hashlib
+import os
+import re
+import numpy as np
+from typing import Any, Dict, Union
+
+from rcsnn.base.HistoryBuffer import fits_dtype
+
+
+class MemmapHistory:
+    '''
+    The MemmapHistory class keeps the history of a numeric DictionaryEntry in a file that grows as samples are
+    added. Only the most recent hot_window samples are held in memory. When the window fills, it is written to
+    the file through an np.memmap and emptied. It has the same reading methods as a HistoryBuffer
+
+    Attributes
+    ----------
+    filename:str
+        The file that holds the history
+    dtype:Any
+        The NumPy dtype of the samples
+    hot_window:int
+        The number of samples held in memory before they are written to the file
+    hot:np.ndarray
+        The in-memory samples that have not been written to the file yet
+    hot_count:int
+        The number of valid samples in hot
+    flushed:int
+        The number of samples that have been written to the file
+    file_capacity:int
+        The number of samples the file currently has room for
+    mm:np.memmap
+        The memory map of the file, or None if nothing has been written
+    promoted:Dict
+        The samples that don't fit dtype (such as None), by index. The file holds a placeholder (0 or NaN) for
+        them, and view() returns an object array with them put back, the way a HistoryBuffer promotes
+    start_tick:int
+        The tick of the first sample
+    eviction:str
+        Always "memmap". Nothing is ever evicted
+    capacity:int
+        The same as hot_window
+
+    Methods
+    -------
+    reset(self):
+        Empties the history and the file
+    append(self, value:Any):
+        Adds a sample to the hot window, writing the window to the file if it is full
+    extend(self, values:np.ndarray):
+        Adds an array of samples, writing them to the file in one piece
+    spill(self):
+        Writes the hot window to the file and empties it
+    view(self) -> np.ndarray:
+        Returns every sample, oldest first, as a view of the memory-mapped file
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample
+    last(self) -> Any:
+        Returns the most recent sample
+    close(self):
+        Writes everything to the file and releases the memory map
+    '''
+    filename:str
+    dtype:Any
+    hot_window:int
+    hot:np.ndarray
+    hot_count:int
+    flushed:int
+    file_capacity:int
+    mm:Union[np.memmap, None]
+    promoted:Dict[int, Any]
+    start_tick:int
+    eviction:str
+    capacity:int
+
+    def __init__(self, filename:str, dtype:Any = np.float64, hot_window:int = 4096):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        filename: str
+            The file to keep the history in. It is created, or emptied if it exists. Missing directories are created
+        dtype: Any = np.float64
+            The NumPy dtype of the samples. Must be numeric
+        hot_window: int = 4096
+            The number of samples held in memory before they are written to the file
+        """
+        self.filename = filename
+        self.dtype = dtype
+        self.hot_window = hot_window
+        self.capacity = hot_window
+        self.eviction = "memmap"
+        self.start_tick = 0
+        self.mm = None
+        dirname = os.path.dirname(filename)
+        if dirname != "":
+            os.makedirs(dirname, exist_ok=True)
+        self.reset()
+
+    @staticmethod
+    def make_filename(dirname:str, name:str) -> str:
+        """ Returns a filename in dirname for an entry name. Characters that aren't safe in filenames are replaced,
+        and a hash of the full name is added so that names like "a/b" and "a_b" don't share a file
+
+        Parameters
+        ----------
+        dirname: str
+            The directory for the file
+        name: str
+            The name of the DictionaryEntry
+        :return: The path of the file
+        """
+        digest = hashlib.md5(name.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(dirname, "{}_{}.dat".format(re.sub(r"[^\w\-.]", "_", name), digest))
+
+    def reset(self):
+        """ Empties the history and the file
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.mm = None
+        self.promoted = {}
+        self.hot = np.empty(self.hot_window, dtype=self.dtype)
+        self.hot_count = 0
+        self.flushed = 0
+        self.file_capacity = 0
+        with open(self.filename, "wb"):
+            pass
+
+    def reserve(self, count:int):
+        """ Makes sure the file has room for count samples, doubling its size if it doesn't
+
+        Parameters
+        ----------
+        count: int
+            The number of samples the file has to hold
+        :return:
+        """
+        if count <= self.file_capacity:
+            return
+        new_capacity = max(count, 2 * self.file_capacity, self.hot_window)
+        self.mm = None
+        with open(self.filename, "r+b") as f:
+            f.truncate(new_capacity * np.dtype(self.dtype).itemsize)
+        self.file_capacity = new_capacity
+        self.mm = np.memmap(self.filename, dtype=self.dtype, mode="r+", shape=(new_capacity,))
+
+    def append(self, value:Any):
+        """ Adds a sample to the hot window, writing the window to the file if it is full. A value that doesn't fit
+        dtype is kept in promoted, with a placeholder in the window
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        :return:
+        """
+        if not fits_dtype(value, self.dtype):
+            self.promoted[len(self)] = value
+            value = np.nan if np.dtype(self.dtype).kind == "f" else 0
+        self.hot[self.hot_count] = value
+        self.hot_count += 1
+        if self.hot_count == self.hot_window:
+            self.spill()
+
+    def extend(self, values:np.ndarray):
+        """ Adds an array of samples. The hot window is written to the file, then the samples are written after it
+        in one piece
+
+        Parameters
+        ----------
+        values: np.ndarray
+            The samples to store, oldest first
+        :return:
+        """
+        n = len(values)
+        if n == 0:
+            return
+        if not np.can_cast(values.dtype, self.dtype, "safe"):
+            # an object array (from a promoted HistoryBuffer) or a lossy cast, so each value is checked
+            for v in values:
+                self.append(v)
+            return
+        self.spill()
+        self.reserve(self.flushed + n)
+        self.mm[self.flushed:self.flushed + n] = values
+        self.flushed += n
+
+    def spill(self):
+        """ Writes the hot window to the file and empties it
+
+        Parameters
+        ----------
+        :return:
+        """
+        n = self.hot_count
+        if n == 0:
+            return
+        self.reserve(self.flushed + n)
+        self.mm[self.flushed:self.flushed + n] = self.hot[:n]
+        self.flushed += n
+        self.hot_count = 0
+
+    def view(self) -> np.ndarray:
+        """ Returns every sample, oldest first. The hot window is copied into the file (without emptying it), so the
+        result is a view of the memory-mapped file, and pages are only read in as they are used. If there are
+        promoted samples, the result is an object array copy instead
+
+        Parameters
+        ----------
+
+        :return: An np.memmap of the history
+        """
+        n = self.flushed + self.hot_count
+        if n == 0:
+            return self.hot[:0]
+        self.reserve(n)
+        self.mm[self.flushed:n] = self.hot[:self.hot_count]
+        if len(self.promoted) > 0:
+            values = self.mm[:n].astype(object)
+            for i, v in self.promoted.items():
+                values[i] = v
+            return values
+        return self.mm[:n]
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view()
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        return self.start_tick + np.arange(len(self), dtype=np.int64)
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        return self.start_tick
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if there are none
+        """
+        if len(self) - 1 in self.promoted:
+            return self.promoted[len(self) - 1]
+        if self.hot_count > 0:
+            return self.hot[self.hot_count - 1]
+        if self.flushed > 0:
+            return self.mm[self.flushed - 1]
+        return None
+
+    def close(self):
+        """ Writes everything to the file and releases the memory map. The file is trimmed to the number of samples,
+        so it can be loaded later with np.fromfile(). Promoted samples are only in memory
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.spill()
+        if self.mm is not None:
+            self.mm.flush()
+        self.mm = None
+        with open(self.filename, "r+b") as f:
+            f.truncate(self.flushed * np.dtype(self.dtype).itemsize)
+        self.file_capacity = self.flushed
+        if self.flushed > 0:
+            self.mm = np.memmap(self.filename, dtype=self.dtype, mode="r+", shape=(self.flushed,))
+
+    def __len__(self) -> int:
+        return self.flushed + self.hot_count
+
+    def to_string(self) -> str:
+        return "MemmapHistory ({}, dtype = {}): {} samples, {} in memory".format(
+            self.filename, np.dtype(self.dtype), len(self), self.hot_count)
+
+
+if __name__ == "__main__":
+    filename = MemmapHistory.make_filename("test_history", "a/b")
+    mh = MemmapHistory(filename, np.float64, hot_window=8)
+    for i in range(20):
+        mh.append(i / 10)
+    print(mh.to_string())
+    print(mh.view())
+    mh.close()
+    print(np.fromfile(filename, dtype=np.float64))
+    mh.append(None)
+    print(mh.last(), mh.view()[-3:])
+    mh.close()
+    os.remove(filename)
+    os.rmdir("test_history")
@@ -1,4 +1,5 @@
 from rcsnn.base.Responses import Responses
+from typing import Callable, List
 
 class ResponseObject():
     '''
@@ -16,6 +17,8 @@ class ResponseObject():
         The name of the child that gets the command
     name:str
         The name of this command
+    listeners:List
+        Callables with no arguments that are called when set() changes the response. Used by DictionaryEntry observers
 
 
     Methods
@@ -35,6 +38,7 @@ class ResponseObject():
     parentname:str
     childname:str
     name:str
+    listeners:List[Callable]
 
     def __init__(self, parentname: str, childname: str):
         """ Constructor. Sets up this instance
@@ -48,6 +52,7 @@ class ResponseObject():
         :return:
         """
         self.reset()
+        self.listeners = []
         self.parentname = parentname
         self.childname = childname
         self.name = "RSP_{}_to_{}".format(childname, parentname)
@@ -76,9 +81,13 @@ class ResponseObject():
             The new sertial number
         :return:
         """
+        changed = rsp != self.rsp or (serial > 0 and serial != self.serial)
         self.rsp = rsp
         if serial > 0:
             self.serial = serial
+        if changed:
+            for listener in self.listeners:
+                listener()
 
     def get(self) -> Responses:
         """ Get the current Responses enum
@@ -0,0 +1,194 @@
+import copy
+import numpy as np
+from typing import Any, Callable, Union
+
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes
+from rcsnn.base.SamplingPolicy import SamplingPolicy, EveryN, TimePeriod, MinMaxBucket, LTTB
+
+
+class SampledHistory:
+    '''
+    The SampledHistory class keeps the history of a DictionaryEntry through a SamplingPolicy, which decides which
+    stored values are worth keeping. Each kept sample is recorded with its tick, so samples don't have to be evenly
+    spaced. It has the same reading methods as a HistoryBuffer. Samples the policy hasn't decided on yet are
+    included at full resolution
+
+    Attributes
+    ----------
+    dtype:Any
+        The NumPy dtype of the kept values
+    policy:SamplingPolicy
+        This history's copy of the policy
+    clock:Callable
+        Returns the current elapsed-time, or None. Set by the DataDictionary
+    index:HistoryBuffer
+        The append count (starting at zero) of each kept sample
+    values:HistoryBuffer
+        The value of each kept sample
+    total:int
+        The number of times append() has been called
+    start_tick:int
+        The tick of the first append
+    eviction:str
+        Always "sampled". The policy decides what is kept
+
+    Methods
+    -------
+    reset(self):
+        Empties the history
+    append(self, value:Any):
+        Passes the value to the policy
+    keep(self, index:int, value:Any):
+        Records a sample. Called by the policy
+    view(self) -> np.ndarray:
+        Returns the kept samples, oldest first
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample
+    last(self) -> Any:
+        Returns the most recent sample
+    '''
+    dtype:Any
+    policy:SamplingPolicy
+    clock:Union[Callable, None]
+    index:HistoryBuffer
+    values:HistoryBuffer
+    total:int
+    start_tick:int
+    eviction:str
+
+    def __init__(self, policy:SamplingPolicy, dtype:Any = object, capacity:int = 16, clock:Callable = None):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        policy: SamplingPolicy
+            The policy to copy
+        dtype: Any = object
+            The NumPy dtype of the kept values
+        capacity: int = 16
+            The number of samples to preallocate. The buffers grow as needed
+        clock: Callable = None
+            Returns the current elapsed-time, or None
+        """
+        self.dtype = dtype
+        self.policy = copy.copy(policy)
+        self.clock = clock
+        self.eviction = "sampled"
+        self.start_tick = 0
+        self.index = HistoryBuffer(np.int64, capacity, EvictionTypes.GROW)
+        self.values = HistoryBuffer(dtype, capacity, EvictionTypes.GROW)
+        self.reset()
+
+    @property
+    def capacity(self) -> int:
+        return self.values.capacity
+
+    def reset(self):
+        """ Empties the history
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.policy.reset()
+        self.index.reset()
+        self.values.reset()
+        self.total = 0
+
+    def append(self, value:Any):
+        """ Passes the value to the policy, which decides whether to keep it
+
+        Parameters
+        ----------
+        value: Any
+            The value to store
+        :return:
+        """
+        t = None if self.clock is None else self.clock()
+        self.policy.sample(self, self.total, t, value)
+        self.total += 1
+
+    def keep(self, index:int, value:Any):
+        """ Records a sample. Called by the policy, in index order
+
+        Parameters
+        ----------
+        index: int
+            The append count of the sample
+        value: Any
+            The value
+        :return:
+        """
+        self.index.append(index)
+        self.values.append(value)
+        self.dtype = self.values.dtype
+
+    def view(self) -> np.ndarray:
+        """ Returns the kept samples, oldest first, followed by the pending ones. This is a view into the history
+        unless there are pending samples
+
+        Parameters
+        ----------
+
+        :return: The samples
+        """
+        pi, pv = self.policy.pending()
+        if len(pv) == 0:
+            return self.values.view()
+        p = np.empty(len(pv), dtype=self.dtype)
+        p[:] = pv
+        return np.concatenate([self.values.view(), p])
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view()
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        pi, pv = self.policy.pending()
+        return self.start_tick + np.concatenate([self.index.view(), np.array(pi, dtype=np.int64)])
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        t = self.ticks()
+        return int(t[0]) if len(t) > 0 else self.start_tick
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if there are none
+        """
+        pi, pv = self.policy.pending()
+        if len(pv) > 0:
+            return pv[-1]
+        return self.values.last()
+
+    def __len__(self) -> int:
+        return len(self.values) + len(self.policy.pending()[1])
+
+    def to_string(self) -> str:
+        return "SampledHistory ({}, dtype = {}): {} of {} samples".format(
+            self.policy.to_string(), np.dtype(self.dtype), len(self), self.total)
+
+
+if __name__ == "__main__":
+    signal = np.sin(np.linspace(0, 4 * np.pi, 100))
+    signal[37] = 3.0
+    for policy in [EveryN(10), TimePeriod(0.5), MinMaxBucket(10), LTTB(10)]:
+        sh = SampledHistory(policy, np.float64, clock=lambda: sh.total * 0.1)
+        for v in signal:
+            sh.append(v)
+        print("{}\n\tticks = {}\n\tmax = {:.2f}".format(sh.to_string(), sh.ticks(), sh.view().max()))
@@ -0,0 +1,254 @@
+from typing import Any, List, Tuple, Union
+
+
+class SamplingPolicy:
+    '''
+    The SamplingPolicy class is the base class for the policies that decide which samples a SampledHistory keeps.
+    The default keeps every sample. A policy is a template: each SampledHistory works with its own copy, so one
+    policy can be passed to any number of entries
+
+    Methods
+    -------
+    reset(self):
+        Clears any samples or state from the previous run
+    sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        Called for every stored value. Calls history.keep() for the samples that should be kept
+    pending(self) -> Tuple:
+        Returns the (indices, values) of samples that have been seen but not yet kept or discarded
+    to_string(self) -> str:
+        Returns a string describing the policy
+    '''
+
+    def reset(self):
+        """ Clears any samples or state from the previous run
+
+        Parameters
+        ----------
+        :return:
+        """
+        pass
+
+    def sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        """ Called for every stored value. Calls history.keep() for the samples that should be kept
+
+        Parameters
+        ----------
+        history: SampledHistory
+            The history to keep samples in
+        index: int
+            The number of values stored before this one
+        t: Union[float, None]
+            The elapsed-time of the sample, or None if the DataDictionary has no "elapsed-time" entry
+        value: Any
+            The stored value
+        :return:
+        """
+        history.keep(index, value)
+
+    def pending(self) -> Tuple[List, List]:
+        """ Returns the samples that have been seen but not yet kept or discarded, oldest first
+
+        Parameters
+        ----------
+
+        :return: An (indices, values) tuple of lists
+        """
+        return [], []
+
+    def to_string(self) -> str:
+        return "{}()".format(self.__class__.__name__)
+
+
+class EveryN(SamplingPolicy):
+    '''
+    The EveryN class keeps one sample in every n, starting with the first
+
+    Attributes
+    ----------
+    n:int
+        The number of stored values per kept sample
+    '''
+    n:int
+
+    def __init__(self, n:int):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        n: int
+            The number of stored values per kept sample
+        """
+        if n < 1:
+            raise ValueError("-------- ERROR -------- EveryN() n must be at least 1, not {}".format(n))
+        self.n = n
+
+    def sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        if index % self.n == 0:
+            history.keep(index, value)
+
+    def to_string(self) -> str:
+        return "EveryN(n = {})".format(self.n)
+
+
+class TimePeriod(SamplingPolicy):
+    '''
+    The TimePeriod class keeps a sample when at least period has passed, in elapsed-time, since the last sample
+    it kept. Without an "elapsed-time" entry, every sample is kept
+
+    Attributes
+    ----------
+    period:float
+        The minimum elapsed-time between kept samples
+    last_time:float
+        The elapsed-time of the last kept sample, or None
+    '''
+    period:float
+    last_time:Union[float, None]
+
+    def __init__(self, period:float):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        period: float
+            The minimum elapsed-time between kept samples
+        """
+        self.period = period
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+
+    def sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        if t is None:
+            history.keep(index, value)
+        elif self.last_time is None or t >= self.last_time + self.period:
+            history.keep(index, value)
+            self.last_time = t
+
+    def to_string(self) -> str:
+        return "TimePeriod(period = {})".format(self.period)
+
+
+class MinMaxBucket(SamplingPolicy):
+    '''
+    The MinMaxBucket class splits the samples into buckets of bucket_size and keeps the smallest and largest
+    sample in each, in the order they arrived, so spikes survive the decimation. The current, unfinished
+    bucket is returned by pending(). Values must be numeric
+
+    Attributes
+    ----------
+    bucket_size:int
+        The number of samples in each bucket
+    indices:List
+        The indices of the samples in the current bucket
+    values:List
+        The values of the samples in the current bucket
+    '''
+    bucket_size:int
+    indices:List[int]
+    values:List[Any]
+
+    def __init__(self, bucket_size:int):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        bucket_size: int
+            The number of samples in each bucket. Each full bucket keeps at most two
+        """
+        if bucket_size < 2:
+            raise ValueError("-------- ERROR -------- MinMaxBucket() bucket_size must be at least 2, not {}".format(bucket_size))
+        self.bucket_size = bucket_size
+        self.reset()
+
+    def reset(self):
+        self.indices = []
+        self.values = []
+
+    def sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        self.indices.append(index)
+        self.values.append(value)
+        if len(self.values) < self.bucket_size:
+            return
+        v = self.values
+        lo = min(range(len(v)), key=v.__getitem__)
+        hi = max(range(len(v)), key=v.__getitem__)
+        for i in sorted({lo, hi}):
+            history.keep(self.indices[i], v[i])
+        self.reset()
+
+    def pending(self) -> Tuple[List, List]:
+        return self.indices, self.values
+
+    def to_string(self) -> str:
+        return "MinMaxBucket(bucket_size = {})".format(self.bucket_size)
+
+
+class LTTB(SamplingPolicy):
+    '''
+    The LTTB class is a streaming version of Largest-Triangle-Three-Buckets downsampling. The samples are split into
+    buckets of bucket_size, and from each bucket it keeps the sample that makes the largest triangle with the last
+    kept sample and the average of the next bucket, which keeps the visual shape of the signal. The first sample
+    is always kept. A bucket is decided once the bucket after it is full, so the last two buckets are returned by
+    pending(). Values must be numeric
+
+    Attributes
+    ----------
+    bucket_size:int
+        The number of samples in each bucket
+    last_kept:Tuple
+        The (index, value) of the last kept sample, or None
+    ready:List
+        The (index, value) samples of the full bucket waiting for the next one
+    current:List
+        The (index, value) samples of the bucket being filled
+    '''
+    bucket_size:int
+    last_kept:Union[Tuple[int, float], None]
+    ready:List[Tuple[int, Any]]
+    current:List[Tuple[int, Any]]
+
+    def __init__(self, bucket_size:int):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        bucket_size: int
+            The number of samples in each bucket. Each bucket keeps one
+        """
+        if bucket_size < 1:
+            raise ValueError("-------- ERROR -------- LTTB() bucket_size must be at least 1, not {}".format(bucket_size))
+        self.bucket_size = bucket_size
+        self.reset()
+
+    def reset(self):
+        self.last_kept = None
+        self.ready = []
+        self.current = []
+
+    def sample(self, history:"SampledHistory", index:int, t:Union[float, None], value:Any):
+        if self.last_kept is None:
+            history.keep(index, value)
+            self.last_kept = (index, value)
+            return
+        self.current.append((index, value))
+        if len(self.current) < self.bucket_size:
+            return
+        if len(self.ready) > 0:
+            cx = sum(i for i, v in self.current) / len(self.current)
+            cy = sum(v for i, v in self.current) / len(self.current)
+            ax, ay = self.last_kept
+            # twice the triangle area, which is enough to compare them
+            best = max(self.ready, key=lambda p: abs((ax - cx) * (p[1] - ay) - (ax - p[0]) * (cy - ay)))
+            history.keep(best[0], best[1])
+            self.last_kept = best
+        self.ready = self.current
+        self.current = []
+
+    def pending(self) -> Tuple[List, List]:
+        samples = self.ready + self.current
+        return [i for i, v in samples], [v for i, v in samples]
+
+    def to_string(self) -> str:
+        return "LTTB(bucket_size = {})".format(self.bucket_size)
@@ -0,0 +1,822 @@
+import functools
+import heapq
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from rcsnn.base.BaseController import BaseController
+from rcsnn.base.CsvLogger import CsvLogger
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry
+
+
+class Scheduler:
+    '''
+    The Scheduler class runs the tick loop for a hierarchy of controllers. BaseController.link_parent_child()
+    records the parent and children of each controller, so the Scheduler only needs the top of the hierarchy. It
+    walks down from the roots once, in build(), and steps every controller after its parent, level by level. Each
+    tick advances "elapsed-time" by dt, stores the DataDictionary, logs a row if there is a logger, and steps the
+    controllers. The step() methods are looked up once and kept in a list, so the cost of a tick doesn't depend on
+    how the controllers were named or created
+
+    With workers > 0, sibling subtrees are stepped at the same time on a thread pool. The controllers above
+    split_level are stepped first, then each subtree that starts at split_level is stepped on its own thread, in
+    the same order as the serial loop, and the tick ends when they are all done. Subtrees that share a controller
+    are merged. Siblings only communicate through their parent, which has already been stepped, so the results
+    are the same as serial stepping. The set() calls on the CommandObjects and ResponseObjects inside the subtrees
+    are double-buffered: their listeners (DictionaryEntry observers and subscriptions) aren't called on the worker
+    threads, but held, and called on the calling thread at the end of the tick, one subtree after another. The
+    command and response values themselves are written in place: nothing outside a subtree reads them until the
+    next tick, when the parent above the split level is stepped, so there is nothing to buffer. Threads
+    pay off when pre_process() spends its time in code that releases the GIL, such as NumPy or neural network
+    inference. Observers of other entries that are set() inside a subtree are still called on the worker thread
+
+    Controllers can run at lower rates than the tick. A controller with a period of n (see BaseController.period)
+    is only stepped on every nth tick, so the upper levels of a hierarchy can plan slowly while the servo levels
+    run every tick. BaseController.step() works out dclock from the clock at its last step, so dclock and elapsed
+    cover the ticks that were skipped. The steps for each combination of due periods are worked out once, by
+    plan(), so a tick only costs one check per distinct period. utilization() reports how often each level was
+    stepped, and with profile set, how long it took
+
+    With event_driven set, idle controllers are parked instead of being stepped every tick. After each step, a
+    controller whose is_idle() returns True stops being stepped until its CommandObject is set(), a child's
+    ResponseObject changes, or the elapsed-time reaches its wakeup. A command set by a parent wakes the child in the
+    same tick, and a response wakes the parent in the next tick, which is when it would have seen it anyway. The
+    cost of a tick then depends on the number of active controllers rather than the size of the hierarchy. Every
+    controller is stepped on the first tick. Event-driven mode steps on the calling thread, so it can't be used
+    with workers
+
+    Attributes
+    ----------
+    ddict:DataDictionary
+        The DataDictionary that the controllers share. It must have an "elapsed-time" entry
+    roots:List
+        The controllers at the top of the hierarchy. Their commands come from outside the Scheduler
+    dt:float
+        The amount "elapsed-time" is advanced each tick
+    skip:int
+        The skip passed to DataDictionary.store()
+    logger:CsvLogger
+        The logger to call once per tick, or None
+    clock:DictionaryEntry
+        The "elapsed-time" entry. Set by build()
+    order:List
+        The controllers in the order they are stepped. Set by build()
+    levels:Dict
+        The level of each controller, keyed by name. Roots are level 0, and a controller linked to more than one
+        parent is one level below the deepest of them. Set by build()
+    tick_count:int
+        The number of ticks run
+    profile:bool
+        If True, the time spent in each controller's step() is added up in step_secs
+    periods:List
+        The distinct periods of the controllers, smallest first. Set by build()
+    plans:Dict
+        The plan() for each combination of due periods, keyed by the tuple of periods
+    plan_ticks:Dict
+        The number of ticks each plan has been run since build()
+    step_secs:Dict
+        With profile set, the seconds spent in each controller's step(), keyed by name
+    build_ticks:int
+        The number of ticks run since build()
+    event_driven:bool
+        If True, idle controllers are parked until something wakes them
+    ready:List
+        In event-driven mode, a heap of the positions in order of the controllers still to be stepped this tick
+    waiting:set
+        In event-driven mode, the positions of the controllers to step on the next tick
+    timed:List
+        In event-driven mode, a heap of (wakeup, position) for parked controllers that have a wakeup
+    current:int
+        In event-driven mode, the position of the controller being stepped. len(order) between ticks
+    steps:List
+        In event-driven mode, the function that steps each controller, in order. Set by build()
+    step_counts:List
+        In event-driven mode, the number of times each controller has been stepped since build()
+    hooks:List
+        In event-driven mode, the (CommandObject or ResponseObject, listener) pairs that wake the controllers
+    workers:int
+        The number of threads that step subtrees. 0 steps everything on the calling thread
+    split_level:int
+        The level whose subtrees are stepped in parallel, or None to use the first level with more than one
+        controller
+    head:List
+        In parallel mode, the controllers above the split level. Set by build()
+    groups:List
+        In parallel mode, the controllers in each subtree, in step order. Set by build()
+    group_objects:List
+        The CommandObjects and ResponseObjects of each group, whose listeners are held during the parallel step.
+        Set by build()
+    pool:ThreadPoolExecutor
+        The worker threads, or None in serial mode. Started by build()
+
+    Methods
+    -------
+    reset(self):
+        Resets all the global values for this class
+    add_root(self, ctrl:BaseController):
+        Adds a controller at the top of the hierarchy
+    build(self):
+        Works out the step order from the links between the controllers
+    seed(self, seed:Any):
+        Gives every controller its own random number stream, all derived from one seed
+    split(self, uppers:Dict):
+        Divides the controllers into the ones above the split level and the subtrees below it
+    due(self, tick:int) -> Tuple:
+        Returns the periods of the controllers that are stepped on a tick
+    plan(self, due:Tuple) -> Tuple:
+        Returns the steps to run on ticks where the controllers with the periods in due are stepped
+    stepper(self, ctrl:BaseController) -> Callable:
+        Returns the function that steps a controller
+    hook(self):
+        Adds the listeners that wake parked controllers
+    wake(self, position:int):
+        Makes the controller at a position in order active
+    step_events(self, tick:int):
+        Steps the active controllers
+    tick(self):
+        Runs one tick
+    step_parallel(self, groups:List):
+        Steps subtrees at the same time on the thread pool
+    run(self, done:Callable, max_ticks:int) -> int:
+        Runs ticks until done() returns True or max_ticks have run
+    utilization(self) -> Dict:
+        Returns how often the controllers at each level were stepped
+    close(self):
+        Shuts down the thread pool and removes the listeners that wake parked controllers
+    to_string(self) -> str:
+        Returns the step order, the number of ticks run, and the utilization of each level
+    '''
+    ddict:DataDictionary
+    roots:List[BaseController]
+    dt:float
+    skip:int
+    logger:Union[CsvLogger, None]
+    clock:Union[DictionaryEntry, None]
+    order:List[BaseController]
+    levels:Dict[str, int]
+    tick_count:int
+    profile:bool
+    periods:List[int]
+    plans:Dict[Tuple[int, ...], Tuple[List[Callable], List[Tuple[List[Callable], List[Any]]], Dict[int, int]]]
+    plan_ticks:Dict[Tuple[int, ...], int]
+    step_secs:Dict[str, float]
+    build_ticks:int
+    event_driven:bool
+    ready:List[int]
+    waiting:set
+    timed:List[Tuple[float, int]]
+    current:int
+    steps:List[Callable]
+    step_counts:List[int]
+    hooks:List[Tuple[Any, Callable]]
+    workers:int
+    split_level:Union[int, None]
+    head:List[BaseController]
+    groups:List[List[BaseController]]
+    group_objects:List[List[Any]]
+    pool:Union[ThreadPoolExecutor, None]
+
+    def __init__(self, ddict:DataDictionary, roots:List[BaseController] = None, dt:float = 0.1, skip:int = 1,
+                 logger:CsvLogger = None, workers:int = 0, split_level:int = None, profile:bool = False,
+                 event_driven:bool = False):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        ddict: DataDictionary
+            The DataDictionary that the controllers share
+        roots: List[BaseController] = None
+            The controllers at the top of the hierarchy. More can be added with add_root()
+        dt: float = 0.1
+            The amount "elapsed-time" is advanced each tick
+        skip: int = 1
+            The skip passed to DataDictionary.store(). The default stores every tick
+        logger: CsvLogger = None
+            A CsvLogger (or AsyncLogger) to call once per tick, after the store
+        workers: int = 0
+            The number of threads that step subtrees in parallel. The default steps everything on the calling thread
+        split_level: int = None
+            The level whose subtrees are stepped in parallel. The default is the first level with more than one
+            controller
+        profile: bool = False
+            If True, time each controller's step(). utilization() reports the totals for each level
+        event_driven: bool = False
+            If True, park idle controllers until their command, a child's response, or their wakeup wakes them
+        """
+        self.pool = None
+        self.hooks = []
+        self.reset()
+        self.ddict = ddict
+        self.dt = dt
+        self.skip = skip
+        self.logger = logger
+        self.workers = workers
+        self.split_level = split_level
+        self.profile = profile
+        self.event_driven = event_driven
+        if event_driven and workers > 0:
+            raise ValueError("-------- ERROR -------- Scheduler() event-driven mode steps on the calling thread, so "
+                             "workers must be 0")
+        if roots is not None:
+            for ctrl in roots:
+                self.add_root(ctrl)
+
+    def reset(self):
+        """ Resets all the global values for this class
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.roots = []
+        self.clock = None
+        self.order = []
+        self.levels = {}
+        self.tick_count = 0
+        self.periods = []
+        self.plans = {}
+        self.plan_ticks = {}
+        self.step_secs = {}
+        self.build_ticks = 0
+        self.ready = []
+        self.waiting = set()
+        self.timed = []
+        self.current = 0
+        self.steps = []
+        self.step_counts = []
+        self.head = []
+        self.groups = []
+        self.group_objects = []
+        self.close()
+
+    def add_root(self, ctrl:BaseController):
+        """ Adds a controller at the top of the hierarchy. Its children, and theirs, are found by build()
+
+        Parameters
+        ----------
+        ctrl: BaseController
+            The controller to add
+        :return:
+        """
+        self.roots.append(ctrl)
+        self.order = []
+
+    def build(self):
+        """ Works out the step order from the links made by BaseController.link_parent_child(). A controller is
+        stepped after all of its parents, so a command set by a parent is seen by the child in the same tick.
+        Called by tick() and run() the first time, and again after add_root(). Call it after linking more
+        controllers into the hierarchy
+
+        Parameters
+        ----------
+        :return:
+        """
+        if len(self.roots) == 0:
+            raise ValueError("-------- ERROR -------- Scheduler.build() there are no root controllers")
+        self.clock = self.ddict.bind("elapsed-time").resolve()
+
+        # find everything below the roots and count the parents of each controller that are in the hierarchy
+        found:List[BaseController] = []
+        parents:Dict[int, int] = {}
+        pending = list(self.roots)
+        while len(pending) > 0:
+            ctrl = pending.pop(0)
+            if id(ctrl) in parents:
+                continue
+            parents[id(ctrl)] = 0
+            found.append(ctrl)
+            pending.extend(ctrl.children)
+        uppers:Dict[int, List[BaseController]] = {id(ctrl):[] for ctrl in found}
+        for ctrl in found:
+            for child in ctrl.children:
+                parents[id(child)] += 1
+                uppers[id(child)].append(ctrl)
+
+        # step a controller once all its parents have been stepped, keeping the order it was found in
+        level = {id(ctrl):0 for ctrl in found}
+        order:List[BaseController] = []
+        ready = [ctrl for ctrl in found if parents[id(ctrl)] == 0]
+        while len(ready) > 0:
+            ctrl = ready.pop(0)
+            order.append(ctrl)
+            for child in ctrl.children:
+                level[id(child)] = max(level[id(child)], level[id(ctrl)] + 1)
+                parents[id(child)] -= 1
+                if parents[id(child)] == 0:
+                    ready.append(child)
+        if len(order) < len(found):
+            names = [ctrl.name for ctrl in found if parents[id(ctrl)] > 0]
+            raise ValueError("-------- ERROR -------- Scheduler.build() the links between {} form a loop".format(names))
+
+        for ctrl in order:
+            if ctrl.period < 1:
+                raise ValueError("-------- ERROR -------- Scheduler.build() {} has a period of {}, which is less than "
+                                 "1".format(ctrl.name, ctrl.period))
+        order.sort(key=lambda c: level[id(c)])
+        self.order = order
+        self.levels = {ctrl.name:level[id(ctrl)] for ctrl in order}
+        self.periods = sorted(set(ctrl.period for ctrl in order))
+        self.plans = {}
+        self.plan_ticks = {}
+        self.step_secs = {}
+        self.build_ticks = 0
+        self.split(uppers)
+        self.hook()
+
+    def seed(self, seed:Any):
+        """ Gives every controller its own random number stream, all derived from one seed. The streams are
+        handed out in step order, so the same hierarchy with the same seed makes the same draws, whichever
+        controllers are stepped on which tick
+
+        Parameters
+        ----------
+        seed: Any
+            An int, or a np.random.SeedSequence (for example one of SeedSequence(n).spawn() for a batch of runs)
+        :return:
+        """
+        if len(self.order) == 0:
+            self.build()
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        for ctrl, child in zip(self.order, seed.spawn(len(self.order))):
+            ctrl.set_rng(np.random.default_rng(child))
+
+    def split(self, uppers:Dict[int, List[BaseController]]):
+        """ Divides the controllers into the ones above the split level, which are stepped first, and the subtrees
+        that start at the split level, which are stepped in parallel. A controller below the split level goes in the
+        same subtree as its parents, and if its parents are in different subtrees, they are merged. Does nothing in
+        serial mode, or if there is only one subtree. Called by build()
+
+        Parameters
+        ----------
+        uppers: Dict[int, List[BaseController]]
+            The parents of each controller, keyed by id()
+        :return:
+        """
+        self.close()
+        self.head = []
+        self.groups = []
+        self.group_objects = []
+        if self.workers < 1:
+            return
+        split_level = self.split_level
+        if split_level is None:
+            counts = {}
+            for level in self.levels.values():
+                counts[level] = counts.get(level, 0) + 1
+            split_level = min([level for level, n in counts.items() if n > 1], default=0)
+        head:List[BaseController] = []
+        groups:List[List[BaseController]] = []
+        owner:Dict[int, int] = {}
+        for ctrl in self.order:
+            level = self.levels[ctrl.name]
+            if level < split_level:
+                head.append(ctrl)
+                continue
+            if level == split_level:
+                g = len(groups)
+                groups.append([])
+            else:
+                g_list = sorted(set(owner[id(p)] for p in uppers[id(ctrl)]))
+                g = g_list[0]
+                for other in g_list[1:]:
+                    for c in groups[other]:
+                        owner[id(c)] = g
+                    groups[g].extend(groups[other])
+                    groups[other] = []
+            owner[id(ctrl)] = g
+            groups[g].append(ctrl)
+        position = {id(ctrl):i for i, ctrl in enumerate(self.order)}
+        groups = [sorted(group, key=lambda c: position[id(c)]) for group in groups if len(group) > 0]
+        if len(groups) < 2:
+            return
+        self.head = head
+        self.groups = groups
+        for group in groups:
+            objs = []
+            for ctrl in group:
+                for obj in [ctrl.cmd, ctrl.rsp]:
+                    if obj is not None and obj not in objs:
+                        objs.append(obj)
+            self.group_objects.append(objs)
+        self.pool = ThreadPoolExecutor(max_workers=min(self.workers, len(groups) - 1),
+                                       thread_name_prefix="Scheduler")
+
+    def due(self, tick:int) -> Tuple[int, ...]:
+        """ Returns the periods of the controllers that are stepped on a tick. A controller with a period of n is
+        stepped on ticks 0, n, 2n ... counting from the first tick this Scheduler ran
+
+        Parameters
+        ----------
+        tick: int
+            The tick, counting from zero
+        :return: A tuple of periods, which is the key for plan()
+        """
+        return tuple(p for p in self.periods if tick % p == 0)
+
+    def plan(self, due:Tuple[int, ...]) -> Tuple[List[Callable], List[Tuple[List[Callable], List[Any]]], Dict[int, int]]:
+        """ Returns the steps to run on ticks where the controllers with the periods in due are stepped. Plans are
+        made once for each combination of periods, and kept in plans
+
+        Parameters
+        ----------
+        due: Tuple[int, ...]
+            The periods that are due, from due()
+        :return: A tuple of the steps to run on the calling thread, the (steps, CommandObjects and ResponseObjects)
+        of each subtree to run in parallel, and the number of controllers stepped at each level
+        """
+        plan = self.plans.get(due)
+        if plan is not None:
+            return plan
+        if self.pool is None:
+            serial = [self.stepper(ctrl) for ctrl in self.order if ctrl.period in due]
+            groups = []
+        else:
+            serial = [self.stepper(ctrl) for ctrl in self.head if ctrl.period in due]
+            groups = []
+            for group, objs in zip(self.groups, self.group_objects):
+                steps = [self.stepper(ctrl) for ctrl in group if ctrl.period in due]
+                if len(steps) > 0:
+                    groups.append((steps, objs))
+            if len(groups) == 1:
+                # one subtree on its own is just stepped after the ones above it
+                serial.extend(groups[0][0])
+                groups = []
+        counts = {}
+        for ctrl in self.order:
+            if ctrl.period in due:
+                counts[self.levels[ctrl.name]] = counts.get(self.levels[ctrl.name], 0) + 1
+        plan = (serial, groups, counts)
+        self.plans[due] = plan
+        self.plan_ticks[due] = 0
+        return plan
+
+    def stepper(self, ctrl:BaseController) -> Callable:
+        """ Returns the function that steps a controller. This is the bound step() method, or with profile set,
+        a function that also adds the time it takes to step_secs
+
+        Parameters
+        ----------
+        ctrl: BaseController
+            The controller
+        :return: A function with no arguments
+        """
+        if not self.profile:
+            return ctrl.step
+        step = ctrl.step
+        secs = self.step_secs
+        name = ctrl.name
+        secs[name] = 0.0
+
+        def timed_step():
+            t = time.perf_counter()
+            step()
+            secs[name] += time.perf_counter() - t
+        return timed_step
+
+    def hook(self):
+        """ In event-driven mode, adds a listener to each controller's CommandObject and to the ResponseObjects
+        of its children, which wakes the controller when they change. Every controller starts out active. Called
+        by build()
+
+        Parameters
+        ----------
+        :return:
+        """
+        if not self.event_driven:
+            return
+        self.steps = [self.stepper(ctrl) for ctrl in self.order]
+        self.step_counts = [0] * len(self.order)
+        self.ready = []
+        self.waiting = set(range(len(self.order)))
+        self.timed = []
+        self.current = len(self.order)
+        for i, ctrl in enumerate(self.order):
+            wake = functools.partial(self.wake, i)
+            for obj in [ctrl.cmd] + list(ctrl.child_rsp_dict.values()):
+                if obj is not None:
+                    obj.listeners.append(wake)
+                    self.hooks.append((obj, wake))
+
+    def wake(self, position:int):
+        """ Makes the controller at a position in order active. If it comes after the controller being stepped,
+        it is stepped later in the same tick, otherwise on the next one
+
+        Parameters
+        ----------
+        position: int
+            The controller's position in order
+        :return:
+        """
+        if position > self.current:
+            if position not in self.ready:
+                heapq.heappush(self.ready, position)
+        else:
+            self.waiting.add(position)
+
+    def step_events(self, tick:int):
+        """ Steps the active controllers, in order. Controllers that are woken while the tick is running are
+        stepped in the same tick if their turn hasn't passed. A controller that isn't due because of its period
+        stays active until it is. A controller that is idle after its step is parked
+
+        Parameters
+        ----------
+        tick: int
+            The tick, counting from zero, for the periods
+        :return:
+        """
+        timed = self.timed
+        clock = self.clock.data
+        waiting = self.waiting
+        while len(timed) > 0 and timed[0][0] <= clock:
+            waiting.add(heapq.heappop(timed)[1])
+        ready = list(waiting)
+        heapq.heapify(ready)
+        self.ready = ready
+        self.waiting = waiting = set()
+        order = self.order
+        steps = self.steps
+        counts = self.step_counts
+        while len(ready) > 0:
+            i = heapq.heappop(ready)
+            ctrl = order[i]
+            if tick % ctrl.period != 0:
+                waiting.add(i)
+                continue
+            self.current = i
+            steps[i]()
+            counts[i] += 1
+            if not ctrl.is_idle():
+                waiting.add(i)
+            elif ctrl.wakeup is not None:
+                heapq.heappush(timed, (ctrl.wakeup, i))
+        self.current = len(order)
+
+    def tick(self):
+        """ Runs one tick: advances "elapsed-time" by dt, stores the DataDictionary, logs a row, and steps every
+        controller that is due, in order
+
+        Parameters
+        ----------
+        :return:
+        """
+        self.run(max_ticks=1)
+
+    def step_parallel(self, groups:List[Tuple[List[Callable], List[Any]]]):
+        """ Steps subtrees at the same time. The first subtree is stepped on the calling thread and the rest on the
+        pool. The listeners of the subtrees' CommandObjects and ResponseObjects are held while they run, and called
+        afterwards, subtree by subtree, in the order set() was called. An exception in any subtree is raised once
+        they have all finished
+
+        Parameters
+        ----------
+        groups: List[Tuple[List[Callable], List[Any]]]
+            The steps of each subtree, and its CommandObjects and ResponseObjects
+        :return:
+        """
+        held:List[Tuple[Any, List[Callable]]] = []
+        pending:List[List[List[Callable]]] = []
+        for steps, objs in groups:
+            calls:List[List[Callable]] = []
+            pending.append(calls)
+            for obj in objs:
+                if len(obj.listeners) > 0:
+                    held.append((obj, obj.listeners))
+                    obj.listeners = [functools.partial(calls.append, obj.listeners)]
+        try:
+            futures = [self.pool.submit(run_steps, steps) for steps, objs in groups[1:]]
+            error = None
+            try:
+                run_steps(groups[0][0])
+            except Exception as e:
+                error = e
+            for f in futures:
+                e = f.exception()
+                if error is None and e is not None:
+                    error = e
+        finally:
+            for obj, listeners in held:
+                # keep any listeners that were added during the step
+                listeners.extend(obj.listeners[1:])
+                obj.listeners = listeners
+        if error is not None:
+            raise error
+        for calls in pending:
+            for listeners in calls:
+                for listener in listeners:
+                    listener()
+
+    def run(self, done:Callable[[], bool] = None, max_ticks:int = None) -> int:
+        """ Runs ticks until done() returns True or max_ticks have run. done() is called after every tick, so it
+        is the place to issue new commands to the roots, print, or check for the end of the run
+
+        Parameters
+        ----------
+        done: Callable[[], bool] = None
+            Called after each tick. The run stops when it returns True. If None, the run stops after max_ticks
+        max_ticks: int = None
+            The most ticks to run. If None, the run stops when done() returns True
+        :return: The number of ticks run
+        """
+        if done is None and max_ticks is None:
+            raise ValueError("-------- ERROR -------- Scheduler.run() needs done() or max_ticks to know when to stop")
+        if len(self.order) == 0:
+            self.build()
+        # everything the loop uses is held in locals
+        clock = self.clock
+        dt = self.dt
+        skip = self.skip
+        store = self.ddict.store
+        log = self.logger.log if self.logger is not None else None
+        periods = self.periods
+        plans = self.plans
+        plan_ticks = self.plan_ticks
+        events = self.step_events if self.event_driven else None
+        count = 0
+        while max_ticks is None or count < max_ticks:
+            clock.data += dt
+            store(skip)
+            if log is not None:
+                log()
+            n = self.tick_count
+            if events is not None:
+                events(n)
+            else:
+                due = tuple(p for p in periods if n % p == 0)
+                plan = plans.get(due)
+                if plan is None:
+                    plan = self.plan(due)
+                for step in plan[0]:
+                    step()
+                if len(plan[1]) > 0:
+                    self.step_parallel(plan[1])
+                plan_ticks[due] += 1
+            count += 1
+            self.build_ticks += 1
+            self.tick_count = n + 1
+            if done is not None and done():
+                break
+        return count
+
+    def utilization(self) -> Dict[int, Tuple[int, int, int, float]]:
+        """ Returns how often the controllers at each level were stepped. A level whose controllers have long
+        periods, or are parked in event-driven mode, has a low utilization. With profile set, also the time spent stepping them
+
+        Parameters
+        ----------
+
+        :return: A Dict keyed by level of (controllers, steps, ticks x controllers, seconds) tuples, counted since
+        build(). seconds is 0 unless profile is set
+        """
+        if len(self.order) == 0:
+            self.build()
+        ticks = self.build_ticks
+        report = {}
+        for i, ctrl in enumerate(self.order):
+            level = self.levels[ctrl.name]
+            n, steps, possible, secs = report.get(level, (0, 0, 0, 0.0))
+            if self.event_driven:
+                steps += self.step_counts[i]
+            report[level] = (n + 1, steps, possible + ticks, secs + self.step_secs.get(ctrl.name, 0.0))
+        for due, plan in self.plans.items():
+            for level, n in plan[2].items():
+                c, steps, possible, secs = report[level]
+                report[level] = (c, steps + n * self.plan_ticks[due], possible, secs)
+        return report
+
+    def close(self):
+        """ Shuts down the thread pool, if there is one, and removes the listeners that wake parked controllers.
+        build() starts and adds them again
+
+        Parameters
+        ----------
+        :return:
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        for obj, wake in self.hooks:
+            if wake in obj.listeners:
+                obj.listeners.remove(wake)
+        self.hooks = []
+
+    def __enter__(self) -> "Scheduler":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def to_string(self) -> str:
+        """ Returns the step order, the number of ticks run, and the utilization of each level
+
+        Parameters
+        ----------
+
+        :return: A string with each controller's level, name and period, in step order
+        """
+        if len(self.order) == 0:
+            self.build()
+        s = "Scheduler: {} controllers, {} ticks".format(len(self.order), self.tick_count)
+        for ctrl in self.order:
+            s += "\n\t{}{}".format("  " * self.levels[ctrl.name], ctrl.name)
+            if ctrl.period > 1:
+                s += " (period = {})".format(ctrl.period)
+        for level, (n, steps, possible, secs) in self.utilization().items():
+            if possible > 0:
+                s += "\n\tlevel {}: {} controllers, {} of {} steps ({:.0%})".format(level, n, steps, possible,
+                                                                                   steps / possible)
+                if self.profile:
+                    s += ", {:.3f}s".format(secs)
+        if self.event_driven:
+            s += "\n\t{} active, {} parked with a wakeup".format(len(self.waiting), len(self.timed))
+        if self.pool is not None:
+            s += "\n\t{} subtrees on {} workers: {}".format(len(self.groups), self.workers,
+                                                          [[ctrl.name for ctrl in group] for group in self.groups])
+        return s
+
+
+def run_steps(steps:List[Callable]):
+    # steps one subtree. Runs on a worker thread in parallel mode
+    for step in steps:
+        step()
+
+
+if __name__ == "__main__":
+    import contextlib
+    import io
+    from rcsnn.base.CommandObject import CommandObject
+    from rcsnn.base.Commands import Commands
+    from rcsnn.base.DataDictionary import DictionaryTypes
+    from rcsnn.base.ResponseObject import ResponseObject
+    from rcsnn.base.Responses import Responses
+
+    class WorkController(BaseController):
+        # a leaf whose pre_process() spends its time in NumPy, the way a neural network would
+        def add_init(self):
+            self.weights = np.random.default_rng(len(self.name)).random((400, 400))
+            self.out = DictionaryEntry("{}-out".format(self.name), DictionaryTypes.FLOAT, 0.0)
+            self.ddict.add_entry(self.out)
+
+        def pre_process(self):
+            self.out.data = float(np.linalg.norm(self.weights @ self.weights) * self.clock)
+
+        def is_idle(self) -> bool:
+            # pre_process() updates the output on every step
+            return False
+
+    def make_hierarchy(workers:int) -> Scheduler:
+        ddict = DataDictionary()
+        ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+        top_cmd = CommandObject("board-monitor", "top")
+        top = BaseController("top", ddict)
+        top.set_cmd_obj(top_cmd)
+        top.set_rsp_obj(ResponseObject("board-monitor", "top"))
+        # the upper levels plan more slowly than the leaves
+        top.set_period(4)
+        # link the children before their parents, to show that the order comes from the links
+        for name in ["a", "b", "c", "d"]:
+            mid = BaseController("mid-{}".format(name), ddict)
+            mid.set_period(2)
+            for i in range(2):
+                BaseController.link_parent_child(mid, WorkController("leaf-{}{}".format(name, i), ddict), ddict)
+            BaseController.link_parent_child(top, mid, ddict)
+        top_cmd.set(Commands.INIT, 1)
+        return Scheduler(ddict, [top], workers=workers, profile=True)
+
+    results = []
+    for workers in [0, 4]:
+        with make_hierarchy(workers) as sched:
+            top = sched.roots[0]
+            ticks = sched.run(lambda: top.rsp.test(Responses.DONE), max_ticks=20)
+            print("INIT done after {} ticks".format(ticks))
+            t = time.perf_counter()
+            sched.run(max_ticks=50)
+            print("workers = {}: 50 ticks in {:.3f}s".format(workers, time.perf_counter() - t))
+            print(sched.to_string())
+            results.append({name:de.data_list for name, de in sched.ddict.ddict.items()})
+    print("same histories: {}".format(all(np.array_equal(results[0][name], results[1][name]) for name in results[0])))
+
+    # a wide hierarchy that sits idle once it is initialized, stepped every tick and then event-driven
+    for event_driven in [False, True]:
+        ddict = DataDictionary()
+        ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+        top_cmd = CommandObject("board-monitor", "top")
+        top = BaseController("top", ddict)
+        top.set_cmd_obj(top_cmd)
+        top.set_rsp_obj(ResponseObject("board-monitor", "top"))
+        for i in range(20):
+            mid = BaseController("mid-{}".format(i), ddict)
+            for j in range(20):
+                BaseController.link_parent_child(mid, BaseController("leaf-{}-{}".format(i, j), ddict), ddict)
+            BaseController.link_parent_child(top, mid, ddict)
+        top_cmd.set(Commands.INIT, 1)
+        with Scheduler(ddict, [top], event_driven=event_driven) as sched:
+            sched.build()
+            with contextlib.redirect_stdout(io.StringIO()):
+                sched.run(lambda: top.rsp.test(Responses.DONE), max_ticks=10)
+            t = time.perf_counter()
+            sched.run(max_ticks=200)
+            print("event_driven = {}: 200 idle ticks in {:.3f}s".format(event_driven, time.perf_counter() - t))
+            for level, (n, steps, possible, secs) in sched.utilization().items():
+                print("\tlevel {}: {} controllers, {} of {} steps".format(level, n, steps, possible))
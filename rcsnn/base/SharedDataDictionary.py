@@ -0,0 +1,474 @@
+import json
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Tuple, Union
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.HistoryBuffer import EvictionTypes
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.ResponseObject import ResponseObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.Responses import Responses
+
+# The slot that DictionaryEntry keeps its data in. SharedDictionaryEntry keeps (SharedDataDictionary, offset, is_float)
+# there instead, and reads and writes the value through it
+raw_data = DictionaryEntry.__dict__["data"]
+
+# The number of int64 words that each type of shared entry uses
+slot_words = {DictionaryTypes.INT: 1, DictionaryTypes.FLOAT: 1, DictionaryTypes.COMMAND: 3, DictionaryTypes.RESPONSE: 2}
+
+
+class SharedDictionaryEntry(DictionaryEntry):
+    '''
+    The SharedDictionaryEntry class is an INT or FLOAT DictionaryEntry whose current value lives in a
+    SharedDataDictionary's shared memory. Entries are converted when they are added, so code that holds the entry
+    keeps working. The history is still local to each process. A shared value is always a number: an entry added
+    with None starts at 0, and setting it to None raises a ValueError
+    '''
+    __slots__ = ()
+
+    @property
+    def data(self) -> Any:
+        sdd, offset, is_float = raw_data.__get__(self, DictionaryEntry)
+        if is_float:
+            return sdd.floats[offset].item()
+        return sdd.ints[offset].item()
+
+    @data.setter
+    def data(self, data:Any):
+        sdd, offset, is_float = raw_data.__get__(self, DictionaryEntry)
+        if data is None:
+            raise ValueError("-------- ERROR -------- SharedDictionaryEntry.data {} is shared, so it can't be set to "
+                             "None".format(self.name))
+        if is_float:
+            sdd.floats[offset] = data
+        else:
+            sdd.ints[offset] = data
+
+
+class SharedCommandObject(CommandObject):
+    '''
+    The SharedCommandObject class is a CommandObject whose serial, cmd and new_command live in a SharedDataDictionary's
+    shared memory, as three words starting at offset. cmd is stored as a code into the SharedDataDictionary's codes.
+    set() writes the serial last, so another process that sees the new serial also sees the new command
+
+    Attributes
+    ----------
+    sdd:SharedDataDictionary
+        The SharedDataDictionary that holds the shared memory
+    offset:int
+        The first word of this object's slot
+    '''
+    sdd:"SharedDataDictionary"
+    offset:int
+
+    @property
+    def serial(self) -> int:
+        return self.sdd.ints[self.offset].item()
+
+    @serial.setter
+    def serial(self, serial:int):
+        self.sdd.ints[self.offset] = serial
+
+    @property
+    def cmd(self) -> str:
+        return self.sdd.decode(self.sdd.ints[self.offset + 1])
+
+    @cmd.setter
+    def cmd(self, cmd:str):
+        self.sdd.ints[self.offset + 1] = self.sdd.encode(cmd)
+
+    @property
+    def new_command(self) -> bool:
+        return bool(self.sdd.ints[self.offset + 2])
+
+    @new_command.setter
+    def new_command(self, new_command:bool):
+        self.sdd.ints[self.offset + 2] = new_command
+
+
+class SharedResponseObject(ResponseObject):
+    '''
+    The SharedResponseObject class is a ResponseObject whose serial and rsp live in a SharedDataDictionary's shared
+    memory, as two words starting at offset. rsp is stored as a code into the SharedDataDictionary's codes
+
+    Attributes
+    ----------
+    sdd:SharedDataDictionary
+        The SharedDataDictionary that holds the shared memory
+    offset:int
+        The first word of this object's slot
+    '''
+    sdd:"SharedDataDictionary"
+    offset:int
+
+    @property
+    def serial(self) -> int:
+        return self.sdd.ints[self.offset].item()
+
+    @serial.setter
+    def serial(self, serial:int):
+        self.sdd.ints[self.offset] = serial
+
+    @property
+    def rsp(self) -> str:
+        return self.sdd.decode(self.sdd.ints[self.offset + 1])
+
+    @rsp.setter
+    def rsp(self, rsp:str):
+        self.sdd.ints[self.offset + 1] = self.sdd.encode(rsp)
+
+
+class SharedDataDictionary(DataDictionary):
+    '''
+    The SharedDataDictionary class is a DataDictionary whose INT, FLOAT, COMMAND and RESPONSE values live in a
+    multiprocessing.shared_memory block, so controllers in different processes can read and write them directly,
+    with no pickling or messages. Each value has a fixed offset in the block.
+
+    One process creates the block, builds its hierarchy, and then starts the others. Each of those attaches to the
+    block by name and builds the same hierarchy. When an entry is added, its value (or the fields of its
+    CommandObject or ResponseObject) is moved into its slot: the creating process allocates the slot and writes the
+    value, and the attaching processes look the slot up by name and keep the value that is already there. The
+    directory of slots and the table of command and response strings are in the first header_size bytes of the
+    block, as JSON records, one per line. The header only grows: each slot or string that is added appends one record,
+    and other processes only read the records they haven't seen. A slot record is the length of the entry's name plus
+    about 30 bytes, so the default header_size of 64 KB holds over a thousand slots. allocate() raises a ValueError
+    if the header is full.
+
+    Each slot should only be written by one process: a COMMAND by its parent and a RESPONSE by its child, like the
+    in-process hierarchy. STRING, LIST and ARRAY entries, and the histories of all entries, stay local to each process.
+    Shared INT and FLOAT entries can't hold None, since the slot is a number
+
+    Attributes
+    ----------
+    shm:shared_memory.SharedMemory
+        The shared memory block
+    owner:bool
+        True in the process that created the block. Only the owner allocates slots and unlinks the block
+    header_size:int
+        The number of bytes at the start of the block used for the directory
+    header_used:int
+        The number of bytes of header records this process has written (in the owner) or read (in the others)
+    num_words:int
+        The number of int64 words of slots in the block
+    next_word:int
+        In the owner, the first word that hasn't been allocated
+    ints:np.ndarray
+        The slots as int64 words
+    floats:np.ndarray
+        The same memory as ints, as float64 words
+    directory:Dict
+        The [offset, type name] of each shared entry, by name
+    codes:List
+        The command and response strings. A COMMAND or RESPONSE slot stores an index into this list
+    code_index:Dict
+        The index of each string in codes
+
+    Methods
+    -------
+    add_entry(self, de: DictionaryEntry, policy:SamplingPolicy = None):
+        Moves the value of INT, FLOAT, COMMAND and RESPONSE entries into shared memory, then adds the entry
+    allocate(self, name:str, type:DictionaryTypes) -> Tuple:
+        Returns the offset for an entry, allocating it in the owner
+    encode(self, value:str) -> int:
+        Returns the code for a command or response string
+    decode(self, code:int) -> str:
+        Returns the command or response string for a code
+    read_header(self):
+        Adds the directory and code records that other processes have written since the last call
+    write_header(self, records:List):
+        Appends directory and code records to the header
+    close(self):
+        Releases the block, and unlinks it in the owner
+    '''
+    shm:Union[shared_memory.SharedMemory, None]
+    owner:bool
+    header_size:int
+    header_used:int
+    num_words:int
+    next_word:int
+    ints:Union[np.ndarray, None]
+    floats:Union[np.ndarray, None]
+    directory:Dict[str, List]
+    codes:List[str]
+    code_index:Dict[str, int]
+
+    def __init__(self, shm_name:str, create:bool = False, num_words:int = 4096, header_size:int = 65536,
+                 codes:List[str] = None, capacity:int = 16, eviction:str = EvictionTypes.GROW):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        shm_name: str
+            The name of the shared memory block
+        create: bool = False
+            If True, create the block. Otherwise attach to a block that another process created
+        num_words: int = 4096
+            The number of int64 words for slots. INT and FLOAT entries use one, RESPONSE two, and COMMAND three.
+            Only used when creating
+        header_size: int = 65536
+            The number of bytes for the directory. Only used when creating
+        codes: List[str] = None
+            Command and response strings to add to the ones in Commands and Responses, such as the ones used by
+            a generated hierarchy. The owner adds strings it hasn't seen as they are set
+        capacity:int = 16
+            The history capacity for entries in this dictionary
+        eviction:str = EvictionTypes.GROW
+            What each entry's history does when it is full
+        """
+        super().__init__(capacity, eviction)
+        self.owner = create
+        self.directory = {}
+        self.codes = []
+        self.code_index = {}
+        self.next_word = 0
+        self.header_used = 0
+        if create:
+            self.header_size = header_size
+            self.num_words = num_words
+            self.shm = shared_memory.SharedMemory(name=shm_name, create=True, size=header_size + 8 * num_words)
+        else:
+            # processes started with multiprocessing share the owner's resource tracker, so attaching doesn't
+            # change when the block is cleaned up
+            self.shm = shared_memory.SharedMemory(name=shm_name)
+            header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+            self.header_size = int(header[1])
+            self.num_words = (self.shm.size - self.header_size) // 8
+        self.ints = np.ndarray((self.num_words,), dtype=np.int64, buffer=self.shm.buf, offset=self.header_size)
+        self.floats = self.ints.view(np.float64)
+        if create:
+            self.ints[:] = 0
+            initial = []
+            for c in [Commands, Responses]:
+                for key, val in vars(c).items():
+                    if not key.startswith("_") and isinstance(val, str) and val not in initial:
+                        initial.append(val)
+            for val in codes or []:
+                if val not in initial:
+                    initial.append(val)
+            self.write_header([["code", val] for val in initial])
+            for val in initial:
+                self.add_code(val)
+        else:
+            self.read_header()
+
+    def add_code(self, value:str):
+        # adds a string to the code table if it isn't there
+        if value not in self.code_index:
+            self.code_index[value] = len(self.codes)
+            self.codes.append(value)
+
+    def read_header(self):
+        """ Adds the directory and code records that other processes have written since the last call
+
+        Parameters
+        ----------
+        :return:
+        """
+        header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        length = int(header[0])
+        if length <= self.header_used:
+            return
+        text = bytes(self.shm.buf[16 + self.header_used:16 + length]).decode("utf-8")
+        for line in text.splitlines():
+            record = json.loads(line)
+            if record[0] == "code":
+                self.add_code(record[1])
+            else:
+                self.directory[record[1]] = [record[2], record[3]]
+        self.header_used = length
+
+    def write_header(self, records:List):
+        """ Appends directory and code records to the header. The length is written last, so a reader never sees a
+        partial record. Only called by the owner, before it adds the records to its own directory and codes, so a
+        full header leaves them unchanged
+
+        Parameters
+        ----------
+        records: List
+            ["code", string] and ["slot", name, offset, type name] records
+        :return:
+        """
+        b = "".join([json.dumps(r) + "\n" for r in records]).encode("utf-8")
+        end = self.header_used + len(b)
+        if 16 + end > self.header_size:
+            raise ValueError("-------- ERROR -------- SharedDataDictionary.write_header() The header is full: it needs "
+                             "{} bytes, but header_size is {}. Pass a larger header_size when creating the "
+                             "SharedDataDictionary".format(16 + end, self.header_size))
+        self.shm.buf[16 + self.header_used:16 + end] = b
+        header = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)
+        header[1] = self.header_size
+        header[0] = end
+        self.header_used = end
+
+    def encode(self, value:str) -> int:
+        """ Returns the code for a command or response string. The owner adds strings it hasn't seen
+
+        Parameters
+        ----------
+        value: str
+            The command or response
+        :return: The index of value in codes
+        """
+        code = self.code_index.get(value)
+        if code is None:
+            if self.owner:
+                self.write_header([["code", value]])
+                self.add_code(value)
+            else:
+                self.read_header()
+                if value not in self.code_index:
+                    raise ValueError("-------- ERROR -------- SharedDataDictionary.encode() '{}' isn't in the codes. "
+                                     "Pass it in codes when creating the SharedDataDictionary".format(value))
+            code = self.code_index[value]
+        return code
+
+    def decode(self, code:int) -> str:
+        """ Returns the command or response string for a code
+
+        Parameters
+        ----------
+        code: int
+            The index into codes
+        :return: The string
+        """
+        if code >= len(self.codes):
+            self.read_header()
+        return self.codes[code]
+
+    def allocate(self, name:str, type:DictionaryTypes) -> Tuple[int, bool]:
+        """ Returns the offset of the slot for an entry. The owner allocates slots for new names. Other
+        processes look them up, and raise a ValueError if the owner hasn't added the entry
+
+        Parameters
+        ----------
+        name: str
+            The name of the entry
+        type: DictionaryTypes
+            The type of the entry
+        :return: An (offset, is_new) tuple
+        """
+        slot = self.directory.get(name)
+        if slot is None and not self.owner:
+            self.read_header()
+            slot = self.directory.get(name)
+        if slot is not None:
+            if slot[1] != type.name:
+                raise ValueError("-------- ERROR -------- SharedDataDictionary.allocate() {} is shared as {}, not {}".format(
+                    name, slot[1], type.name))
+            return slot[0], False
+        if not self.owner:
+            raise ValueError("-------- ERROR -------- SharedDataDictionary.allocate() {} hasn't been added by the "
+                             "process that created the shared memory".format(name))
+        offset = self.next_word
+        if offset + slot_words[type] > self.num_words:
+            raise ValueError("-------- ERROR -------- SharedDataDictionary.allocate() Out of words for {}. "
+                             "Increase num_words".format(name))
+        self.write_header([["slot", name, offset, type.name]])
+        self.next_word += slot_words[type]
+        self.directory[name] = [offset, type.name]
+        return offset, True
+
+    def share_object(self, obj:Any, shared_class:type, fields:List[str], offset:int, is_new:bool):
+        # moves the fields of a CommandObject or ResponseObject into its slot. The class of the object is changed, so
+        # the controllers that hold it use the shared values
+        if isinstance(obj, shared_class):
+            return
+        values = {f: obj.__dict__.pop(f) for f in fields}
+        obj.__class__ = shared_class
+        obj.sdd = self
+        obj.offset = offset
+        if is_new:
+            for f in fields:
+                setattr(obj, f, values[f])
+
+    def add_entry(self, de: DictionaryEntry, policy:Any = None):
+        """ Moves the value of INT, FLOAT, COMMAND and RESPONSE entries into shared memory, then adds the entry.
+        In the owner, the entry's value is written to a new slot. In other processes, the value already in the slot
+        replaces the entry's. An INT or FLOAT entry added with None starts at 0
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to add
+        policy: SamplingPolicy = None
+            If set, the SamplingPolicy for the entry's history
+        :return:
+        """
+        t = de.get_type()
+        if t in slot_words and de.name not in self.ddict:
+            offset, is_new = self.allocate(de.name, t)
+            if t == DictionaryTypes.COMMAND:
+                self.share_object(de.data, SharedCommandObject, ["serial", "cmd", "new_command"], offset, is_new)
+            elif t == DictionaryTypes.RESPONSE:
+                self.share_object(de.data, SharedResponseObject, ["serial", "rsp"], offset, is_new)
+            elif not isinstance(de, SharedDictionaryEntry):
+                value = de.data
+                de.__class__ = SharedDictionaryEntry
+                raw_data.__set__(de, (self, offset, t == DictionaryTypes.FLOAT))
+                if is_new and value is not None:
+                    de.data = value
+        super().add_entry(de, policy)
+
+    def close(self):
+        """ Releases the block, and unlinks it in the owner. Shared entries can't be read after this
+
+        Parameters
+        ----------
+        :return:
+        """
+        super().close()
+        self.ints = None
+        self.floats = None
+        if self.shm is not None:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+            self.shm = None
+
+
+def worker(shm_name:str, steps:int):
+    # the attaching side of the demo below: builds the same entries and answers up to steps commands, or stops
+    # early if it is sent TERMINATE. It sleeps between polls rather than spinning
+    sdd = SharedDataDictionary(shm_name)
+    sdd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    sdd.add_entry(DictionaryEntry("child-count", DictionaryTypes.INT, 0))
+    cmd_obj = CommandObject("parent", "child")
+    rsp_obj = ResponseObject("parent", "child")
+    sdd.add_entry(DictionaryEntry(cmd_obj.name, DictionaryTypes.COMMAND, cmd_obj))
+    sdd.add_entry(DictionaryEntry(rsp_obj.name, DictionaryTypes.RESPONSE, rsp_obj))
+    count = sdd.get_entry("child-count")
+    while count.data < steps and cmd_obj.cmd != Commands.TERMINATE:
+        if cmd_obj.serial != rsp_obj.serial:
+            count.data += 1
+            rsp_obj.set(Responses.DONE, cmd_obj.serial)
+        else:
+            time.sleep(0.001)
+    sdd.close()
+
+
+if __name__ == "__main__":
+    import multiprocessing as mp
+
+    sdd = SharedDataDictionary("rcsnn_demo", create=True)
+    elapsed = DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0)
+    sdd.add_entry(elapsed)
+    sdd.add_entry(DictionaryEntry("child-count", DictionaryTypes.INT, 0))
+    cmd_obj = CommandObject("parent", "child")
+    rsp_obj = ResponseObject("parent", "child")
+    sdd.add_entry(DictionaryEntry(cmd_obj.name, DictionaryTypes.COMMAND, cmd_obj))
+    sdd.add_entry(DictionaryEntry(rsp_obj.name, DictionaryTypes.RESPONSE, rsp_obj))
+
+    p = mp.Process(target=worker, args=("rcsnn_demo", 10))
+    p.start()
+    for i in range(1, 11):
+        elapsed.data += 0.1
+        cmd_obj.set(Commands.RUN, cmd_obj.next_serial())
+        while rsp_obj.serial != cmd_obj.serial:
+            time.sleep(0.001)
+        sdd.store(1)
+    cmd_obj.set(Commands.TERMINATE, cmd_obj.next_serial())
+    p.join()
+    print(sdd.to_string())
+    sdd.close()
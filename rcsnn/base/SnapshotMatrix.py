@@ -0,0 +1,424 @@
+import numpy as np
+from typing import Any, List, Dict
+
+from rcsnn.base.HistoryBuffer import HistoryBuffer, EvictionTypes, fits_dtype, fitting_types
+
+
+class SnapshotBlock:
+    '''
+    The SnapshotBlock class stores the history of a group of entries as one tick-by-entry matrix, so that a
+    DataDictionary.store() writes one row instead of calling store() on every entry
+
+    Attributes
+    ----------
+    matrix:HistoryBuffer
+        A HistoryBuffer of rows. Column n holds the history of entries[n]
+    entries:List
+        The DictionaryEntries in column order
+    row:np.ndarray
+        A preallocated row that values are gathered into before they are written
+    fill:Any
+        The value written into a column for ticks before its entry was added
+    categorical:bool
+        If True, the entries are COMMAND or RESPONSE, and the matrix holds codes into categories rather than values
+    categories:List
+        The string for each code. Code 0 is None
+    category_codes:Dict
+        The code for each string in categories
+
+    Methods
+    -------
+    add_column(self, de:"DictionaryEntry", tick:int, backfill:bool) -> "SnapshotColumn":
+        Adds a column for the entry and returns the history that reads it
+    can_backfill(self, tick:int) -> bool:
+        Returns True if the block has a row for every tick from 0 up to tick
+    remove_column(self, col:int):
+        Deletes a column and shifts the columns after it
+    detach(self, de:"DictionaryEntry") -> HistoryBuffer:
+        Moves the entry's column into a HistoryBuffer of its own, which becomes the entry's history
+    encode(self, value:Any) -> int:
+        Returns the category code for a value, adding it if it's new
+    decode(self, codes:np.ndarray) -> np.ndarray:
+        Converts an array of codes back to their values
+    store(self) -> List:
+        Gathers the current value of every entry and appends them as one row
+    '''
+    matrix:HistoryBuffer
+    entries:List
+    row:np.ndarray
+    fill:Any
+    categorical:bool
+    categories:List
+    category_codes:Dict
+
+    def __init__(self, dtype:Any, capacity:int, eviction:str, fill:Any, categorical:bool = False):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        dtype: Any
+            The NumPy dtype of the matrix
+        capacity: int
+            The number of rows to preallocate
+        eviction: str
+            The EvictionTypes policy for rows
+        fill: Any
+            The value written into a column for ticks before its entry was added
+        categorical: bool = False
+            If True, values are stored as category codes
+        """
+        self.matrix = HistoryBuffer(dtype, capacity, eviction, (0,))
+        self.entries = []
+        self.row = np.zeros(0, dtype=dtype)
+        self.fill = fill
+        self.categorical = categorical
+        self.categories = [None]
+        self.category_codes = {None: 0}
+
+    def add_column(self, de:"DictionaryEntry", tick:int, backfill:bool = False) -> "SnapshotColumn":
+        """ Adds a column for the entry and returns the history that reads it. The entry's most recent stored
+        value (usually the one it was constructed with) becomes the sample for the current tick
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to add
+        tick: int
+            The DataDictionary's current store_count
+        backfill: bool = False
+            If True, every existing row is set to the entry's current value, as if it had always been stored
+        :return: A SnapshotColumn to use as the entry's history
+        """
+        if len(self.matrix) == 0:
+            # the first row holds the values that entries are constructed with
+            self.matrix.start_tick = tick
+            self.matrix.append(self.row)
+        col = len(self.entries)
+        if col >= len(self.row):
+            width = max(4, 2 * len(self.row))
+            self.matrix.widen(width, self.fill)
+            self.row = np.resize(self.row, width)
+        self.entries.append(de)
+
+        first = self.matrix.first_tick()
+        last_tick = first + len(self.matrix) - 1
+        start = tick + 1
+        if backfill:
+            self.matrix.buf[:, col] = self.encode(de.get_data()) if self.categorical else de.data
+            start = first
+        elif len(de.history) > 0 and last_tick == tick:
+            v = de.history.last()
+            row = self.matrix.last().copy()
+            row[col] = self.encode(v) if self.categorical else v
+            self.matrix.set_last(row)
+            start = tick
+        return SnapshotColumn(self, col, start)
+
+    def can_backfill(self, tick:int) -> bool:
+        """ Returns True if the block has a row for every tick from 0 up to tick, so that add_column() with backfill
+        gives the entry a value for every tick, the same as HistoryBuffer.fill() does for an entry stored on its own
+
+        Parameters
+        ----------
+        tick: int
+            The DataDictionary's current store_count
+        :return: True if the block's rows start at tick 0
+        """
+        if len(self.matrix) == 0:
+            return tick == 0
+        return self.matrix.start_tick == 0
+
+    def remove_column(self, col:int):
+        """ Deletes a column and shifts the columns after it
+
+        Parameters
+        ----------
+        col: int
+            The column to delete
+        :return:
+        """
+        self.matrix.buf = np.delete(self.matrix.buf, col, axis=1)
+        self.matrix.shape = (self.matrix.buf.shape[1],)
+        self.row = np.resize(self.row, self.matrix.shape[0])
+        del self.entries[col]
+        for de in self.entries[col:]:
+            de.history.col -= 1
+
+    def detach(self, de:"DictionaryEntry") -> HistoryBuffer:
+        """ Moves the entry's column into a HistoryBuffer of its own, with the same eviction policy and sample rate,
+        and makes it the entry's history
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to detach. Its history must be a SnapshotColumn in this block
+        :return: The entry's new history
+        """
+        sc:SnapshotColumn = de.history
+        m = self.matrix
+        hb = HistoryBuffer(sc.dtype, m.capacity, m.eviction)
+        values = sc.view()
+        if len(values) > 0:
+            hb.start_tick = int(sc.ticks()[0])
+            hb.extend(values)
+            hb.stride = m.stride
+            hb.total = m.start_tick + m.total - hb.start_tick
+        else:
+            hb.start_tick = sc.start_tick
+        self.remove_column(sc.col)
+        de.history = hb
+        return hb
+
+    def encode(self, value:Any) -> int:
+        """ Returns the category code for a value, adding it if it's new
+
+        Parameters
+        ----------
+        value: Any
+            The value to encode
+        :return: The code for the value
+        """
+        code = self.category_codes.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self.category_codes[value] = code
+        return code
+
+    def decode(self, codes:np.ndarray) -> np.ndarray:
+        """ Converts an array of codes back to their values
+
+        Parameters
+        ----------
+        codes: np.ndarray
+            The codes to decode
+        :return: An object array of values
+        """
+        return np.array(self.categories, dtype=object)[codes]
+
+    def store(self) -> List:
+        """ Gathers the current value of every entry and appends them as one row. An entry whose value doesn't fit
+        the matrix's dtype (None, a string, or a fraction in an INT entry) is detached into an object HistoryBuffer,
+        the way HistoryBuffer.append() promotes, and is returned so that it can be stored individually from now on
+
+        Parameters
+        ----------
+        :return: The entries that were detached. Their value for this tick has not been stored yet
+        """
+        if len(self.matrix) == 0:
+            return []
+        if self.categorical:
+            codes = self.category_codes
+            values = [de.get_data() for de in self.entries]
+            self.row[:len(values)] = [codes[v] if v in codes else self.encode(v) for v in values]
+            self.matrix.append(self.row)
+            return []
+        values = [de.data for de in self.entries]
+        dtype = self.row.dtype
+        fitting = fitting_types[dtype.kind]
+        detached = [de for de, v in zip(self.entries, values) if type(v) not in fitting and not fits_dtype(v, dtype)]
+        if len(detached) == 0:
+            try:
+                self.row[:len(values)] = values
+            except OverflowError:
+                # a Python int that is too big for the block, which the type check lets through
+                detached = [de for de, v in zip(self.entries, values) if not fits_dtype(v, dtype)]
+        if len(detached) > 0:
+            for de in detached:
+                self.detach(de).promote()
+            values = [de.data for de in self.entries]
+            self.row[:len(values)] = values
+        self.matrix.append(self.row)
+        return detached
+
+
+class SnapshotColumn:
+    '''
+    The SnapshotColumn class is the history of a DictionaryEntry whose values are stored in a SnapshotBlock. It
+    provides the same reading methods as a HistoryBuffer, but values are written by SnapshotMatrix.store()
+
+    Attributes
+    ----------
+    block:SnapshotBlock
+        The block that holds the values
+    col:int
+        The column in the block's matrix
+    start_tick:int
+        The first tick that belongs to this entry
+
+    Methods
+    -------
+    append(self, value:Any):
+        Does nothing. Values are written a row at a time by the SnapshotBlock
+    view(self) -> np.ndarray:
+        Returns the stored samples, oldest first. Numeric columns are views into the matrix
+    ticks(self) -> np.ndarray:
+        Returns the tick for each sample in view()
+    first_tick(self) -> int:
+        Returns the tick of the oldest sample in view()
+    last(self) -> Any:
+        Returns the most recent sample
+    '''
+    __slots__ = ["block", "col", "start_tick"]
+    block:SnapshotBlock
+    col:int
+    start_tick:int
+
+    def __init__(self, block:SnapshotBlock, col:int, start_tick:int):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        block: SnapshotBlock
+            The block that holds the values
+        col: int
+            The column in the block's matrix
+        start_tick: int
+            The first tick that belongs to this entry
+        """
+        self.block = block
+        self.col = col
+        self.start_tick = start_tick
+
+    @property
+    def dtype(self) -> Any:
+        return object if self.block.categorical else self.block.matrix.dtype
+
+    @property
+    def capacity(self) -> int:
+        return self.block.matrix.capacity
+
+    @property
+    def eviction(self) -> str:
+        return self.block.matrix.eviction
+
+    def append(self, value:Any):
+        """ Does nothing. Values are written a row at a time by the SnapshotBlock
+
+        Parameters
+        ----------
+        value: Any
+            Ignored
+        :return:
+        """
+        pass
+
+    def skipped(self) -> int:
+        # the number of rows in the matrix's view that come before this entry was added
+        m = self.block.matrix
+        return max(0, -(-(self.start_tick - m.first_tick()) // m.stride))
+
+    def view(self) -> np.ndarray:
+        """ Returns the stored samples, oldest first. Numeric columns are views into the matrix, categorical
+        columns are decoded into a new array
+
+        Parameters
+        ----------
+
+        :return: The stored samples
+        """
+        v = self.block.matrix.view()[self.skipped():, self.col]
+        if self.block.categorical:
+            return self.block.decode(v)
+        return v
+
+    def ticks(self) -> np.ndarray:
+        """ Returns the tick for each sample in view()
+
+        Parameters
+        ----------
+
+        :return: An int64 array the same length as view()
+        """
+        return self.block.matrix.ticks()[self.skipped():]
+
+    def first_tick(self) -> int:
+        """ Returns the tick of the oldest sample in view()
+
+        Parameters
+        ----------
+
+        :return: The tick of the oldest sample
+        """
+        return max(self.start_tick, self.block.matrix.first_tick())
+
+    def last(self) -> Any:
+        """ Returns the most recent sample
+
+        Parameters
+        ----------
+
+        :return: The most recent sample, or None if there are none
+        """
+        if len(self) == 0:
+            return None
+        v = self.block.matrix.last()[self.col]
+        if self.block.categorical:
+            return self.block.categories[v]
+        return v
+
+    def __len__(self) -> int:
+        return max(0, len(self.block.matrix) - self.skipped())
+
+    def to_string(self) -> str:
+        return "SnapshotColumn (col = {}, start_tick = {}): {}".format(self.col, self.start_tick, self.block.matrix.to_string())
+
+
+class SnapshotMatrix:
+    '''
+    The SnapshotMatrix class holds the SnapshotBlocks that a DataDictionary in snapshot mode uses. INT and FLOAT
+    entries each get a numeric block, and COMMAND and RESPONSE entries share a categorical block
+
+    Attributes
+    ----------
+    ints:SnapshotBlock
+        The int64 matrix for INT entries
+    floats:SnapshotBlock
+        The float64 matrix for FLOAT entries
+    cats:SnapshotBlock
+        The categorical matrix for COMMAND and RESPONSE entries
+
+    Methods
+    -------
+    store(self) -> List:
+        Appends one row to each block
+    remove_entry(self, de:"DictionaryEntry"):
+        Removes the entry's column, giving the entry a HistoryBuffer with a copy of its history
+    '''
+    ints:SnapshotBlock
+    floats:SnapshotBlock
+    cats:SnapshotBlock
+
+    def __init__(self, capacity:int = 16, eviction:str = EvictionTypes.GROW):
+        """Constructor: Sets up the basic components of the class
+
+        Parameters
+        ----------
+        capacity: int = 16
+            The number of rows to preallocate in each block
+        eviction: str = EvictionTypes.GROW
+            The EvictionTypes policy for rows
+        """
+        self.ints = SnapshotBlock(np.int64, capacity, eviction, 0)
+        self.floats = SnapshotBlock(np.float64, capacity, eviction, np.nan)
+        self.cats = SnapshotBlock(np.int32, capacity, eviction, 0, categorical=True)
+
+    def store(self) -> List:
+        """ Appends one row to each block
+
+        Parameters
+        ----------
+        :return: The entries that were detached because their values don't fit their block. See SnapshotBlock.store()
+        """
+        return self.ints.store() + self.floats.store() + self.cats.store()
+
+    def remove_entry(self, de:"DictionaryEntry"):
+        """ Removes the entry's column, giving the entry a HistoryBuffer with a copy of its history
+
+        Parameters
+        ----------
+        de: DictionaryEntry
+            The entry to remove. Its history must be a SnapshotColumn
+        :return:
+        """
+        de.history.block.detach(de)
@@ -5,9 +5,9 @@ from rcsnn.base.Commands import Commands
 from rcsnn.base.ResponseObject import ResponseObject
 from rcsnn.base.Responses import Responses
 from rcsnn.base.States import States
-from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, EntryHandle
 
-import random
+import numpy as np
 
 class CruiserController(BaseController):
     target_pos:DictionaryEntry
@@ -15,17 +15,29 @@ class CruiserController(BaseController):
     nav_cmd_obj:CommandObject
     missile_rsp_obj:ResponseObject
     nav_rsp_obj:ResponseObject
+    missile_cmd_handle:EntryHandle
+    nav_cmd_handle:EntryHandle
+    missile_rsp_handle:EntryHandle
+    nav_rsp_handle:EntryHandle
 
     def __init__(self, name: str, ddict: DataDictionary):
         super().__init__(name, ddict)
-        self.heading = DictionaryEntry("target_pos", DictionaryTypes.LIST, [(0, 0), (1, 1)])
+        self.heading = DictionaryEntry("target_pos", DictionaryTypes.ARRAY, np.array([(0, 0), (1, 1)], dtype=np.float64))
         self.ddict.add_entry(self.heading)
 
+    def add_init(self):
+        # the command and response entries are created later by link_parent_child(), so bind them now and they
+        # resolve once they exist
+        self.nav_cmd_handle = self.ddict.bind("CMD_ship-controller_to_navigate-controller")
+        self.missile_cmd_handle = self.ddict.bind("CMD_ship-controller_to_missile-controller")
+        self.nav_rsp_handle = self.ddict.bind("RSP_navigate-controller_to_ship-controller")
+        self.missile_rsp_handle = self.ddict.bind("RSP_missile-controller_to_ship-controller")
+
     def pre_process(self):
-        self.nav_cmd_obj = self.ddict.get_entry("CMD_ship-controller_to_navigate-controller").data
-        self.missile_cmd_obj = self.ddict.get_entry("CMD_ship-controller_to_missile-controller").data
-        self.nav_rsp_obj = self.ddict.get_entry("RSP_navigate-controller_to_ship-controller").data
-        self.missile_rsp_obj = self.ddict.get_entry("RSP_missile-controller_to_ship-controller").data
+        self.nav_cmd_obj = self.nav_cmd_handle.get()
+        self.missile_cmd_obj = self.missile_cmd_handle.get()
+        self.nav_rsp_obj = self.nav_rsp_handle.get()
+        self.missile_rsp_obj = self.missile_rsp_handle.get()
 
     def run_task(self):
         # S0: ask MissileControler how far away a 90% accuracy shot is
@@ -50,8 +62,6 @@ class CruiserController(BaseController):
 
 
     def target_ships(self):
+        # two random targets within +/- scalar/2 of the origin, drawn from this controller's own stream
         scalar = 10
-        self.heading.data = [
-            ((random.random()-0.5) * scalar, (random.random()-0.5) * scalar),
-            ((random.random()-0.5) * scalar, (random.random()-0.5) * scalar)
-                            ]
\ No newline at end of file
+        self.heading.data[:] = (self.rng.random((2, 2)) - 0.5) * scalar
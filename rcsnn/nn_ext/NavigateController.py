@@ -20,6 +20,10 @@ class NavigateController(BaseController):
         self.heading.data = math.sin(self.elapsed)
         print("NavigateController heading = {}".format(self.heading.data))
 
+    def is_idle(self) -> bool:
+        # pre_process() updates nav-heading on every step, so an event-driven Scheduler must never park this controller
+        return False
+
     def decision_process(self):
         command = self.evaluate_cmd()
         if command == Commands.INIT:
@@ -7,6 +7,9 @@ from rcsnn.base.Commands import Commands
 from rcsnn.base.ResponseObject import ResponseObject
 from rcsnn.base.Responses import Responses
 from rcsnn.base.BaseController import BaseController
+from rcsnn.base.AsyncLogger import AsyncLogger
+from rcsnn.base.Scheduler import Scheduler
+from typing import Callable, Tuple
 
 def choose_new_target():
     pass
@@ -14,10 +17,12 @@ def choose_new_target():
 def step_scenario():
     choose_new_target()
 
-def main():
+def make_scenario() -> Tuple[Scheduler, Callable[[], bool]]:
     """
-    Exercise the class in a toy hierarchy that initializes, runs, and terminates. The hierarchy is controlled from the
-    main loop and has two controllers, a "parent" and a "child"
+    Build the toy hierarchy that initializes, runs, and terminates: a ship controller with a navigate controller and
+    a missile controller under it. Returns the Scheduler for the hierarchy, and the function to pass to
+    Scheduler.run(), which moves the ship controller from INIT to RUN to TERMINATE and returns True when it's done.
+    Used by main(), and by BatchRunner for batches of runs
     """
     # create the data dictionary and add "elapsed-time" as a float
     ddict = DataDictionary()
@@ -47,41 +52,43 @@ def main():
     missile_ctrl = MissileController("missile-controller", ddict)
     BaseController.link_parent_child(ship_ctrl, missile_ctrl, ddict)
 
-    # Set the INIT command that will start the hierarchy, then iterate until the INIT->RUN->TERMINATE sequence completes
+    # Set the INIT command that will start the hierarchy. The Scheduler advances the clock, stores, logs, and steps
+    # the ship controller and then its children
     top_to_ship_cmd_obj.set(Commands.INIT, 1)
-    done = False
-    current_step = 0
-    while not done:
-        print("\nstep[{}]---------------".format(current_step))
-        elapsed_time_entry.data += 0.1
-        ddict.store(skip = 1)
-        ddict.log_to_csv("testlog.csv", 1)
-
-        # ---------- step all the controllers
-        ship_ctrl.step()
-        print(ship_ctrl.to_string())
-
-        navigation_ctrl.step()
-        print(navigation_ctrl.to_string())
-
-        missile_ctrl.step()
-        print(missile_ctrl.to_string())
-
+    sched = Scheduler(ddict, [ship_ctrl])
 
+    def sequence() -> bool:
         if top_to_ship_cmd_obj.test(Commands.INIT) and ship_ctrl.rsp.test(Responses.DONE):
             top_to_ship_cmd_obj.set(Commands.RUN, 2)
         elif top_to_ship_cmd_obj.test(Commands.RUN) and ship_ctrl.rsp.test(Responses.DONE): # handle new targets
             top_to_ship_cmd_obj.set(Commands.TERMINATE, 3)
         elif top_to_ship_cmd_obj.test(Commands.TERMINATE) and ship_ctrl.rsp.test(Responses.DONE):
-            done = True
+            return True
+        return False
 
-        current_step += 1
+    return sched, sequence
 
-        # for debugging
-        if current_step == 100:
-            done = True
+def main():
+    """
+    Exercise the class in a toy hierarchy that initializes, runs, and terminates. The hierarchy is controlled from the
+    main loop and has two controllers, a "parent" and a "child"
+    """
+    # iterate until the INIT->RUN->TERMINATE sequence completes
+    sched, sequence = make_scenario()
+    ddict = sched.ddict
+    with AsyncLogger(ddict, "testlog.csv", 1) as logger:
+        sched.logger = logger
+
+        def verbose_sequence() -> bool:
+            print("\nstep[{}]---------------".format(sched.tick_count - 1))
+            for ctrl in sched.order:
+                print(ctrl.to_string())
+            return sequence()
+
+        # for debugging, stop after 100 steps
+        sched.run(verbose_sequence, max_ticks=100)
     print("\nDataDictionary:\n{}".format(ddict.to_string()))
     ddict.to_excel("../../data/", "ship-controller.xlsx")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
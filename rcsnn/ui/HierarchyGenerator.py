@@ -12,7 +12,9 @@ from rcsnn.base.Commands import Commands
 from rcsnn.base.ResponseObject import ResponseObject
 from rcsnn.base.Responses import Responses
 from rcsnn.base.States import States
-from rcsnn.base.BaseController import BaseController\n\n'''
+from rcsnn.base.BaseController import BaseController
+from rcsnn.base.AsyncLogger import AsyncLogger
+from rcsnn.base.Scheduler import Scheduler\n\n'''
 
     module_head = '''
 
@@ -110,6 +112,7 @@ class HierarchyModule:
         with open(filename, 'w') as f:
             f.write(CodeSlugs.imports)
             f.write(CodeSlugs.module_head.format(self.classname, 'BaseController'))
+            self.generate_add_init(f)
 
             f.write(CodeSlugs.decision)
             cmd:str = self.commands[0]
@@ -132,6 +135,17 @@ class HierarchyModule:
                 f.write(CodeSlugs.module_head.format(self.get_child_class(), self.classname))
 
 
+    def generate_add_init(self, f:TextIO):
+        if len(self.children) == 0:
+            return
+        f.write("\n\n    def add_init(self):\n")
+        child_hm:HierarchyModule
+        for child_hm in self.children:
+            s = "        self.{}_handle = self.ddict.bind('{}')\n".format(child_hm.cmd_obj_name, child_hm.cmd_obj_name)
+            f.write(s)
+            s = "        self.{}_handle = self.ddict.bind('{}')\n".format(child_hm.rsp_obj_name, child_hm.rsp_obj_name)
+            f.write(s)
+
     def generate_task(self, cmd_str, f:TextIO):
         s = "\n\n    def {}_task(self):\n".format(cmd_str.lower())
         f.write(s)
@@ -139,9 +153,9 @@ class HierarchyModule:
         child_hm:HierarchyModule
         state_num = 0
         for child_hm in self.children:
-            s = "        {} = self.ddict.get_entry('{}').data\n".format(child_hm.cmd_obj_name, child_hm.cmd_obj_name)
+            s = "        {} = self.{}_handle.get()\n".format(child_hm.cmd_obj_name, child_hm.cmd_obj_name)
             f.write(s)
-            s = "        {} = self.ddict.get_entry('{}').data\n".format(child_hm.rsp_obj_name, child_hm.rsp_obj_name)
+            s = "        {} = self.{}_handle.get()\n".format(child_hm.rsp_obj_name, child_hm.rsp_obj_name)
             f.write(s)
 
         s = '''        if self.cur_state == States.NEW_COMMAND:
@@ -254,6 +268,8 @@ class HierarchyGenerator:
         f.write("    current_step : int\n")
         f.write("    ddict : DataDictionary\n")
         f.write("    elapsed_time_entry : DictionaryEntry\n")
+        f.write("    logger : AsyncLogger\n")
+        f.write("    scheduler : Scheduler\n")
 
         hm_child:HierarchyModule
         for hm_child in self.hmodule_list:
@@ -274,6 +290,7 @@ class HierarchyGenerator:
         f.write("        self.ddict = DataDictionary()\n")
         f.write('        self.elapsed_time_entry = DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0)\n')
         f.write('        self.ddict.add_entry(self.elapsed_time_entry)\n')
+        f.write('        self.logger = AsyncLogger(self.ddict, "testlog.csv", 1)\n')
 
         top_command_dict = {}
         for hm_child in self.hmodule_list:
@@ -303,6 +320,11 @@ class HierarchyGenerator:
                 s = "        BaseController.link_parent_child(self.{}, self.{}, self.ddict)\n".format(hm_child.parent, hm_child.name)
                 f.write(s)
 
+        # the scheduler finds everything below the top modules from the links, and steps parents before children
+        top_names = ", ".join("self.{}".format(hm.name) for hm in self.hmodule_list if hm.parent == 'board_monitor')
+        s = "        self.scheduler = Scheduler(self.ddict, [{}], logger=self.logger)\n".format(top_names)
+        f.write(s)
+
         f.write("\n    def start(self):\n")
         s = "        self.{}.set(Commands.{}, 1)\n".format(top_command_dict['name'], top_command_dict['cmd'])
         f.write(s)
@@ -310,14 +332,7 @@ class HierarchyGenerator:
 
         f.write("\n    def step(self) -> bool:\n")
         f.write("        done = False\n")
-        f.write("        self.elapsed_time_entry.data += 0.1\n")
-        f.write("        self.ddict.store(skip = 1)\n")
-        f.write('        self.ddict.log_to_csv("testlog.csv", 1)\n')
-        hm:HierarchyModule
-        f.write("\n")
-        for hm in self.hmodule_list:
-            f.write("        self.{}.step()\n".format(hm.name))
-
+        f.write("        self.scheduler.tick()\n")
         f.write("        done = self.decision_process()\n")
 
         f.write('        self.current_step += 1\n')
@@ -346,8 +361,10 @@ class HierarchyGenerator:
         f.write('        return(done)\n')
 
         f.write("\n    def terminate(self):\n")
-        s = '        self.ddict.to_excel("../../data/", "{}.xlsx")\n'.format(top_command_dict['child_name'])
+        # the export runs on the logger's writer thread, after the last rows. close() waits for it
+        s = '        self.logger.submit(self.ddict.to_excel, "../../data/", "{}.xlsx")\n'.format(top_command_dict['child_name'])
         f.write(s)
+        f.write("        self.logger.close()\n")
 
 
     def generate_code(self):
@@ -0,0 +1,211 @@
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from rcsnn.base.DataDictionary import DictionaryEntry, DictionaryTypes, DataDictionary
+from rcsnn.base.CommandObject import CommandObject
+
+
+class LegacyDictionaryEntry:
+    '''
+    A copy of how DictionaryEntry used to work, for comparison: it prints on construction, has a full __dict__,
+    checks its type on every get_data() and store(), and keeps its history in a Python list
+    '''
+    def __init__(self, name:str, type:DictionaryTypes, data:Any=None, master: bool = True):
+        print("DataDictionary: adding name='{}' type = '{}'".format(name, type))
+        self.type = type
+        self.name = name
+        self.data = data
+        self.master = master
+        self.data_list = []
+        if data != None:
+            self.store()
+
+    def get_data(self) -> Any:
+        if self.type == DictionaryTypes.COMMAND:
+            return self.data.cmd
+        elif self.type == DictionaryTypes.RESPONSE:
+            return self.data.rsp
+        else:
+            return self.data
+
+    def store(self):
+        if self.type == DictionaryTypes.COMMAND:
+            self.data_list.append(self.data.cmd)
+        elif self.type == DictionaryTypes.RESPONSE:
+            self.data_list.append(self.data.rsp)
+        else:
+            self.data_list.append(self.data)
+
+
+def make_entries(entry_class:Callable, num_entries:int) -> List:
+    """ Creates num_entries entries, a mix of INT, FLOAT and COMMAND, like a large generated hierarchy
+
+    Parameters
+    ----------
+    entry_class: Callable
+        DictionaryEntry or LegacyDictionaryEntry
+    num_entries: int
+        The number of entries to create
+    :return: The list of entries
+    """
+    l = []
+    for i in range(num_entries):
+        kind = i % 3
+        if kind == 0:
+            l.append(entry_class("int_{}".format(i), DictionaryTypes.INT, i))
+        elif kind == 1:
+            l.append(entry_class("float_{}".format(i), DictionaryTypes.FLOAT, i / 10))
+        else:
+            l.append(entry_class("cmd_{}".format(i), DictionaryTypes.COMMAND, CommandObject("parent", "child_{}".format(i))))
+    return l
+
+
+def store_entries(entries:List, num_stores:int):
+    """ Changes the value of every INT and FLOAT entry and stores every entry, num_stores times, like a main loop
+
+    Parameters
+    ----------
+    entries: List
+        The entries from make_entries(), which repeat INT, FLOAT, COMMAND
+    num_stores: int
+        The number of times to store every entry
+    :return:
+    """
+    ints = entries[0::3]
+    floats = entries[1::3]
+    for i in range(num_stores):
+        for de in ints:
+            de.data += 1000
+        for de in floats:
+            de.data += 0.1
+        for de in entries:
+            de.store()
+
+
+def store_snapshot(entries:List, num_stores:int) -> DataDictionary:
+    """ Like store_entries(), but the entries are added to a DataDictionary in snapshot mode, which stores each
+    type's values as one column write per tick instead of calling store() on every entry
+
+    Parameters
+    ----------
+    entries: List
+        DictionaryEntries from make_entries()
+    num_stores: int
+        The number of times to store the dictionary
+    :return: The DataDictionary
+    """
+    dd = DataDictionary(snapshot=True)
+    for de in entries:
+        dd.add_entry(de)
+    ints = entries[0::3]
+    floats = entries[1::3]
+    for i in range(num_stores):
+        for de in ints:
+            de.data += 1000
+        for de in floats:
+            de.data += 0.1
+        dd.store(skip=1)
+    return dd
+
+
+def object_bytes(de:Any) -> int:
+    """ Returns the size of an entry object itself, not counting the values its attributes refer to. An object
+    without __slots__ also has a __dict__
+
+    Parameters
+    ----------
+    de: Any
+        A DictionaryEntry or LegacyDictionaryEntry
+    :return: The size in bytes
+    """
+    size = sys.getsizeof(de)
+    if hasattr(de, "__dict__"):
+        size += sys.getsizeof(de.__dict__)
+    return size
+
+
+def run_benchmark(entry_class:Callable, num_entries:int, num_stores:int) -> Dict:
+    """ Times creating num_entries entries and storing them num_stores times, then does it again with tracemalloc
+    to measure the memory they use, once they are created and again once they are stored. Timing and memory are
+    separate runs because tracemalloc slows allocation down. Whatever the entries print goes to stdout, since the
+    cost of printing is part of what is being compared
+
+    Parameters
+    ----------
+    entry_class: Callable
+        DictionaryEntry or LegacyDictionaryEntry
+    num_entries: int
+        The number of entries to create
+    num_stores: int
+        The number of times to call store() on every entry
+    :return: A Dict with the create and store times in seconds, and the bytes per entry for the entry objects
+        ("object"), everything allocated by creating them ("created"), and everything allocated once they are
+        stored ("stored")
+    """
+    t0 = time.perf_counter()
+    entries = make_entries(entry_class, num_entries)
+    t1 = time.perf_counter()
+    store_entries(entries, num_stores)
+    t2 = time.perf_counter()
+    del entries
+
+    tracemalloc.start()
+    entries = make_entries(entry_class, num_entries)
+    created, peak = tracemalloc.get_traced_memory()
+    store_entries(entries, num_stores)
+    stored, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    objects = sum([object_bytes(de) for de in entries])
+    return {"create":t1 - t0, "store":t2 - t1, "object":objects / num_entries, "created":created / num_entries,
+            "stored":stored / num_entries}
+
+
+def run_snapshot_benchmark(num_entries:int, num_stores:int) -> Dict:
+    """ Times storing num_entries DictionaryEntries num_stores times in a snapshot mode DataDictionary, then
+    does it again with tracemalloc to measure the memory once they are stored
+
+    Parameters
+    ----------
+    num_entries: int
+        The number of entries to create
+    num_stores: int
+        The number of times to store the dictionary
+    :return: A Dict with the "store" time in seconds, which includes adding the entries to the dictionary, and the
+        bytes per entry once they are "stored"
+    """
+    entries = make_entries(DictionaryEntry, num_entries)
+    t0 = time.perf_counter()
+    dd = store_snapshot(entries, num_stores)
+    t1 = time.perf_counter()
+    del entries, dd
+
+    tracemalloc.start()
+    dd = store_snapshot(make_entries(DictionaryEntry, num_entries), num_stores)
+    stored, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"store":t1 - t0, "stored":stored / num_entries}
+
+
+def main():
+    num_entries = 100000
+    num_stores = 100
+    legacy = run_benchmark(LegacyDictionaryEntry, num_entries, num_stores)
+    current = run_benchmark(DictionaryEntry, num_entries, num_stores)
+    snapshot = run_snapshot_benchmark(num_entries, num_stores)
+    print("Creating {} entries and storing them {} times".format(num_entries, num_stores))
+    for key in ["create", "store"]:
+        print("{:>8}: legacy = {:.3f}s, current = {:.3f}s ({:.1f}x)".format(
+            key, legacy[key], current[key], legacy[key] / current[key]))
+    for key in ["object", "created", "stored"]:
+        print("{:>8}: legacy = {:.0f} bytes, current = {:.0f} bytes per entry ({:+.0f} bytes)".format(
+            key, legacy[key], current[key], current[key] - legacy[key]))
+    print("In a snapshot mode DataDictionary")
+    print("{:>8}: legacy = {:.3f}s, snapshot = {:.3f}s ({:.1f}x)".format(
+        "store", legacy["store"], snapshot["store"], legacy["store"] / snapshot["store"]))
+    print("{:>8}: legacy = {:.0f} bytes, snapshot = {:.0f} bytes per entry ({:+.0f} bytes)".format(
+        "stored", legacy["stored"], snapshot["stored"], snapshot["stored"] - legacy["stored"]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes, array_column_names, \
+    values_equal
+from rcsnn.base.HistoryBuffer import HistoryBuffer
+from rcsnn.base.SamplingPolicy import EveryN
+
+
+def test_entry_copies_its_array():
+    source = np.zeros((2, 2), dtype=np.float32)
+    de = DictionaryEntry("pos", DictionaryTypes.ARRAY, source)
+    source[0, 0] = 1
+    assert de.data[0, 0] == 0
+    assert de.history.dtype == np.float32 and de.history.shape == (2, 2)
+
+
+def test_shape_has_to_match_data():
+    with pytest.raises(ValueError):
+        DictionaryEntry("pos", DictionaryTypes.ARRAY, np.zeros(3), shape=(2, 2))
+    de = DictionaryEntry("pos", DictionaryTypes.ARRAY, dtype=np.int32, shape=(3,))
+    assert len(de.history) == 0 and de.history.dtype == np.int32
+
+
+def test_in_place_writes_are_stored_as_separate_samples():
+    dd = DataDictionary(delta=True)
+    de = dd.new_entry("pos", DictionaryTypes.ARRAY, np.zeros((2, 2)))
+    for i in range(1, 4):
+        de.data[:] = i
+        dd.store(skip=1)
+    # delta mode doesn't apply to arrays, which keep a (ticks, *shape) buffer
+    assert isinstance(de.history, HistoryBuffer)
+    assert de.history.view().shape == (4, 2, 2)
+    assert de.history.view()[:, 0, 0].tolist() == [0, 1, 2, 3]
+
+
+def test_sampling_policy_is_rejected():
+    dd = DataDictionary()
+    with pytest.raises(ValueError):
+        dd.add_entry(DictionaryEntry("pos", DictionaryTypes.ARRAY, np.zeros(2)), EveryN(2))
+
+
+def test_values_equal():
+    assert values_equal(np.arange(3), np.arange(3))
+    assert not values_equal(np.arange(3), np.arange(4))
+    assert not values_equal(np.zeros((2, 2)), np.zeros(4))
+    assert values_equal(1, 1) and not values_equal("a", "b")
+
+
+def test_set_data_notifies_on_changed_arrays():
+    de = DictionaryEntry("pos", DictionaryTypes.ARRAY, np.zeros(2))
+    seen = []
+    de.add_observer(lambda e: seen.append(e.get_data().tolist()))
+    de.set_data(np.zeros(2))
+    de.set_data(np.ones(2))
+    assert seen == [[1.0, 1.0]]
+
+
+def test_column_names_match_ravel_order():
+    assert array_column_names("pos", (2, 2)) == ["pos_0_0", "pos_0_1", "pos_1_0", "pos_1_1"]
+    assert array_column_names("v", (3,)) == ["v_0", "v_1", "v_2"]
+
+
+def test_log_to_csv_writes_one_column_per_element(tmp_path):
+    dd = DataDictionary()
+    de = dd.new_entry("pos", DictionaryTypes.ARRAY, np.arange(4.0).reshape(2, 2))
+    dd.store(skip=1)
+    filename = tmp_path / "log.csv"
+    dd.log_to_csv(str(filename))
+    header, row = filename.read_text().splitlines()[:2]
+    header = [s.strip() for s in header.split(",") if s.strip()]
+    row = [s.strip() for s in row.split(",") if s.strip()]
+    assert header[1:] == array_column_names("pos", (2, 2))
+    assert [float(s) for s in row[1:]] == de.data.ravel().tolist()
+
+
+def test_to_dict_round_trip():
+    de = DictionaryEntry("pos", DictionaryTypes.ARRAY, np.arange(6, dtype=np.uint8).reshape(3, 2))
+    d = de.to_dict()
+    assert d["shape"] == [3, 2] and np.dtype(d["dtype"]) == np.uint8
+    dd = DataDictionary()
+    dd.set_entry_from_dict(d)
+    a = dd.get_entry("pos").data
+    assert a.dtype == np.uint8 and np.array_equal(a, de.data)
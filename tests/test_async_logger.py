@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from rcsnn.base.AsyncLogger import AsyncLogger, BackpressureTypes
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def make_dictionary() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 0))
+    return ddict
+
+
+def log_rows(ddict:DataDictionary, logger:AsyncLogger, rows:int):
+    for i in range(rows):
+        ddict.get_entry("test_int").data = i
+        logger.log()
+
+
+def read_rows(filename) -> list:
+    with open(filename) as f:
+        return [line.split(",")[0] for line in f.readlines()[1:]]
+
+
+def test_rows_are_written_in_order(tmp_path):
+    ddict = make_dictionary()
+    filename = tmp_path / "log.csv"
+    with AsyncLogger(ddict, str(filename), batch_size=3) as logger:
+        log_rows(ddict, logger, 10)
+    assert logger.written == 10
+    assert read_rows(filename) == [str(i) for i in range(10)]
+
+
+def test_a_failed_row_doesnt_lose_the_batch(tmp_path):
+    ddict = make_dictionary()
+    filename = tmp_path / "log.csv"
+    logger = AsyncLogger(ddict, str(filename), batch_size=3)
+    write_values = logger.write_values
+
+    def failing_write(log_line, values):
+        if log_line == 4:
+            raise IOError("row {} failed".format(log_line))
+        write_values(log_line, values)
+
+    logger.write_values = failing_write
+    logger.open()
+    # hold the writer thread so the rows are written as one batch
+    go = threading.Event()
+    logger.submit(go.wait)
+    log_rows(ddict, logger, 10)
+    go.set()
+    with pytest.raises(IOError):
+        logger.close()
+    assert logger.written == 9
+    assert logger.dropped == 1
+    assert read_rows(filename) == [str(i) for i in range(10) if i != 4]
+
+
+def test_a_failed_job_doesnt_stop_the_rows(tmp_path):
+    ddict = make_dictionary()
+    filename = tmp_path / "log.csv"
+    logger = AsyncLogger(ddict, str(filename), backpressure=BackpressureTypes.DROP)
+    logger.submit(int, "not a number")
+    log_rows(ddict, logger, 5)
+    with pytest.raises(ValueError):
+        logger.close()
+    assert logger.written == 5
+    assert logger.dropped == 0
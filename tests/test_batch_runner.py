@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.BatchRunner import BatchRunner
+from rcsnn.nn_ext.bd_mon import make_scenario
+
+summary_names = ["elapsed-time", "target_pos"]
+history_names = ["elapsed-time", "target_pos", "RSP_ship-controller_to_board-monitor"]
+
+
+def run_batch(seed:int, workers:int = 0, n_runs:int = 4) -> BatchRunner:
+    batch = BatchRunner(make_scenario, n_runs, seed=seed, workers=workers, max_ticks=100,
+                        summary_names=summary_names, history_names=history_names)
+    batch.run()
+    return batch
+
+
+def assert_same_results(a:BatchRunner, b:BatchRunner):
+    for results_a, results_b in [(a.summary, b.summary), (a.histories, b.histories)]:
+        names = [name for name in results_a if name != "secs"]
+        assert names == [name for name in results_b if name != "secs"]
+        for name in names:
+            assert results_a[name].tolist() == results_b[name].tolist(), name
+
+
+def test_columns():
+    batch = run_batch(1)
+    assert batch.summary["run"].tolist() == [0, 1, 2, 3]
+    assert all(batch.summary["done"])
+    assert {"target_pos_0_0", "target_pos_1_1"} <= set(batch.summary)
+    runs = batch.histories["run"]
+    ticks = batch.histories["tick"]
+    for run, n in enumerate(batch.summary["ticks"]):
+        # each run's history has a row per tick, with the response as a string
+        assert ticks[runs == run].tolist() == list(range(n + 1))
+    assert all(isinstance(v, str) for v in batch.histories["RSP_ship-controller_to_board-monitor"])
+
+
+def test_seeded_runs_are_repeatable():
+    first = run_batch(7)
+    assert_same_results(first, run_batch(7))
+    # runs within a batch, and batches with other seeds, draw different targets
+    targets = first.summary["target_pos_0_0"]
+    assert len(set(targets.tolist())) == len(targets)
+    assert not np.array_equal(targets, run_batch(8).summary["target_pos_0_0"])
+
+
+def test_workers_match_serial():
+    assert_same_results(run_batch(3, workers=2), run_batch(3))
+
+
+def test_write_parquet(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    batch = run_batch(5, n_runs=2)
+    summary_file = str(tmp_path / "summary.parquet")
+    history_file = str(tmp_path / "histories.parquet")
+    batch.write_parquet(summary_file, history_file)
+    assert pq.read_table(summary_file).column("target_pos_1_0").to_pylist() == batch.summary["target_pos_1_0"].tolist()
+    assert pq.read_table(history_file).num_rows == len(batch.histories["run"])
+
+
+def test_needs_a_run():
+    with pytest.raises(ValueError):
+        BatchRunner(make_scenario, 0)
@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from rcsnn.base.CopyOnWrite import VersionedList
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryTypes
+
+
+def make_dictionary(snapshot:bool) -> DataDictionary:
+    dd = DataDictionary(snapshot=snapshot)
+    dd.new_entry("elapsed-time", DictionaryTypes.FLOAT, 0.0)
+    dd.new_entry("test_int", DictionaryTypes.INT, 1)
+    return dd
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_new_entries_are_backfilled(snapshot):
+    dd = make_dictionary(snapshot)
+    for i in range(5):
+        dd.store(skip=1)
+    dd.set_entries_from_dict([{'name': 'test_int', 'type': 'INT', 'current': 20},
+                              {'name': 'test_float', 'type': 'FLOAT', 'current': 22.0},
+                              {'name': 'test_list', 'type': 'LIST', 'current': [1, 2]}])
+    dd.store(skip=1)
+    assert list(dd.get_entry("test_int").data_list[-2:]) == [1, 20]
+    ticks = dd.get_entry("elapsed-time").history.ticks().tolist()
+    for name, value in [("test_float", 22.0), ("test_list", [1, 2])]:
+        de = dd.get_entry(name)
+        assert de.history.ticks().tolist() == ticks
+        assert [np.asarray(v).tolist() for v in de.data_list] == [value] * len(ticks)
+    assert isinstance(dd.get_entry("test_list").data, VersionedList)
+
+
+def test_array_entries_keep_dtype_and_shape():
+    dd = make_dictionary(False)
+    dd.set_entry_from_dict({'name': 'test_array', 'type': 'ARRAY', 'current': [1, 2, 3, 4],
+                            'dtype': 'float32', 'shape': [2, 2]})
+    a = dd.get_entry("test_array").data
+    assert a.dtype == np.float32 and a.shape == (2, 2)
+    # an update without a dtype keeps the entry's dtype
+    dd.set_entry_from_dict({'name': 'test_array', 'type': 'ARRAY', 'current': [[5, 6], [7, 8]]})
+    a = dd.get_entry("test_array").data
+    assert a.dtype == np.float32 and a.tolist() == [[5, 6], [7, 8]]
+
+
+def test_bad_dicts_are_skipped():
+    dd = make_dictionary(False)
+    assert not dd.set_entry_from_dict({'name': 'no_current', 'type': 'INT'})
+    assert not dd.set_entry_from_dict({'name': 'bad_type', 'type': 'NOT_A_TYPE', 'current': 1})
+    assert "no_current" not in dd.ddict and "bad_type" not in dd.ddict
+
+
+def test_jsonl_matches_dict_list(tmp_path):
+    source = make_dictionary(False)
+    source.new_entry("test_string", DictionaryTypes.STRING, "hello")
+    source.new_entry("test_array", DictionaryTypes.ARRAY, np.arange(6, dtype=np.int16).reshape(2, 3))
+    dicts = [de.to_dict() for de in source.ddict.values()]
+    filename = tmp_path / "entries.jsonl"
+    with open(filename, "w") as f:
+        for d in dicts:
+            f.write(json.dumps(d) + "\n\n")
+
+    from_file = make_dictionary(False)
+    from_file.store(skip=1)
+    assert from_file.set_entries_from_jsonl(str(filename)) == len(dicts)
+    from_list = make_dictionary(False)
+    from_list.store(skip=1)
+    from_list.set_entries_from_dict(iter(dicts))
+    for dd in [from_file, from_list]:
+        dd.store(skip=1)
+        assert list(dd.get_entry("test_string").data_list) == ["hello"] * 3
+        a = dd.get_entry("test_array").data
+        assert a.dtype == np.int16 and a.tolist() == [[0, 1, 2], [3, 4, 5]]
+    assert {k: de.to_dict() for k, de in from_file.ddict.items()} == \
+        {k: de.to_dict() for k, de in from_list.ddict.items()}
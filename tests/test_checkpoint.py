@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.Checkpoint import Checkpoint
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.HistoryBuffer import EvictionTypes
+from rcsnn.base.SamplingPolicy import EveryN
+
+modes = {
+    "default": {},
+    "overwrite": {"capacity": 8, "eviction": EvictionTypes.OVERWRITE},
+    "decimate": {"capacity": 8, "eviction": EvictionTypes.DECIMATE},
+    "snapshot": {"snapshot": True},
+    "delta": {"delta": True},
+    "compress": {"compress": True},
+    "memmap": {"hot_window": 4},
+}
+
+
+def make_dictionary(mode:str, tmp_path) -> DataDictionary:
+    kwargs = dict(modes[mode])
+    if mode == "memmap":
+        kwargs["memmap_dir"] = str(tmp_path / "memmap")
+    return DataDictionary(**kwargs)
+
+
+def populate(dd:DataDictionary):
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    dd.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 0))
+    dd.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "start"))
+    dd.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [0, 0]))
+    dd.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros(2)))
+    dd.add_entry(DictionaryEntry("test_sampled", DictionaryTypes.FLOAT, 0.0), EveryN(3))
+    cmd = CommandObject("parent", "child")
+    dd.add_entry(DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd))
+
+
+def step(dd:DataDictionary, i:int):
+    dd.get_entry("elapsed-time").data += 0.1
+    dd.get_entry("test_int").data = i // 3
+    dd.get_entry("test_string").data = "tick_{}".format(i // 4)
+    dd.get_entry("test_list").data = [i, -i]
+    dd.get_entry("test_array").data[:] = [i / 2, -i / 2]
+    dd.get_entry("test_sampled").data = i * 1.5
+    if i % 7 == 0:
+        cmd = dd.get_entry("CMD_parent_to_child").data
+        cmd.set(Commands.RUN if i % 2 else Commands.INIT, cmd.next_serial())
+    dd.store(skip=1)
+
+
+def histories(dd:DataDictionary) -> dict:
+    return {name: (de.history.ticks().tolist(), [np.asarray(v).tolist() for v in de.data_list])
+            for name, de in dd.ddict.items()}
+
+
+@pytest.mark.parametrize("mode", list(modes))
+def test_resumed_run_matches_uninterrupted_run(mode, tmp_path):
+    uninterrupted = make_dictionary(mode, tmp_path / "a")
+    populate(uninterrupted)
+    for i in range(1, 31):
+        step(uninterrupted, i)
+
+    first = make_dictionary(mode, tmp_path / "b")
+    populate(first)
+    for i in range(1, 16):
+        step(first, i)
+    filename = str(tmp_path / "checkpoint.npz")
+    Checkpoint(first).save(filename)
+
+    resumed = make_dictionary(mode, tmp_path / "c")
+    Checkpoint(resumed).restore(filename)
+    assert resumed.store_count == first.store_count
+    assert histories(resumed) == histories(first)
+    for i in range(16, 31):
+        step(resumed, i)
+    assert histories(resumed) == histories(uninterrupted)
+    assert resumed.get_entry("CMD_parent_to_child").data.serial == \
+        uninterrupted.get_entry("CMD_parent_to_child").data.serial
+    for dd in [uninterrupted, first, resumed]:
+        dd.close()
+
+
+def test_restore_keeps_existing_objects(tmp_path):
+    dd = DataDictionary()
+    populate(dd)
+    for i in range(1, 6):
+        step(dd, i)
+    filename = str(tmp_path / "checkpoint.npz")
+    Checkpoint(dd).save(filename)
+    entry = dd.get_entry("test_int")
+    cmd = dd.get_entry("CMD_parent_to_child").data
+    for i in range(6, 10):
+        step(dd, i)
+    Checkpoint(dd).restore(filename)
+    assert dd.get_entry("test_int") is entry
+    assert dd.get_entry("CMD_parent_to_child").data is cmd
+    assert dd.store_count == 5
+    assert entry.data == 5 // 3
+
+
+def test_snapshot_mode_has_to_match(tmp_path):
+    dd = DataDictionary(snapshot=True)
+    populate(dd)
+    filename = str(tmp_path / "checkpoint.npz")
+    Checkpoint(dd).save(filename)
+    with pytest.raises(ValueError):
+        Checkpoint(DataDictionary()).restore(filename)
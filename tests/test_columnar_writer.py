@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from rcsnn.base.ColumnarWriter import ColumnarWriter
+
+
+@pytest.fixture
+def ddict() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 0))
+    ddict.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "str_0"))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros((2, 2))))
+    for i in range(1, 21):
+        ddict.get_entry("elapsed-time").data += 0.1
+        ddict.get_entry("test_int").data = i
+        ddict.get_entry("test_string").data = "str_{}".format(i)
+        ddict.get_entry("test_array").data[:] = i
+        if i == 10:
+            ddict.add_entry(DictionaryEntry("test_late", DictionaryTypes.FLOAT, 0.5))
+        ddict.store(1)
+    return ddict
+
+
+def check_table(table):
+    assert table.column_names[:2] == ["tick", "elapsed-time"]
+    assert table.column("tick").to_pylist() == list(range(21))
+    assert table.column("test_int").to_pylist() == list(range(21))
+    assert table.column("test_string").to_pylist() == ["str_{}".format(i) for i in range(21)]
+    # the late entry has no value for the ticks before it was added
+    assert table.column("test_late").to_pylist() == [None] * 9 + [0.5] * 12
+    arrays = table.column("test_array").to_pylist()
+    assert arrays[7] == [7.0] * 4
+    shape = table.schema.field("test_array").metadata[b"shape"]
+    assert shape == b"2,2"
+
+
+def test_parquet_round_trip(ddict, tmp_path):
+    filename = str(tmp_path / "history.parquet")
+    ColumnarWriter(ddict, chunk_rows=8).write_parquet(filename)
+    assert pq.ParquetFile(filename).num_row_groups == 3
+    check_table(pq.read_table(filename))
+
+
+def test_feather_round_trip(ddict, tmp_path):
+    filename = str(tmp_path / "history.arrow")
+    ColumnarWriter(ddict, chunk_rows=8).write_feather(filename)
+    check_table(feather.read_table(filename))
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.CompressedHistory import CompressedHistory
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryTypes
+from rcsnn.base.HistoryBuffer import HistoryBuffer
+
+
+@pytest.mark.parametrize("dtype, values", [
+    (np.float64, np.cumsum(np.full(5000, 0.1))),
+    (np.float64, np.round(np.sin(np.arange(5000) / 50) * 180, 1)),
+    (np.int64, np.arange(5000) // 7),
+    (np.int64, np.random.default_rng(1).integers(-2**62, 2**62, 5000)),
+])
+def test_round_trip(dtype, values):
+    ch = CompressedHistory(dtype, block_size=256)
+    for v in values[:1000]:
+        ch.append(v)
+    ch.extend(values[1000:])
+    assert np.array_equal(ch.view(), values)
+    assert ch.value_at(1234) == values[1234]
+    assert ch.value_at(len(values) + 10) == values[-1]
+    assert ch.value_at(-1) is None
+
+
+@pytest.mark.parametrize("value", [None, 2.5, 2**70, "abc"])
+def test_append_rejects_values_that_dont_fit(value):
+    ch = CompressedHistory(np.int64)
+    ch.append(1)
+    with pytest.raises((ValueError, OverflowError)):
+        ch.append(value)
+    assert len(ch) == 1
+    assert ch.view().tolist() == [1]
+
+
+@pytest.mark.parametrize("type, value", [(DictionaryTypes.INT, None), (DictionaryTypes.INT, 2.5),
+                                         (DictionaryTypes.INT, 2**70), (DictionaryTypes.FLOAT, None)])
+def test_store_falls_back_to_object_history(type, value):
+    # the entry that can't be compressed is stored after one that can, and neither store is lost
+    dd = DataDictionary(compress=True)
+    f = dd.new_entry("f", DictionaryTypes.FLOAT, 1.0)
+    e = dd.new_entry("e", type, 1)
+    e.set_data(value)
+    dd.store(skip=1)
+    assert len(f.history) == 2
+    assert len(e.history) == 2
+    assert isinstance(e.history, HistoryBuffer)
+    assert e.history.last() is value
+    assert isinstance(f.history, CompressedHistory)
+    dd.store(skip=1)
+    assert list(e.history.ticks()) == [0, 1, 2]
+
+
+def test_open_block_grows_to_block_size():
+    ch = CompressedHistory(np.float64, block_size=1024)
+    assert ch.nbytes() <= 16 * 8
+    for i in range(100):
+        ch.append(i * 0.5)
+    assert len(ch.open) == 128
+    ch.extend(np.arange(2000) * 0.25)
+    assert len(ch.open) <= 1024
+    assert np.array_equal(ch.view(), np.concatenate([np.arange(100) * 0.5, np.arange(2000) * 0.25]))
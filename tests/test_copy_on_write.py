@@ -0,0 +1,50 @@
+import pickle
+
+from rcsnn.base.CopyOnWrite import CopyOnWrite, VersionedList
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def test_plain_list_snapshots_are_shared_until_it_changes():
+    cow = CopyOnWrite()
+    l = [(0, 0), (1, 1)]
+    first = cow.take(l)
+    assert first == ((0, 0), (1, 1))
+    assert cow.take(l) is first
+    assert cow.take(list(l)) is first
+    l[0] = (2, 2)
+    second = cow.take(l)
+    assert second == ((2, 2), (1, 1))
+    assert first == ((0, 0), (1, 1))
+    l.append((3, 3))
+    assert cow.take(l) == ((2, 2), (1, 1), (3, 3))
+
+
+def test_versioned_list_snapshots_follow_the_version():
+    cow = CopyOnWrite()
+    vl = VersionedList([1, 2, 3])
+    first = cow.take(vl)
+    assert cow.take(vl) is first
+    vl[1] = 5
+    assert cow.take(vl) == (1, 5, 3)
+    vl.touch()
+    assert cow.take(vl) is not first
+
+
+def test_versioned_list_pickles():
+    vl = VersionedList([1, 2])
+    vl.append(3)
+    copy = pickle.loads(pickle.dumps(vl))
+    assert isinstance(copy, VersionedList)
+    assert copy == [1, 2, 3]
+
+
+def test_list_entries_from_dicts_are_versioned():
+    dd = DataDictionary()
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    assert dd.set_entry_from_dict({"name": "test_list", "type": "LIST", "current": [1, 2, 3]})
+    de = dd.get_entry("test_list")
+    assert isinstance(de.data, VersionedList)
+    dd.store(skip=1)
+    de.data.append(4)
+    dd.store(skip=1)
+    assert [tuple(v) for v in de.data_list] == [(1, 2, 3), (1, 2, 3), (1, 2, 3, 4)]
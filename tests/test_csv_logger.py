@@ -0,0 +1,46 @@
+import numpy as np
+
+from rcsnn.base.CsvLogger import CsvLogger
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def make_dictionary() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 1))
+    ddict.add_entry(DictionaryEntry("test_list", DictionaryTypes.LIST, [1, 2, 3]))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros((2, 2))))
+    return ddict
+
+
+def change(ddict:DataDictionary, i:int):
+    ddict.get_entry("test_int").data = i
+    ddict.get_entry("test_list").data = [i, i + 1, i + 2]
+    ddict.get_entry("test_array").data[:] = i / 10
+
+
+def test_matches_log_to_csv(tmp_path):
+    ddict = make_dictionary()
+    logged = tmp_path / "logger.csv"
+    legacy = tmp_path / "legacy.csv"
+    with CsvLogger(ddict, str(logged), skip=2, batch_size=4) as logger:
+        for i in range(1, 12):
+            change(ddict, i)
+            logger.log()
+            ddict.log_to_csv(str(legacy), 2)
+    assert logged.read_text() == legacy.read_text()
+
+
+def test_rows_are_batched(tmp_path):
+    ddict = make_dictionary()
+    filename = tmp_path / "logger.csv"
+    logger = CsvLogger(ddict, str(filename), batch_size=4)
+    for i in range(6):
+        change(ddict, i)
+        logger.log()
+    # the header and the first batch of four rows have been written, and two rows are waiting
+    assert len(filename.read_text().splitlines()) == 5
+    assert len(logger.rows) == 2
+    logger.close()
+    lines = filename.read_text().splitlines()
+    assert len(lines) == 7
+    assert lines[0].startswith("log_line, test_int, test_list_0, test_list_1, test_list_2, test_array_0_0")
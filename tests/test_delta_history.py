@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.DeltaHistory import DeltaHistory
+
+
+def test_only_changes_are_recorded():
+    dh = DeltaHistory(object)
+    values = ["init"] * 5 + ["run"] * 10 + ["done"] * 5
+    for v in values:
+        dh.append(v)
+    ticks, changes = dh.changes()
+    assert ticks.tolist() == [0, 5, 15]
+    assert changes.tolist() == ["init", "run", "done"]
+    assert len(dh) == 20
+    assert dh.view().tolist() == values
+    assert dh.value_at(7) == "run"
+    assert dh.dense(3, 8).tolist() == values[3:8]
+    assert dh.last() == "done"
+
+
+def test_extend_matches_append():
+    values = np.repeat(np.arange(5.0), 4)
+    appended = DeltaHistory(np.float64)
+    for v in values:
+        appended.append(v)
+    extended = DeltaHistory(np.float64)
+    extended.extend(values[:7])
+    extended.extend(values[7:])
+    assert extended.changes()[0].tolist() == appended.changes()[0].tolist()
+    assert extended.view().tolist() == values.tolist()
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_delta_dictionary_matches(delta):
+    dd = DataDictionary(delta=delta)
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    dd.add_entry(DictionaryEntry("mode", DictionaryTypes.STRING, "init"))
+    for i in range(1, 31):
+        dd.get_entry("elapsed-time").data += 0.1
+        dd.get_entry("mode").data = "run" if i < 20 else "done"
+        dd.store(skip=1)
+    mode = dd.get_entry("mode")
+    assert isinstance(mode.history, DeltaHistory) == delta
+    assert mode.data_list.tolist() == ["init"] + ["run"] * 19 + ["done"] * 11
+    assert mode.value_at(20) == "done"
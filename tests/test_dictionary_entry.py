@@ -0,0 +1,41 @@
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def test_entries_have_no_dict():
+    de = DictionaryEntry("count", DictionaryTypes.INT, 3)
+    assert not hasattr(de, "__dict__")
+
+
+def test_construction_is_quiet(capsys):
+    DictionaryEntry("count", DictionaryTypes.INT, 3)
+    assert capsys.readouterr().out == ""
+
+
+def test_history_is_created_on_first_store():
+    de = DictionaryEntry("count", DictionaryTypes.INT, 3)
+    assert de.hist is None
+    de.data = 4
+    de.store()
+    assert de.hist is not None
+    assert de.history.view().tolist() == [3, 4]
+
+
+def test_entry_without_data_has_an_empty_history():
+    dd = DataDictionary()
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    dd.add_entry(DictionaryEntry("empty", DictionaryTypes.FLOAT))
+    assert len(dd.get_entry("empty").history) == 0
+    dd.get_entry("empty").data = 1.5
+    dd.store(skip=1)
+    assert dd.get_entry("empty").data_list.tolist() == [1.5]
+
+
+def test_command_entries_store_the_command():
+    cmd = CommandObject("parent", "child")
+    de = DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd)
+    cmd.set(Commands.RUN, 1)
+    de.store()
+    assert de.get_data() == Commands.RUN
+    assert de.data_list.tolist()[-1] == Commands.RUN
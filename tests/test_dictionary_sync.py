@@ -0,0 +1,63 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.DictionarySync import DictionaryPublisher, DictionaryReplica
+
+
+def make_pair(replica_ddict:DataDictionary):
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 7))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.arange(3.0)))
+    cmd = CommandObject("parent", "child")
+    ddict.add_entry(DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd))
+    publisher = DictionaryPublisher(ddict)
+    master_end, replica_end = mp.Pipe()
+    publisher.add_connection(master_end)
+    replica = DictionaryReplica(replica_ddict, conn=replica_end, store_ticks=True)
+    return ddict, cmd, publisher, replica
+
+
+def test_replica_observers_see_the_initial_values():
+    replica_ddict = DataDictionary()
+    seen = []
+    delivered = []
+    replica_ddict.subscribe("test_*", lambda de: seen.append((de.name, de.get_data())))
+    replica_ddict.subscribe("*", lambda entries: delivered.append(sorted(de.name for de in entries)), coalesce=True)
+    ddict, cmd, publisher, replica = make_pair(replica_ddict)
+    try:
+        ddict.store(1)
+        publisher.publish()
+        assert replica.poll(1) == 1
+        assert ("test_int", 7) in seen
+        assert [name for name, value in seen] == ["test_int", "test_array"]
+        # the coalesced subscription is delivered by the store() that follows the tick
+        assert delivered == [["elapsed-time", "test_array", "test_int"]]
+    finally:
+        publisher.close()
+        replica.close()
+
+
+def test_replica_follows_the_master():
+    replica_ddict = DataDictionary()
+    ddict, cmd, publisher, replica = make_pair(replica_ddict)
+    try:
+        for i in range(1, 6):
+            ddict.get_entry("elapsed-time").data += 0.1
+            ddict.get_entry("test_int").data = i
+            if i == 3:
+                cmd.set(Commands.RUN, cmd.next_serial())
+            ddict.store(1)
+            publisher.publish()
+            replica.poll(1)
+        assert replica_ddict.get_entry("test_int").data == 5
+        assert replica_ddict.get_entry(cmd.name).data.cmd == Commands.RUN
+        assert not replica_ddict.get_entry("test_int").master
+        assert np.array_equal(replica_ddict.get_entry("test_array").data, np.arange(3.0))
+    finally:
+        publisher.close()
+        replica.close()
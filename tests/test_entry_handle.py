@@ -0,0 +1,20 @@
+import pytest
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def test_handle_follows_the_entry():
+    dd = DataDictionary()
+    h = dd.bind("speed")
+    assert h.entry is None
+    with pytest.raises(KeyError):
+        h.resolve()
+    assert dd.bind("speed") is h
+    dd.add_entry(DictionaryEntry("speed", DictionaryTypes.FLOAT, 1.5))
+    assert h.get() == 1.5
+    h.set(2.5)
+    assert dd.get_entry("speed").data == 2.5
+    dd.remove_entry("speed")
+    assert h.entry is None
+    dd.add_entry(DictionaryEntry("speed", DictionaryTypes.FLOAT, 3.5))
+    assert h.get() == 3.5
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.ExcelWriter import ExcelWriter
+
+
+def make_dictionary() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("test_int", DictionaryTypes.INT, 0))
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    ddict.add_entry(DictionaryEntry("test_string", DictionaryTypes.STRING, "str_0"))
+    ddict.add_entry(DictionaryEntry("test_array", DictionaryTypes.ARRAY, np.zeros(2)))
+    for i in range(1, 21):
+        ddict.get_entry("elapsed-time").data = i / 10
+        ddict.get_entry("test_int").data = i
+        ddict.get_entry("test_string").data = "str_{}".format(i)
+        ddict.get_entry("test_array").data[:] = [i, -i]
+        if i == 10:
+            ddict.add_entry(DictionaryEntry("test_late", DictionaryTypes.FLOAT, 0.5))
+        ddict.store(skip=1)
+    return ddict
+
+
+def read_rows(filename) -> dict:
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    # blank cells at the end of a row aren't written, so rows are padded to the width of the header
+    sheets = {}
+    for ws in wb.worksheets:
+        rows = [list(row) for row in ws.iter_rows(values_only=True)]
+        sheets[ws.title] = [row + [None] * (len(rows[0]) - len(row)) for row in rows]
+    wb.close()
+    return sheets
+
+
+def test_one_row_per_tick(tmp_path):
+    filename = str(tmp_path / "test.xlsx")
+    ExcelWriter(make_dictionary(), chunk_rows=7).write(filename)
+    sheets = read_rows(filename)
+    assert list(sheets) == ["data"]
+    rows = sheets["data"]
+    assert rows[0] == ["tick", "elapsed-time", "test_int", "test_string", "test_array_0", "test_array_1", "test_late"]
+    assert len(rows) == 22
+    for tick, row in enumerate(rows[1:]):
+        assert row[:6] == [tick, tick / 10, tick, "str_{}".format(tick), tick, -tick]
+        # the late entry has no samples before the tick it was added at
+        assert row[6] == (None if tick < 9 else 0.5)
+
+
+def test_split_sheets_hold_the_same_cells(tmp_path):
+    ddict = make_dictionary()
+    whole = str(tmp_path / "whole.xlsx")
+    split = str(tmp_path / "split.xlsx")
+    ExcelWriter(ddict).write(whole)
+    ew = ExcelWriter(ddict, chunk_rows=4, max_rows=9, max_cols=4)
+    ew.write(split)
+    expected = read_rows(whole)["data"]
+    sheets = read_rows(split)
+    assert list(sheets) == [name for name, _ in ew.sheet_names()]
+    cells = {}
+    for rows in sheets.values():
+        assert len(rows) <= 9 and all(len(row) <= 4 for row in rows)
+        for row in rows[1:]:
+            for name, value in zip(rows[0][1:], row[1:]):
+                cells[(row[0], name)] = value
+    assert cells == {(row[0], name): value for row in expected[1:] for name, value in zip(expected[0][1:], row[1:])}
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.HistoryBuffer import EvictionTypes, HistoryBuffer
+
+
+@pytest.mark.parametrize("eviction, view, ticks", [
+    (EvictionTypes.GROW, list(range(11)), list(range(11))),
+    (EvictionTypes.OVERWRITE, [7, 8, 9, 10], [7, 8, 9, 10]),
+    (EvictionTypes.DECIMATE, [0, 4, 8], [0, 4, 8]),
+])
+def test_eviction(eviction, view, ticks):
+    hb = HistoryBuffer(np.int64, 4, eviction)
+    for i in range(11):
+        hb.append(i)
+    assert hb.view().tolist() == view
+    assert hb.ticks().tolist() == ticks
+    assert hb.last() == view[-1]
+    assert hb.total == 11
+
+
+@pytest.mark.parametrize("eviction", [EvictionTypes.GROW, EvictionTypes.OVERWRITE, EvictionTypes.DECIMATE])
+def test_fill_and_extend_match_append(eviction):
+    appended = HistoryBuffer(np.float64, 4, eviction)
+    bulk = HistoryBuffer(np.float64, 4, eviction)
+    for i in range(6):
+        appended.append(1.5)
+    for i in range(7):
+        appended.append(i / 2)
+    bulk.fill(1.5, 6)
+    bulk.extend(np.arange(7) / 2)
+    assert bulk.view().tolist() == appended.view().tolist()
+    assert bulk.ticks().tolist() == appended.ticks().tolist()
+
+
+@pytest.mark.parametrize("value", [None, "abc", 2.5, 2**70])
+def test_values_that_dont_fit_promote_to_object(value):
+    hb = HistoryBuffer(np.int64, 4)
+    hb.append(1)
+    hb.append(value)
+    hb.append(2)
+    assert hb.dtype == object
+    assert hb.view().tolist() == [1, value, 2]
+
+
+def test_rows_widen():
+    hb = HistoryBuffer(np.float64, 4, shape=(2,))
+    hb.append([1.0, 2.0])
+    hb.widen(3, np.nan)
+    hb.append([3.0, 4.0, 5.0])
+    assert hb.view().shape == (2, 3)
+    assert np.isnan(hb.view()[0, 2])
+
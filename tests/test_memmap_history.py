@@ -0,0 +1,50 @@
+import os
+
+import numpy as np
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryTypes
+from rcsnn.base.MemmapHistory import MemmapHistory
+
+
+def test_history_spills_to_the_file(tmp_path):
+    filename = MemmapHistory.make_filename(str(tmp_path), "a/b")
+    mh = MemmapHistory(filename, np.float64, hot_window=8)
+    for i in range(20):
+        mh.append(i / 10)
+    assert mh.hot_count == 4
+    assert np.allclose(mh.view(), np.arange(20) / 10)
+    mh.close()
+    assert np.allclose(np.fromfile(filename, dtype=np.float64), np.arange(20) / 10)
+    mh.append(None)
+    assert mh.last() is None
+    assert len(mh) == 21
+
+
+def make_dictionary(memmap_dir:str) -> DataDictionary:
+    dd = DataDictionary(memmap_dir=memmap_dir, hot_window=4)
+    dd.new_entry("count", DictionaryTypes.INT, 0)
+    for i in range(10):
+        dd.get_entry("count").data = i
+        dd.store(skip=1)
+    return dd
+
+
+def test_close_removes_the_files_and_the_directory_it_created(tmp_path):
+    root = tmp_path / "memmap"
+    dd = make_dictionary(str(root))
+    assert dd.get_entry("count").history.view().tolist() == [0] + list(range(10))
+    subdir = dd.memmap_dir
+    assert len(list(root.iterdir())) == 1
+    dd.close()
+    assert dd.memmap_dir is None
+    assert not os.path.exists(subdir)
+    assert not root.exists()
+
+
+def test_close_keeps_a_directory_it_didnt_create(tmp_path):
+    first = make_dictionary(str(tmp_path))
+    second = make_dictionary(str(tmp_path))
+    first.close()
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(second.memmap_dir)]
+    second.close(keep_files=True)
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.SampledHistory import SampledHistory
+from rcsnn.base.SamplingPolicy import EveryN, LTTB, MinMaxBucket, TimePeriod
+
+
+def sample(policy, values:np.ndarray) -> SampledHistory:
+    sh = SampledHistory(policy, np.float64, clock=lambda: sh.total * 0.1)
+    for v in values:
+        sh.append(v)
+    return sh
+
+
+@pytest.fixture
+def signal() -> np.ndarray:
+    s = np.sin(np.linspace(0, 4 * np.pi, 100))
+    s[37] = 3.0
+    return s
+
+
+def test_every_n(signal):
+    sh = sample(EveryN(10), signal)
+    assert sh.total == 100
+    assert sh.ticks().tolist() == list(range(0, 100, 10))
+    assert np.array_equal(sh.view(), signal[::10])
+
+
+def test_time_period(signal):
+    sh = sample(TimePeriod(0.5), signal)
+    assert sh.ticks().tolist() == list(range(0, 100, 5))
+
+
+@pytest.mark.parametrize("policy", [MinMaxBucket(10), LTTB(10)])
+def test_peaks_are_kept(policy, signal):
+    sh = sample(policy, signal)
+    assert len(sh) < 100
+    assert 37 in sh.ticks().tolist()
+    assert sh.view().max() == 3.0
+    assert np.array_equal(sh.view(), signal[sh.ticks()])
+
+
+def test_entries_get_their_own_copy_of_the_policy():
+    policy = EveryN(2)
+    dd = DataDictionary()
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    dd.add_entry(DictionaryEntry("a", DictionaryTypes.FLOAT, 0.0), policy)
+    for i in range(1, 10):
+        dd.get_entry("elapsed-time").data += 0.1
+        dd.get_entry("a").data = float(i)
+        dd.store(skip=1)
+        if i == 4:
+            dd.add_entry(DictionaryEntry("b", DictionaryTypes.FLOAT, 4.0), policy)
+    assert dd.get_entry("a").data_list.tolist() == [0.0, 2.0, 4.0, 6.0, 8.0]
+    assert dd.get_entry("b").data_list.tolist() == [4.0, 4.0, 4.0]
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import threading
+
+import pytest
+
+from rcsnn.base.BaseController import BaseController
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.ResponseObject import ResponseObject
+from rcsnn.base.Responses import Responses
+from rcsnn.base.Scheduler import Scheduler
+
+
+def run_hierarchy(workers:int, event_driven:bool = False):
+    # a top controller over two subtrees of a mid and two leaves, run through INIT, RUN and TERMINATE
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    cmd = CommandObject("board-monitor", "top")
+    rsp = ResponseObject("board-monitor", "top")
+    top = BaseController("top", ddict)
+    top.set_cmd_obj(cmd)
+    top.set_rsp_obj(rsp)
+    for name in "ab":
+        mid = BaseController("mid-{}".format(name), ddict)
+        BaseController.link_parent_child(top, mid, ddict)
+        for i in range(2):
+            BaseController.link_parent_child(mid, BaseController("leaf-{}{}".format(name, i), ddict), ddict)
+    seen = []
+    ddict.subscribe("RSP_*", lambda de: seen.append((de.name, str(de.data.rsp), threading.current_thread())))
+    cmd.set(Commands.INIT, 1)
+
+    def sequence() -> bool:
+        if rsp.test(Responses.DONE):
+            if cmd.test(Commands.INIT):
+                cmd.set(Commands.RUN, 2)
+            elif cmd.test(Commands.RUN):
+                cmd.set(Commands.TERMINATE, 3)
+            else:
+                return True
+        return False
+
+    with Scheduler(ddict, [top], workers=workers, event_driven=event_driven) as sched:
+        with contextlib.redirect_stdout(io.StringIO()):
+            ticks = sched.run(sequence, max_ticks=100)
+        groups = len(sched.groups)
+    histories = {name:list(de.data_list) for name, de in ddict.ddict.items()}
+    return ticks, groups, histories, seen
+
+
+def test_parallel_matches_serial():
+    ticks, groups, histories, seen = run_hierarchy(0)
+    p_ticks, p_groups, p_histories, p_seen = run_hierarchy(2)
+    assert ticks < 100
+    assert len(seen) > 0
+    assert p_groups == 2
+    assert p_ticks == ticks
+    assert p_histories == histories
+    assert sorted(s[:2] for s in p_seen) == sorted(s[:2] for s in seen)
+    # the held listeners are called on the calling thread, not the workers
+    assert all(s[2] is threading.main_thread() for s in p_seen)
+
+
+def test_event_driven_matches_serial():
+    ticks, groups, histories, seen = run_hierarchy(0)
+    e_ticks, e_groups, e_histories, e_seen = run_hierarchy(0, event_driven=True)
+    assert e_ticks == ticks
+    assert e_histories == histories
+
+
+def test_event_driven_with_workers_raises():
+    with pytest.raises(ValueError):
+        Scheduler(DataDictionary(), workers=2, event_driven=True)
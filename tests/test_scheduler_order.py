@@ -0,0 +1,99 @@
+import contextlib
+import io
+
+import pytest
+
+from rcsnn.base.BaseController import BaseController
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.ResponseObject import ResponseObject
+from rcsnn.base.Scheduler import Scheduler
+
+
+class RecordingController(BaseController):
+    # records the tick and its name every time it is stepped
+    steps = []
+
+    def step(self):
+        super().step()
+        RecordingController.steps.append((round(self.clock * 10), self.name))
+
+
+def make_dictionary() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    return ddict
+
+
+def make_root(name:str, ddict:DataDictionary) -> RecordingController:
+    ctrl = RecordingController(name, ddict)
+    ctrl.set_cmd_obj(CommandObject("board-monitor", name))
+    ctrl.set_rsp_obj(ResponseObject("board-monitor", name))
+    return ctrl
+
+
+def run(sched:Scheduler, ticks:int):
+    RecordingController.steps = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched.run(max_ticks=ticks)
+    return RecordingController.steps
+
+
+def test_order_comes_from_the_links():
+    ddict = make_dictionary()
+    top = make_root("top", ddict)
+    # link the lower levels first, so the order can't come from the order the controllers were made in
+    mids = [RecordingController("mid-{}".format(name), ddict) for name in "ab"]
+    leaves = [RecordingController("leaf-{}".format(i), ddict) for i in range(3)]
+    BaseController.link_parent_child(mids[0], leaves[0], ddict)
+    BaseController.link_parent_child(mids[1], leaves[1], ddict)
+    # leaf-2 has two parents, so it is one level below the deepest of them
+    BaseController.link_parent_child(mids[1], leaves[2], ddict)
+    BaseController.link_parent_child(top, leaves[2], ddict)
+    for mid in mids:
+        BaseController.link_parent_child(top, mid, ddict)
+    with Scheduler(ddict, [top]) as sched:
+        steps = run(sched, 1)
+        assert sched.levels == {"top": 0, "mid-a": 1, "mid-b": 1, "leaf-0": 2, "leaf-1": 2, "leaf-2": 2}
+    names = [name for tick, name in steps]
+    assert names[0] == "top" and set(names[1:3]) == {"mid-a", "mid-b"} and len(names) == 6
+
+
+def test_loops_and_bad_periods_are_rejected():
+    ddict = make_dictionary()
+    top = make_root("top", ddict)
+    a = RecordingController("a", ddict)
+    b = RecordingController("b", ddict)
+    BaseController.link_parent_child(top, a, ddict)
+    BaseController.link_parent_child(a, b, ddict)
+    BaseController.link_parent_child(b, a, ddict)
+    with pytest.raises(ValueError):
+        Scheduler(ddict, [top]).build()
+    with pytest.raises(ValueError):
+        Scheduler(ddict).build()
+    with pytest.raises(ValueError):
+        top.set_period(0)
+    c = make_root("c", ddict)
+    c.period = 0
+    with pytest.raises(ValueError):
+        Scheduler(ddict, [c]).build()
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_periods_and_utilization(workers):
+    ddict = make_dictionary()
+    top = make_root("top", ddict)
+    top.set_period(4)
+    for name in "ab":
+        mid = RecordingController("mid-{}".format(name), ddict)
+        mid.set_period(2)
+        BaseController.link_parent_child(top, mid, ddict)
+        for i in range(2):
+            BaseController.link_parent_child(mid, RecordingController("leaf-{}{}".format(name, i), ddict), ddict)
+    with Scheduler(ddict, [top], workers=workers, profile=True) as sched:
+        steps = run(sched, 8)
+        report = sched.utilization()
+    for name, period in [("top", 4), ("mid-a", 2), ("mid-b", 2), ("leaf-a0", 1), ("leaf-b1", 1)]:
+        assert [tick for tick, n in steps if n == name] == list(range(1, 9, period))
+    assert {level: r[:3] for level, r in report.items()} == {0: (1, 2, 8), 1: (2, 8, 16), 2: (4, 32, 32)}
+    assert all(r[3] > 0 for r in report.values())
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DictionaryEntry, DictionaryTypes
+from rcsnn.base.SharedDataDictionary import SharedDataDictionary
+
+
+@pytest.fixture
+def shm_name() -> str:
+    return "rcsnn_test_{}".format(os.getpid())
+
+
+def test_attached_dictionary_sees_the_owners_values(shm_name):
+    owner = SharedDataDictionary(shm_name, create=True)
+    try:
+        for i in range(200):
+            owner.add_entry(DictionaryEntry("int_{}".format(i), DictionaryTypes.INT, i))
+        cmd = CommandObject("parent", "child")
+        owner.add_entry(DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd))
+        cmd.set(Commands.RUN, 1)
+        other = SharedDataDictionary(shm_name)
+        try:
+            other.add_entry(DictionaryEntry("int_150", DictionaryTypes.INT, 0))
+            other_cmd = CommandObject("parent", "child")
+            other.add_entry(DictionaryEntry(other_cmd.name, DictionaryTypes.COMMAND, other_cmd))
+            assert other.get_entry("int_150").data == 150
+            assert other_cmd.cmd == Commands.RUN
+            # entries and strings added after attaching are read as they are needed
+            owner.add_entry(DictionaryEntry("late", DictionaryTypes.FLOAT, 2.5))
+            cmd.set("custom-command", 2)
+            other.add_entry(DictionaryEntry("late", DictionaryTypes.FLOAT, 0.0))
+            assert other.get_entry("late").data == 2.5
+            assert other_cmd.cmd == "custom-command"
+        finally:
+            other.close()
+    finally:
+        owner.close()
+
+
+def test_full_header_raises_and_keeps_the_directory(shm_name):
+    owner = SharedDataDictionary(shm_name, create=True, header_size=2048)
+    try:
+        with pytest.raises(ValueError, match="header is full"):
+            for i in range(1000):
+                owner.add_entry(DictionaryEntry("int_{}".format(i), DictionaryTypes.INT, i))
+        # the entry that didn't fit has no slot, and the ones before it still work
+        assert len(owner.directory) == i
+        assert owner.get_entry("int_{}".format(i - 1)).data == i - 1
+    finally:
+        owner.close()
+
+
+def test_shared_values_cant_be_none(shm_name):
+    owner = SharedDataDictionary(shm_name, create=True)
+    try:
+        owner.add_entry(DictionaryEntry("count", DictionaryTypes.INT))
+        de = owner.get_entry("count")
+        assert de.data == 0
+        with pytest.raises(ValueError):
+            de.data = None
+    finally:
+        owner.close()
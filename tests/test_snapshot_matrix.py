@@ -0,0 +1,47 @@
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+from rcsnn.base.SnapshotMatrix import SnapshotColumn
+
+
+def run(snapshot:bool) -> DataDictionary:
+    # the same run with entries of each type, one added part way through, one removed, and one set to None
+    dd = DataDictionary(snapshot=snapshot, capacity=4)
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0))
+    dd.add_entry(DictionaryEntry("count", DictionaryTypes.INT, 0))
+    dd.add_entry(DictionaryEntry("gone", DictionaryTypes.INT, 5))
+    dd.add_entry(DictionaryEntry("maybe", DictionaryTypes.FLOAT, 1.0))
+    cmd = CommandObject("parent", "child")
+    dd.add_entry(DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd))
+    for i in range(1, 21):
+        dd.get_entry("elapsed-time").data += 0.1
+        dd.get_entry("count").data = i * 3
+        if i == 5:
+            cmd.set(Commands.RUN, 1)
+            dd.add_entry(DictionaryEntry("late", DictionaryTypes.INT, 100))
+        if i == 8:
+            dd.remove_entry("gone")
+        if i == 12:
+            dd.get_entry("maybe").data = None
+        dd.store(skip=1)
+    return dd
+
+
+def test_snapshot_histories_match_individual_histories():
+    expected = run(False)
+    actual = run(True)
+    assert sorted(actual.ddict.keys()) == sorted(expected.ddict.keys())
+    for name, de in expected.ddict.items():
+        other = actual.get_entry(name)
+        assert other.data_list.tolist() == de.data_list.tolist(), name
+        assert other.history.ticks().tolist() == de.history.ticks().tolist(), name
+
+
+def test_entries_share_the_blocks():
+    dd = run(True)
+    assert isinstance(dd.get_entry("count").history, SnapshotColumn)
+    assert isinstance(dd.get_entry("CMD_parent_to_child").history, SnapshotColumn)
+    # the entry that was set to None no longer fits the float block, so it is stored on its own
+    maybe = dd.get_entry("maybe")
+    assert not isinstance(maybe.history, SnapshotColumn)
+    assert maybe in dd.store_list
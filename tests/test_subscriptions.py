@@ -0,0 +1,65 @@
+import numpy as np
+
+from rcsnn.base.CommandObject import CommandObject
+from rcsnn.base.Commands import Commands
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def make_dictionary() -> DataDictionary:
+    ddict = DataDictionary()
+    ddict.new_entry("elapsed-time", DictionaryTypes.FLOAT, 0.0)
+    ddict.new_entry("test_int", DictionaryTypes.INT, 1)
+    ddict.new_entry("test_list", DictionaryTypes.LIST, [1, 2])
+    ddict.new_entry("test_array", DictionaryTypes.ARRAY, np.zeros(2))
+    return ddict
+
+
+def test_immediate_subscription_only_sees_changes():
+    ddict = make_dictionary()
+    seen = []
+    sub = ddict.subscribe("test_int", lambda de: seen.append(de.data))
+    de = ddict.get_entry("test_int")
+    de.set_data(1)
+    de.set_data(2)
+    de.set_data(2)
+    de.set_data(3)
+    assert seen == [2, 3]
+    ddict.unsubscribe(sub)
+    de.set_data(4)
+    assert seen == [2, 3]
+
+
+def test_patterns_follow_added_and_removed_entries():
+    ddict = make_dictionary()
+    seen = []
+    ddict.subscribe("CMD_*", lambda de: seen.append((de.name, de.data.cmd)))
+    cmd = CommandObject("parent", "child")
+    ddict.add_entry(DictionaryEntry(cmd.name, DictionaryTypes.COMMAND, cmd))
+    cmd.set(Commands.INIT, 1)
+    cmd.set(Commands.INIT, 1)
+    cmd.set(Commands.RUN, 2)
+    assert seen == [("CMD_parent_to_child", Commands.INIT), ("CMD_parent_to_child", Commands.RUN)]
+    ddict.remove_entry(cmd.name)
+    cmd.set(Commands.TERMINATE, 3)
+    assert len(seen) == 2
+
+
+def test_coalesced_subscription_sees_in_place_changes():
+    ddict = make_dictionary()
+    deliveries = []
+    ddict.subscribe("test_*", lambda entries: deliveries.append(sorted(de.name for de in entries)), coalesce=True)
+    ddict.store(skip=1)
+    assert deliveries == []
+    # several changes between stores are delivered once, and writes that skip set_data() are seen too
+    ddict.get_entry("test_int").set_data(5)
+    ddict.get_entry("test_int").set_data(6)
+    ddict.get_entry("test_list").data.append(3)
+    ddict.get_entry("test_array").data[0] = 1.0
+    ddict.get_entry("elapsed-time").data = 0.1
+    ddict.store(skip=1)
+    assert deliveries == [["test_array", "test_int", "test_list"]]
+    # a value changed and changed back isn't delivered
+    ddict.get_entry("test_int").data = 7
+    ddict.get_entry("test_int").data = 6
+    ddict.store(skip=1)
+    assert len(deliveries) == 1
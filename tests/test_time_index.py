@@ -0,0 +1,38 @@
+import numpy as np
+
+from rcsnn.base.DataDictionary import DataDictionary, DictionaryEntry, DictionaryTypes
+
+
+def make_dictionary() -> DataDictionary:
+    dd = DataDictionary()
+    dd.add_entry(DictionaryEntry("elapsed-time", DictionaryTypes.FLOAT, 0.0))
+    dd.add_entry(DictionaryEntry("count", DictionaryTypes.INT, 0))
+    for i in range(1, 11):
+        dd.get_entry("elapsed-time").data = i * 0.5
+        dd.get_entry("count").data = i * 10
+        dd.store(skip=1)
+    return dd
+
+
+def test_tick_at():
+    dd = make_dictionary()
+    assert dd.tick_at(-1.0) == -1
+    assert dd.tick_at(0.0) == 0
+    assert dd.tick_at(1.2) == 2
+    assert dd.tick_at(100.0) == 10
+
+
+def test_value_as_of():
+    dd = make_dictionary()
+    assert dd.value_as_of("count", 1.2) == 20
+    assert dd.value_as_of("count", 5.0) == 100
+    assert dd.value_as_of("count", -1.0) is None
+
+
+def test_query_range():
+    dd = make_dictionary()
+    times, values = dd.query_range("count", 1.0, 3.0)
+    assert np.allclose(times, [1.0, 1.5, 2.0, 2.5])
+    assert values.tolist() == [20, 30, 40, 50]
+    times, values = dd.query_range("count", 20.0, 30.0)
+    assert len(times) == 0 and len(values) == 0